@@ -0,0 +1,86 @@
+"""
+Backfill script computing content digests for documents uploaded before they were stored.
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from src.main import create_app, db
+from src.models.document import Document
+from src.utils.file_utils import compute_file_digest
+
+def hash_document(document_id, file_path):
+    """
+    Hash one document file. Runs in a worker thread.
+
+    Args:
+        document_id (int): Document ID
+        file_path (str): Path to the document file
+
+    Returns:
+        tuple: (document_id, digest or None, error or None)
+    """
+    try:
+        return document_id, compute_file_digest(file_path), None
+    except Exception as e:
+        return document_id, None, str(e)
+
+def backfill_digests(workers=None, batch_size=200):
+    """
+    Compute and store the digest of every document that has none.
+
+    Files are hashed in parallel; each batch is committed in one transaction.
+
+    Args:
+        workers (int): Size of the worker pool, defaults to the CPU count
+        batch_size (int): Documents per transaction
+
+    Returns:
+        int: Number of documents that could not be hashed
+    """
+    app = create_app()
+
+    with app.app_context():
+        updated = 0
+        failed = 0
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            while True:
+                documents = Document.query.filter(Document.digest.is_(None), Document.id > last_id) \
+                    .order_by(Document.id).limit(batch_size).all()
+                if not documents:
+                    break
+                last_id = documents[-1].id
+
+                by_id = {document.id: document for document in documents}
+                results = executor.map(
+                    hash_document,
+                    [document.id for document in documents],
+                    [document.get_file_path() for document in documents]
+                )
+
+                for document_id, digest, error in results:
+                    if error:
+                        failed += 1
+                        print(f"{document_id} | FAILED | {error}", file=sys.stderr)
+                    else:
+                        by_id[document_id].digest = digest
+                        updated += 1
+
+                db.session.commit()
+                print(f"Backfilled {updated} documents", flush=True)
+
+        print(f"Done: {updated} documents updated, {failed} failed")
+        return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute missing document digests")
+    parser.add_argument('--workers', type=int, default=None, help="Worker pool size")
+    parser.add_argument('--batch-size', type=int, default=200, help="Documents per transaction")
+    args = parser.parse_args()
+
+    failed = backfill_digests(args.workers, args.batch_size)
+    sys.exit(1 if failed else 0)
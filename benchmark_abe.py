@@ -0,0 +1,92 @@
+"""
+Benchmark script for Hybrid ABE key wrapping as policy width grows.
+"""
+
+import os
+import json
+import time
+import argparse
+from tabulate import tabulate
+
+from src.encryption.hybrid_abe import HybridABE, KEY_WRAPPING_ATTRIBUTE, KEY_WRAPPING_AUTHORITY
+
+AUTHORITIES = ['Hospital', 'University', 'Government']
+
+def build_policy(width):
+    """
+    Build an OR policy with `width` attributes spread across the authorities.
+
+    Args:
+        width (int): Number of attributes in the policy
+
+    Returns:
+        str: Policy string
+    """
+    attributes = [
+        f"Role{i}@{AUTHORITIES[i % len(AUTHORITIES)]}"
+        for i in range(width)
+    ]
+    return ' OR '.join(attributes)
+
+def measure(key_wrapping, gp, policy, message, rounds):
+    """
+    Measure encryption time and header size for one wrapping layout.
+
+    Args:
+        key_wrapping (str): Key wrapping layout
+        gp (dict): Global parameters
+        policy (str): Policy string
+        message (bytes): Message to encrypt
+        rounds (int): Number of encryptions, the fastest is kept
+
+    Returns:
+        tuple: (best encrypt time in ms, header size in bytes)
+    """
+    abe = HybridABE(key_wrapping=key_wrapping)
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        ct = abe.encrypt(gp, {}, message, policy)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    header = {key: value for key, value in ct.items() if key != 'encrypted_message'}
+    return best * 1000, len(json.dumps(header))
+
+def run_benchmark(widths, rounds, message_size):
+    """
+    Run the key wrapping benchmark and print a table.
+
+    Args:
+        widths (list): Policy widths to measure
+        rounds (int): Encryptions per measurement
+        message_size (int): Size of the encrypted message in bytes
+    """
+    gp = HybridABE().setup()
+    message = os.urandom(message_size)
+
+    rows = []
+    for width in widths:
+        policy = build_policy(width)
+        attr_ms, attr_bytes = measure(KEY_WRAPPING_ATTRIBUTE, gp, policy, message, rounds)
+        auth_ms, auth_bytes = measure(KEY_WRAPPING_AUTHORITY, gp, policy, message, rounds)
+        rows.append([
+            width,
+            f"{attr_ms:.1f}", f"{auth_ms:.1f}", f"{attr_ms / auth_ms:.1f}x",
+            attr_bytes, auth_bytes, f"{attr_bytes / auth_bytes:.1f}x"
+        ])
+
+    print(tabulate(rows, headers=[
+        "Attributes",
+        "Per-attribute (ms)", "Per-authority (ms)", "Speedup",
+        "Per-attribute header (B)", "Per-authority header (B)", "Shrink"
+    ]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Hybrid ABE key wrapping")
+    parser.add_argument('--widths', type=int, nargs='+', default=[1, 5, 10, 20, 40])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--message-size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    run_benchmark(args.widths, args.rounds, args.message_size)
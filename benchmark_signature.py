@@ -0,0 +1,219 @@
+"""
+Benchmark script for the signature subsystem: throughput, latency, memory and concurrency.
+"""
+
+import io
+import os
+import time
+import argparse
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from tabulate import tabulate
+
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPES, SIGNATURE_ALGORITHMS
+
+PASSWORD = 'benchmark-password'
+
+# Per-process state for the process pool sweep
+_worker_key = None
+
+def percentile(samples, fraction):
+    """
+    Get a percentile of sorted samples by nearest rank.
+
+    Args:
+        samples (list): Sorted samples
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The sample at that rank
+    """
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+def measure(operation, rounds):
+    """
+    Time an operation repeatedly, then measure its peak traced memory once.
+
+    tracemalloc only sees allocations made through Python, such as
+    document buffers and PEM strings, not OpenSSL's internal memory.
+
+    Args:
+        operation (callable): Operation to measure
+        rounds (int): Number of timed runs
+
+    Returns:
+        dict: ops per second, p50/p95/p99 latency in ms and peak memory in KiB
+    """
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ops': len(samples) / max(sum(samples), 1e-9),
+        'p50': percentile(samples, 0.50) * 1000,
+        'p95': percentile(samples, 0.95) * 1000,
+        'p99': percentile(samples, 0.99) * 1000,
+        'peak_kib': peak / 1024
+    }
+
+def format_row(operation, algorithm, result):
+    """Format one measurement as a table row."""
+    return [
+        operation, algorithm,
+        f"{result['ops']:.0f}", f"{result['p50']:.2f}", f"{result['p95']:.2f}", f"{result['p99']:.2f}",
+        f"{result['peak_kib']:.0f}"
+    ]
+
+def benchmark_key_type(key_type, sizes, rounds, keygen_rounds):
+    """
+    Measure every signature operation for one key type.
+
+    Args:
+        key_type (str): Signature key type
+        sizes (list): Document sizes in bytes for sign and verify
+        rounds (int): Timed runs per operation
+        keygen_rounds (int): Timed runs for key generation
+
+    Returns:
+        list: Table rows
+    """
+    ds = DigitalSignature()
+    label = SIGNATURE_ALGORITHMS[key_type]
+    rows = [format_row('keygen', label, measure(lambda: ds.generate_key_pair(key_type=key_type), keygen_rounds))]
+
+    private_pem, public_pem = ds.generate_key_pair(key_type=key_type)
+    encrypted = ds.encrypt_private_key(private_pem, PASSWORD)
+
+    # The password KDF dominates both directions, so fewer rounds suffice
+    kdf_rounds = max(3, rounds // 10)
+    rows.append(format_row('encrypt_private_key', label,
+                           measure(lambda: ds.encrypt_private_key(private_pem, PASSWORD), kdf_rounds)))
+    rows.append(format_row('decrypt_private_key', label,
+                           measure(lambda: ds.decrypt_private_key(encrypted, PASSWORD), kdf_rounds)))
+
+    private_key = ds.load_private_key(private_pem)
+    public_key = ds.load_public_key(public_pem)
+
+    for size in sizes:
+        document = os.urandom(size)
+        signature = ds.sign_document(document, private_key)
+        size_label = format_size(size)
+
+        rows.append(format_row(f'sign {size_label}', label,
+                               measure(lambda: ds.sign_document(document, private_key), rounds)))
+        rows.append(format_row(f'sign streamed {size_label}', label, measure(
+            lambda: ds.sign_digest(ds.hash_stream(io.BytesIO(document)), private_key), rounds)))
+        rows.append(format_row(f'verify {size_label}', label,
+                               measure(lambda: ds.verify_signature(document, signature, public_key), rounds)))
+
+    return rows
+
+def format_size(size):
+    """Format a byte count for labels."""
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024 or unit == 'MiB':
+            return f"{size:g}{unit}"
+        size /= 1024
+
+def _init_worker(private_pem):
+    """Load the signing key once per worker process."""
+    global _worker_key
+    _worker_key = DigitalSignature().load_private_key(private_pem)
+
+def _sign_in_worker(document):
+    """Sign a document in a worker process."""
+    return DigitalSignature().sign_document(document, _worker_key)
+
+def sweep(key_type, worker_counts, jobs, size):
+    """
+    Measure signing throughput across thread and process pool sizes.
+
+    Args:
+        key_type (str): Signature key type
+        worker_counts (list): Pool sizes to try
+        jobs (int): Documents signed per measurement
+        size (int): Document size in bytes
+
+    Returns:
+        list: Table rows
+    """
+    ds = DigitalSignature()
+    private_pem, _ = ds.generate_key_pair(key_type=key_type)
+    private_key = ds.load_private_key(private_pem)
+    documents = [os.urandom(size) for _ in range(jobs)]
+
+    rows = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda document: ds.sign_document(document, private_key), documents))
+        thread_rate = jobs / (time.perf_counter() - start)
+
+        # Pool start-up is excluded, a long-lived service pays it once
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(private_pem,)) as executor:
+            list(executor.map(_sign_in_worker, documents[:workers]))
+            start = time.perf_counter()
+            list(executor.map(_sign_in_worker, documents, chunksize=max(1, jobs // (workers * 4))))
+            process_rate = jobs / (time.perf_counter() - start)
+
+        rows.append([key_type, workers, f"{thread_rate:.0f}", f"{process_rate:.0f}"])
+
+    return rows
+
+def run_benchmark(key_types, sizes, rounds, keygen_rounds, worker_counts, jobs, sweep_size):
+    """
+    Run the benchmarks and print one table per section.
+
+    Args:
+        key_types (list): Key types to measure
+        sizes (list): Document sizes for sign and verify
+        rounds (int): Timed runs per operation
+        keygen_rounds (int): Timed runs for key generation
+        worker_counts (list): Pool sizes for the concurrency sweep, empty to skip it
+        jobs (int): Documents signed per sweep measurement
+        sweep_size (int): Document size for the sweep
+    """
+    rows = []
+    for key_type in key_types:
+        rows.extend(benchmark_key_type(key_type, sizes, rounds, keygen_rounds))
+
+    print(tabulate(rows, headers=[
+        "Operation", "Algorithm", "Ops/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Peak (KiB)"
+    ]))
+
+    if worker_counts:
+        rows = []
+        for key_type in key_types:
+            rows.extend(sweep(key_type, worker_counts, jobs, sweep_size))
+
+        print()
+        print(f"Signing throughput, {jobs} documents of {format_size(sweep_size)} per run")
+        print(tabulate(rows, headers=["Key type", "Workers", "Threads (ops/s)", "Processes (ops/s)"]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the signature subsystem")
+    parser.add_argument('--key-types', nargs='+', choices=KEY_TYPES, default=list(KEY_TYPES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 1024 * 1024, 16 * 1024 * 1024],
+                        help="Document sizes in bytes")
+    parser.add_argument('--rounds', type=int, default=30, help="Timed runs per operation")
+    parser.add_argument('--keygen-rounds', type=int, default=10, help="Timed runs for key generation")
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8],
+                        help="Pool sizes for the concurrency sweep, none to skip it")
+    parser.add_argument('--jobs', type=int, default=200, help="Documents signed per sweep measurement")
+    parser.add_argument('--sweep-size', type=int, default=64 * 1024, help="Document size for the sweep")
+    args = parser.parse_args()
+
+    run_benchmark(args.key_types, args.sizes, args.rounds, args.keygen_rounds,
+                  args.workers, args.jobs, args.sweep_size)
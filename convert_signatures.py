@@ -0,0 +1,132 @@
+"""
+Conversion script replacing legacy .sig + .json signature pairs with single-file containers.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+
+from src.main import create_app, db
+from src.models.document import Document
+from src.models.user import User
+from src.encryption.digital_signature import DigitalSignature
+from src.encryption.public_key_cache import key_fingerprint
+from src.encryption.signature_container import CONTAINER_EXTENSION, write_container
+from src.storage import publish_file
+from src.utils.file_utils import compute_file_digest, get_file_path, get_storage_path
+
+def convert_document(document, signer, upload_folder, digital_signature, keep=False):
+    """
+    Convert one document's legacy signature files into a container.
+
+    Args:
+        document (Document): Signed document with a legacy .sig file
+        signer (User): Signer of the document
+        upload_folder (str): Directory holding the signature files
+        digital_signature (DigitalSignature): Helper used to name the algorithm
+        keep (bool): Keep the legacy files after converting
+
+    Returns:
+        str: Filename of the new container
+    """
+    signature_path = get_file_path(document.signature_file, upload_folder)
+    metadata_path = get_file_path(os.path.splitext(document.signature_file)[0] + '.json', upload_folder)
+
+    with open(signature_path, 'rb') as f:
+        signature = f.read()
+
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+
+    # Prefer what was recorded at signing time, fall back to the current file. The
+    # sidecar holds local time, updated_at naive UTC
+    digest = metadata.get('digest') or document.digest or compute_file_digest(document.get_file_path())
+    timestamp = datetime.fromisoformat(metadata['timestamp']) if metadata.get('timestamp') \
+        else document.updated_at.replace(tzinfo=timezone.utc)
+
+    container_filename = os.path.splitext(document.signature_file)[0] + CONTAINER_EXTENSION
+    container_path = get_storage_path(container_filename, upload_folder)
+    write_container(
+        container_path,
+        signature=signature,
+        digest=bytes.fromhex(digest),
+        algorithm=metadata.get('algorithm') or digital_signature.get_signature_algorithm(signer.public_key),
+        key_fingerprint=key_fingerprint(signer.public_key),
+        signer_id=metadata.get('signer_id') or str(signer.id),
+        document=os.path.basename(document.filename),
+        timestamp=timestamp
+    )
+    publish_file(container_path)
+
+    if not keep:
+        os.remove(signature_path)
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path)
+
+    return container_filename
+
+def convert_signatures(keep=False, batch_size=200):
+    """
+    Convert every legacy signature pair referenced by a document.
+
+    Args:
+        keep (bool): Keep the legacy files after converting
+        batch_size (int): Documents per transaction
+
+    Returns:
+        int: Number of documents that could not be converted
+    """
+    app = create_app()
+
+    with app.app_context():
+        upload_folder = app.config['UPLOAD_FOLDER']
+        digital_signature = DigitalSignature()
+        converted = 0
+        failed = 0
+        last_id = 0
+
+        while True:
+            documents = Document.query.filter(
+                Document.is_signed.is_(True),
+                Document.signature_file.like('%.sig'),
+                Document.id > last_id
+            ).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+            last_id = documents[-1].id
+
+            signer_ids = {document.signer_id for document in documents if document.signer_id}
+            signers = {user.id: user for user in User.query.filter(User.id.in_(signer_ids)).all()}
+
+            for document in documents:
+                signer = signers.get(document.signer_id)
+                if not signer or not signer.public_key:
+                    failed += 1
+                    print(f"{document.id} | FAILED | Signer not found", file=sys.stderr)
+                    continue
+                try:
+                    document.signature_file = convert_document(
+                        document, signer, upload_folder, digital_signature, keep
+                    )
+                    converted += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"{document.id} | FAILED | {e}", file=sys.stderr)
+
+            db.session.commit()
+
+        print(f"Done: {converted} signatures converted, {failed} failed")
+        return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy signature files to containers")
+    parser.add_argument('--keep', action='store_true', help="Keep the legacy .sig and .json files")
+    parser.add_argument('--batch-size', type=int, default=200, help="Documents per transaction")
+    args = parser.parse_args()
+
+    failed = convert_signatures(args.keep, args.batch_size)
+    sys.exit(1 if failed else 0)
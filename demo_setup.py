@@ -94,6 +94,8 @@ def setup_demo():
                 try:
                     if os.path.isfile(file_path):
                         os.unlink(file_path)
+                    elif os.path.isdir(file_path):
+                        shutil.rmtree(file_path)
                 except Exception as e:
                     print(f"Error deleting {file_path}: {e}")
         else:
@@ -207,7 +209,7 @@ def add_document_service_method():
             self._file = file_handle
             # filename bạn truyền vào khi gọi save_document_from_file()
             self.filename = filename
-            # content_type có thể để None, save_uploaded_file sẽ mặc định kiểu MIME
+            # content_type có thể để None, DocumentService sẽ mặc định kiểu MIME theo phần mở rộng
             self.content_type = None
 
         def save(self, dst_path):
@@ -3,6 +3,7 @@ import json
 from src.main import create_app, db
 from src.models.user import User
 from src.services.encryption_service import EncryptionService
+from src.utils.file_utils import get_file_path, get_storage_path
 
 def fix_user_keys(username):
     """Create a complete key file with all attributes for a user."""
@@ -43,7 +44,7 @@ def fix_user_keys(username):
             print(f"Processing authority: {authority_name} with attributes: {attr_list}")
             
             # Get authority secret key
-            sk_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{authority_name}_sk.json")
+            sk_path = get_file_path(f"{authority_name}_sk.json")
             if not os.path.exists(sk_path):
                 print(f"Setting up new authority: {authority_name}")
                 encryption_service.setup_authority(authority_name)
@@ -64,7 +65,7 @@ def fix_user_keys(username):
             user_keys['authority_keys'][authority_name] = sk['key']
         
         # Save complete user keys
-        keys_path = os.path.join(app.config['UPLOAD_FOLDER'], f"user_{user.id}_keys.json")
+        keys_path = get_storage_path(f"user_{user.id}_keys.json")
         with open(keys_path, 'w') as f:
             json.dump(user_keys, f, indent=2)
         
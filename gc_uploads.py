@@ -0,0 +1,63 @@
+"""
+Script collecting unreferenced artifacts from the upload folder.
+
+Runs the same collection as the background thread once, with the TTLs
+from the application config. Safe to run while the application is
+serving requests.
+"""
+
+import sys
+import argparse
+from tabulate import tabulate
+
+from src.main import create_app
+from src.services.upload_gc import UploadGarbageCollector, DEFAULT_TTLS
+
+def gc_uploads(dry_run=False, quarantine=None, batch_size=None):
+    """
+    Collect unreferenced upload artifacts and print a summary per rule.
+
+    Args:
+        dry_run (bool): Only count what would be removed
+        quarantine (bool): Move files to the quarantine folder, defaults to GC_MODE
+        batch_size (int): Files checked against the database per query, defaults to GC_BATCH_SIZE
+
+    Returns:
+        bool: True if the collection ran, False otherwise
+    """
+    app = create_app()
+
+    collector = UploadGarbageCollector(
+        batch_size=batch_size or app.config['GC_BATCH_SIZE'],
+        ttls={rule: app.config[f'GC_TTL_{rule.upper()}'] for rule in DEFAULT_TTLS},
+        quarantine=app.config['GC_MODE'] == 'quarantine' if quarantine is None else quarantine
+    )
+
+    with app.app_context():
+        try:
+            stats = collector.collect(app.config['UPLOAD_FOLDER'], app.config['STORAGE_CACHE_FOLDER'], dry_run=dry_run)
+        except Exception as e:
+            print(f"Collection failed: {e}", file=sys.stderr)
+            return False
+
+    rows = [
+        [rule, counts.get('expired', 0), counts.get('kept', 0), counts.get('removed', 0),
+         counts.get('bytes', 0), counts.get('sessions', 0)]
+        for rule, counts in sorted(stats.items())
+    ]
+    print(tabulate(rows, headers=['Rule', 'Expired', 'Referenced', 'Removed', 'Bytes', 'Sessions']))
+
+    action = 'Would remove' if dry_run else 'Quarantined' if collector.quarantine else 'Removed'
+    print(f"{action} {sum(row[3] for row in rows)} files, {sum(row[4] for row in rows)} bytes")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect unreferenced artifacts from the upload folder")
+    parser.add_argument('--dry-run', action='store_true', help="Only count what would be removed")
+    parser.add_argument('--quarantine', action='store_true', default=None,
+                        help="Move files to the quarantine folder instead of deleting them")
+    parser.add_argument('--batch-size', type=int, help="Files checked against the database per query")
+    args = parser.parse_args()
+
+    ok = gc_uploads(args.dry_run, args.quarantine, args.batch_size)
+    sys.exit(0 if ok else 1)
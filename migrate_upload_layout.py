@@ -0,0 +1,72 @@
+"""
+Migration script moving the flat uploads folder into the sharded layout.
+
+Safe to run while the application is serving requests: every file is
+moved with an atomic rename, and until the migration finishes lookups
+fall back to the flat location for files not moved yet. A request that
+resolved a file's flat path just before it was moved can still fail
+with a missing file; retrying the request resolves the new location.
+"""
+
+import os
+import sys
+import argparse
+
+from src.main import create_app
+from src.utils.file_utils import LAYOUT_MARKER, shard_path
+
+def migrate_upload_layout(dry_run=False, report_every=1000):
+    """
+    Move every file at the top of the upload folder into its namespace and shard.
+
+    Args:
+        dry_run (bool): Only print what would be moved
+        report_every (int): Print progress after this many files
+
+    Returns:
+        int: Number of files that could not be moved
+    """
+    app = create_app()
+    directory = app.config['UPLOAD_FOLDER']
+
+    moved = 0
+    failed = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name == LAYOUT_MARKER:
+                continue
+
+            target = os.path.join(directory, shard_path(entry.name))
+            if dry_run:
+                print(f"{entry.name} -> {os.path.relpath(target, directory)}")
+                continue
+
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.exists(target):
+                    # Rewritten in the new layout since the migration started, the flat copy is stale
+                    os.remove(entry.path)
+                else:
+                    os.replace(entry.path, target)
+                moved += 1
+                if moved % report_every == 0:
+                    print(f"Moved {moved} files", flush=True)
+            except OSError as e:
+                failed += 1
+                print(f"{entry.name} | FAILED | {e}", file=sys.stderr)
+
+    if not dry_run and not failed:
+        # Lookups stop checking the flat layout from now on
+        with open(os.path.join(directory, LAYOUT_MARKER), 'w') as f:
+            f.write('sharded\n')
+
+    print(f"Done: {moved} files moved, {failed} failed")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move uploads into the sharded layout")
+    parser.add_argument('--dry-run', action='store_true', help="Only print what would be moved")
+    args = parser.parse_args()
+
+    failed = migrate_upload_layout(args.dry_run)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,35 @@
+"""Add content-addressed blobs
+
+Revision ID: 15e4603ce349
+Revises: 7467a337021b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '15e4603ce349'
+down_revision = '7467a337021b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('blob'):
+        return
+
+    op.create_table(
+        'blob',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('digest')
+    )
+
+
+def downgrade():
+    op.drop_table('blob')
@@ -0,0 +1,33 @@
+"""Add document content digest
+
+Revision ID: 3f9c2a7d1e45
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1e45'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() after this change already have the column
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('document')}
+    if 'digest' in columns:
+        return
+
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('digest', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_document_digest'), ['digest'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_document_digest'))
+        batch_op.drop_column('digest')
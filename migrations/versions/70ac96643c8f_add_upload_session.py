@@ -0,0 +1,40 @@
+"""Add resumable upload sessions
+
+Revision ID: 70ac96643c8f
+Revises: 15e4603ce349
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '70ac96643c8f'
+down_revision = '15e4603ce349'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('upload_session'):
+        return
+
+    op.create_table(
+        'upload_session',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=256), nullable=False),
+        sa.Column('content_type', sa.String(length=128), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('received', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_session')
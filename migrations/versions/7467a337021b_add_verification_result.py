@@ -0,0 +1,39 @@
+"""Add cached signature verification results
+
+Revision ID: 7467a337021b
+Revises: 3f9c2a7d1e45
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7467a337021b'
+down_revision = '3f9c2a7d1e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('verification_result'):
+        return
+
+    op.create_table(
+        'verification_result',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_digest', sa.String(length=64), nullable=False),
+        sa.Column('signature_digest', sa.String(length=64), nullable=False),
+        sa.Column('key_fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('valid', sa.Boolean(), nullable=False),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_digest', 'signature_digest', 'key_fingerprint',
+                            name='_verification_key_uc')
+    )
+
+
+def downgrade():
+    op.drop_table('verification_result')
@@ -0,0 +1,197 @@
+"""
+Access-decision cache for attribute-based policies.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+class AccessDecisionCache:
+    """
+    Cache of policy decisions keyed by (attribute-set hash, policy hash).
+
+    Many users share the same attribute sets and many documents share the
+    same policy strings, so one decision is stored per distinct pair and
+    shared by decryption, listing and authorization checks.
+    """
+
+    def __init__(self, max_entries=4096, max_policies=1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached decisions
+            max_policies (int): Maximum number of cached compiled policies
+        """
+        self.max_entries = max_entries
+        self.max_policies = max_policies
+        self._decisions = OrderedDict()
+        self._policies = OrderedDict()
+        self._attribute_sets = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def attribute_set_hash(attributes):
+        """
+        Compute a canonical hash of an attribute set.
+
+        Args:
+            attributes (iterable): Attributes in 'attribute@authority' format
+
+        Returns:
+            str: Hex digest independent of attribute order and duplicates
+        """
+        canonical = '\n'.join(sorted(set(attributes)))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def policy_hash(policy):
+        """
+        Compute a canonical hash of a compiled policy.
+
+        Args:
+            policy (dict): Structured policy
+
+        Returns:
+            str: Hex digest of the canonical policy encoding
+        """
+        canonical = json.dumps(policy, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get_policy(self, policy_str):
+        """
+        Get a compiled policy and its hash.
+
+        Args:
+            policy_str (str): Policy string
+
+        Returns:
+            tuple: (policy, policy_hash), or None if not cached
+        """
+        with self._lock:
+            entry = self._policies.get(policy_str)
+            if entry is not None:
+                self._policies.move_to_end(policy_str)
+            return entry
+
+    def put_policy(self, policy_str, policy):
+        """
+        Store a compiled policy.
+
+        Args:
+            policy_str (str): Policy string
+            policy (dict): Structured policy
+
+        Returns:
+            tuple: (policy, policy_hash)
+        """
+        entry = (policy, self.policy_hash(policy))
+        with self._lock:
+            self._policies[policy_str] = entry
+            self._policies.move_to_end(policy_str)
+            while len(self._policies) > self.max_policies:
+                self._policies.popitem(last=False)
+        return entry
+
+    def get(self, attribute_hash, policy_hash):
+        """
+        Look up a cached decision.
+
+        Args:
+            attribute_hash (str): Hash of the user's attribute set
+            policy_hash (str): Hash of the compiled policy
+
+        Returns:
+            frozenset: Satisfying attributes (empty if access is denied),
+                or None on a cache miss
+        """
+        key = (attribute_hash, policy_hash)
+        with self._lock:
+            decision = self._decisions.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self._decisions.move_to_end(key)
+            self.hits += 1
+            return decision
+
+    def put(self, attribute_hash, policy_hash, attributes, decision):
+        """
+        Store a decision.
+
+        Args:
+            attribute_hash (str): Hash of the user's attribute set
+            policy_hash (str): Hash of the compiled policy
+            attributes (iterable): The attribute set the hash was computed from
+            decision (iterable): Satisfying attributes
+
+        Returns:
+            frozenset: The stored decision
+        """
+        key = (attribute_hash, policy_hash)
+        decision = frozenset(decision)
+        with self._lock:
+            if key not in self._decisions:
+                entry = self._attribute_sets.setdefault(attribute_hash, [frozenset(attributes), 0])
+                entry[1] += 1
+            self._decisions[key] = decision
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.max_entries:
+                (evicted_hash, _), _ = self._decisions.popitem(last=False)
+                self._forget_attribute_set(evicted_hash)
+        return decision
+
+    def invalidate_attributes(self, attributes):
+        """
+        Drop all decisions cached for an attribute set.
+
+        Args:
+            attributes (iterable): Attributes in 'attribute@authority' format
+        """
+        attribute_hash = self.attribute_set_hash(attributes)
+        with self._lock:
+            self._drop(lambda key: key[0] == attribute_hash)
+
+    def invalidate_authority(self, authority_name):
+        """
+        Drop all decisions involving attributes issued by an authority.
+
+        Args:
+            authority_name (str): Authority name
+        """
+        suffix = f"@{authority_name}"
+        with self._lock:
+            stale = {
+                attribute_hash
+                for attribute_hash, (attributes, _) in self._attribute_sets.items()
+                if any(attr.endswith(suffix) for attr in attributes)
+            }
+            self._drop(lambda key: key[0] in stale)
+
+    def clear(self):
+        """Drop all cached decisions and compiled policies."""
+        with self._lock:
+            self._decisions.clear()
+            self._policies.clear()
+            self._attribute_sets.clear()
+
+    def _drop(self, predicate):
+        """Remove decisions whose key matches a predicate. Caller holds the lock."""
+        for key in [key for key in self._decisions if predicate(key)]:
+            del self._decisions[key]
+            self._forget_attribute_set(key[0])
+
+    def _forget_attribute_set(self, attribute_hash):
+        """Forget an attribute set once no decision refers to it. Caller holds the lock."""
+        entry = self._attribute_sets.get(attribute_hash)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._attribute_sets[attribute_hash]
+
+# Shared cache used by every HybridABE instance in the process
+access_decision_cache = AccessDecisionCache()
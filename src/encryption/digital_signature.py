@@ -2,37 +2,78 @@
 Digital signature module for the web application.
 """
 
-from cryptography.hazmat.primitives.asymmetric import rsa, padding as asymmetric_padding
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519, padding as asymmetric_padding, utils as asymmetric_utils
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
+from src.encryption import cipher_suites
+from src.encryption.public_key_cache import public_key_cache
 import os
 import base64
 
+# Supported signature key types
+KEY_TYPE_RSA = 'rsa'
+KEY_TYPE_ECDSA_P256 = 'ecdsa-p256'
+KEY_TYPE_ED25519 = 'ed25519'
+KEY_TYPES = (KEY_TYPE_RSA, KEY_TYPE_ECDSA_P256, KEY_TYPE_ED25519)
+
+# Signature algorithm recorded with signatures made by each key type.
+# Ed25519 has no prehashed mode, so it signs the document's SHA-256 digest.
+SIGNATURE_ALGORITHMS = {
+    KEY_TYPE_RSA: 'rsa-pss-sha256',
+    KEY_TYPE_ECDSA_P256: 'ecdsa-p256-sha256',
+    KEY_TYPE_ED25519: 'ed25519-sha256'
+}
+
+# Bytes read per chunk when hashing documents
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Separates the cipher suite name from the payload in AEAD-encrypted private keys.
+# Base64 never contains it, so blobs without it are the legacy AES-CBC format.
+SUITE_SEPARATOR = '$'
+
 class DigitalSignature:
-    """Class for handling digital signatures using RSA."""
+    """Class for handling digital signatures using RSA, ECDSA P-256 or Ed25519."""
     
-    def __init__(self):
-        """Initialize the digital signature handler."""
+    def __init__(self, cipher_suite=None, key_cache=None):
+        """
+        Initialize the digital signature handler.
+        
+        Args:
+            cipher_suite (str): AEAD used to encrypt private keys, defaults to
+                the suite selected at startup
+            key_cache (PublicKeyCache): Cache of parsed public keys, defaults
+                to the process-wide shared cache
+        """
         self.backend = default_backend()
+        self.cipher_suite = cipher_suite or cipher_suites.get_default_suite()
+        self.key_cache = key_cache if key_cache is not None else public_key_cache
     
-    def generate_key_pair(self, key_size=2048):
+    def generate_key_pair(self, key_size=2048, key_type=KEY_TYPE_RSA):
         """
-        Generate a new RSA key pair for digital signatures.
+        Generate a new key pair for digital signatures.
         
         Args:
-            key_size (int): Size of the RSA key in bits
+            key_size (int): Size of the RSA key in bits, ignored for other key types
+            key_type (str): 'rsa', 'ecdsa-p256' or 'ed25519'
             
         Returns:
             tuple: (private_key, public_key) as PEM strings
         """
         # Generate private key
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=key_size,
-            backend=self.backend
-        )
+        if key_type == KEY_TYPE_RSA:
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=key_size,
+                backend=self.backend
+            )
+        elif key_type == KEY_TYPE_ECDSA_P256:
+            private_key = ec.generate_private_key(ec.SECP256R1(), backend=self.backend)
+        elif key_type == KEY_TYPE_ED25519:
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise ValueError(f"Unsupported key type: {key_type}")
         
         # Get public key
         public_key = private_key.public_key()
@@ -51,6 +92,55 @@ class DigitalSignature:
         
         return private_pem, public_pem
     
+    def get_key_type(self, key):
+        """
+        Identify the type of a key; PEM public keys carry their algorithm.
+        
+        Args:
+            key: Loaded private or public key, or a public key in PEM format
+            
+        Returns:
+            str: 'rsa', 'ecdsa-p256' or 'ed25519'
+        """
+        if isinstance(key, str):
+            key = self.load_public_key(key)
+        
+        if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+            return KEY_TYPE_RSA
+        if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) \
+                and isinstance(key.curve, ec.SECP256R1):
+            return KEY_TYPE_ECDSA_P256
+        if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            return KEY_TYPE_ED25519
+        raise ValueError(f"Unsupported key: {type(key).__name__}")
+    
+    def get_public_key_pem(self, private_key):
+        """
+        Get the PEM encoding of a private key's public half.
+        
+        Args:
+            private_key: Loaded private key
+            
+        Returns:
+            str: Public key in PEM format
+        """
+        return private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode('utf-8')
+    
+    def get_signature_algorithm(self, key):
+        """
+        Get the name of the signature algorithm used with a key.
+        
+        Args:
+            key: Loaded private or public key, or a public key in PEM format
+            
+        Returns:
+            str: Signature algorithm name, e.g. 'rsa-pss-sha256'
+        """
+        return SIGNATURE_ALGORITHMS[self.get_key_type(key)]
+    
     def encrypt_private_key(self, private_key_pem, password):
         """
         Encrypt a private key with a password.
@@ -60,48 +150,42 @@ class DigitalSignature:
             password (str): Password for encryption
             
         Returns:
-            str: Encrypted private key as base64 string
+            str: Encrypted private key as '<suite>$<base64 payload>'
         """
-        # Generate a random salt and initialization vector
+        # Generate a random salt and nonce
         salt = os.urandom(16)
-        iv = os.urandom(16)
+        nonce = os.urandom(cipher_suites.NONCE_SIZE)
         
         # Derive a key from the password
         key = self._derive_key(password.encode('utf-8'), salt)
         
-        # Create an encryptor
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=self.backend
-        )
-        encryptor = cipher.encryptor()
-        
-        # Pad the private key - Fixed import
-        padder = padding.PKCS7(algorithms.AES.block_size).padder()
-        padded_data = padder.update(private_key_pem.encode('utf-8')) + padder.finalize()
-        
-        # Encrypt the private key
-        encrypted_key = encryptor.update(padded_data) + encryptor.finalize()
+        # Encrypt the private key with the AEAD, which also authenticates it
+        encryptor = cipher_suites.encryptor(self.cipher_suite, key, nonce)
+        encrypted_key = encryptor.update(private_key_pem.encode('utf-8'))
+        encryptor.finalize()
         
-        # Combine salt, iv, and encrypted key
-        result = salt + iv + encrypted_key
+        # Combine salt, nonce, encrypted key and tag
+        result = salt + nonce + encrypted_key + encryptor.tag
         
-        # Return as base64
-        return base64.b64encode(result).decode('utf-8')
+        # Return as base64, prefixed with the suite used
+        return self.cipher_suite + SUITE_SEPARATOR + base64.b64encode(result).decode('utf-8')
     
     def decrypt_private_key(self, encrypted_key_base64, password):
         """
         Decrypt a private key with a password.
         
         Args:
-            encrypted_key_base64 (str): Encrypted private key as base64 string
+            encrypted_key_base64 (str): Encrypted private key, either
+                '<suite>$<base64 payload>' or a legacy AES-CBC base64 string
             password (str): Password for decryption
             
         Returns:
             str: Decrypted private key in PEM format
         """
-        # Decode from base64
+        if SUITE_SEPARATOR in encrypted_key_base64:
+            return self._decrypt_private_key_aead(encrypted_key_base64, password)
+        
+        # Legacy AES-CBC format: decode from base64
         encrypted_data = base64.b64decode(encrypted_key_base64)
         
         # Extract salt, iv, and encrypted key
@@ -129,35 +213,145 @@ class DigitalSignature:
         
         return private_key_pem.decode('utf-8')
     
+    def _decrypt_private_key_aead(self, encrypted_key, password):
+        """
+        Decrypt a private key encrypted with an AEAD cipher suite.
+        
+        Args:
+            encrypted_key (str): Encrypted private key as '<suite>$<base64 payload>'
+            password (str): Password for decryption
+            
+        Returns:
+            str: Decrypted private key in PEM format
+        """
+        suite, payload = encrypted_key.split(SUITE_SEPARATOR, 1)
+        encrypted_data = base64.b64decode(payload)
+        
+        # Extract salt, nonce, encrypted key and tag
+        nonce_end = 16 + cipher_suites.NONCE_SIZE
+        salt = encrypted_data[:16]
+        nonce = encrypted_data[16:nonce_end]
+        encrypted_key = encrypted_data[nonce_end:-cipher_suites.TAG_SIZE]
+        tag = encrypted_data[-cipher_suites.TAG_SIZE:]
+        
+        # Derive the key from the password
+        key = self._derive_key(password.encode('utf-8'), salt)
+        
+        # Decrypt the private key, a wrong password fails tag verification
+        decryptor = cipher_suites.decryptor(suite, key, nonce, tag)
+        private_key_pem = decryptor.update(encrypted_key)
+        decryptor.finalize()
+        
+        return private_key_pem.decode('utf-8')
+    
     def sign_document(self, document_data, private_key_pem):
         """
         Sign a document using a private key.
         
         Args:
             document_data (bytes): Document data to sign
-            private_key_pem (str): Private key in PEM format
+            private_key_pem (str): Private key in PEM format, or an already
+                loaded private key object
             
         Returns:
             bytes: Digital signature
         """
         # Load the private key
-        private_key = serialization.load_pem_private_key(
-            private_key_pem.encode('utf-8'),
-            password=None,
-            backend=self.backend
-        )
+        private_key = private_key_pem
+        if isinstance(private_key_pem, str):
+            private_key = self.load_private_key(private_key_pem)
+        
+        # Ed25519 has no prehashed mode, so it always signs the SHA-256 digest
+        if self.get_key_type(private_key) == KEY_TYPE_ED25519:
+            return private_key.sign(self._sha256(document_data))
         
         # Sign the document
-        signature = private_key.sign(
-            document_data,
-            asymmetric_padding.PSS(
-                mgf=asymmetric_padding.MGF1(hashes.SHA256()),
-                salt_length=asymmetric_padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        return self._sign(private_key, document_data, hashes.SHA256())
+    
+    def hash_stream(self, stream, chunk_size=HASH_CHUNK_SIZE):
+        """
+        Compute the SHA-256 digest of a binary stream in fixed-size chunks.
+        
+        Args:
+            stream: Readable binary stream
+            chunk_size (int): Bytes read per chunk
+            
+        Returns:
+            bytes: SHA-256 digest
+        """
+        digest = hashes.Hash(hashes.SHA256(), backend=self.backend)
+        chunk = bytearray(chunk_size)
+        view = memoryview(chunk)
+        while True:
+            read = stream.readinto(chunk)
+            if not read:
+                break
+            digest.update(view[:read])
+        return digest.finalize()
+    
+    def hash_file(self, file_path, chunk_size=HASH_CHUNK_SIZE):
+        """
+        Compute the SHA-256 digest of a file with constant memory.
         
-        return signature
+        Args:
+            file_path (str): Path to the file
+            chunk_size (int): Bytes read per chunk
+            
+        Returns:
+            bytes: SHA-256 digest
+        """
+        with open(file_path, 'rb') as f:
+            return self.hash_stream(f, chunk_size)
+    
+    def sign_digest(self, digest, private_key_pem):
+        """
+        Sign a precomputed SHA-256 digest.
+        
+        The signature is identical in form to sign_document's signature over
+        the full data, and verifies with verify_signature.
+        
+        Args:
+            digest (bytes): SHA-256 digest of the document
+            private_key_pem (str): Private key in PEM format, or an already
+                loaded private key object
+            
+        Returns:
+            bytes: Digital signature
+        """
+        private_key = private_key_pem
+        if isinstance(private_key_pem, str):
+            private_key = self.load_private_key(private_key_pem)
+        
+        if self.get_key_type(private_key) == KEY_TYPE_ED25519:
+            return private_key.sign(digest)
+        
+        return self._sign(private_key, digest, asymmetric_utils.Prehashed(hashes.SHA256()))
+    
+    def verify_digest(self, digest, signature, public_key_pem):
+        """
+        Verify a signature against a precomputed SHA-256 digest.
+        
+        Args:
+            digest (bytes): SHA-256 digest of the document
+            signature (bytes): Digital signature
+            public_key_pem (str): Public key in PEM format, or an already
+                loaded public key object
+            
+        Returns:
+            bool: True if signature is valid, False otherwise
+        """
+        public_key = public_key_pem
+        if isinstance(public_key_pem, str):
+            public_key = self.load_public_key(public_key_pem)
+        
+        try:
+            if self.get_key_type(public_key) == KEY_TYPE_ED25519:
+                public_key.verify(signature, digest)
+            else:
+                self._verify(public_key, signature, digest, asymmetric_utils.Prehashed(hashes.SHA256()))
+            return True
+        except Exception:
+            return False
     
     def verify_signature(self, document_data, signature, public_key_pem):
         """
@@ -166,32 +360,132 @@ class DigitalSignature:
         Args:
             document_data (bytes): Document data to verify
             signature (bytes): Digital signature
-            public_key_pem (str): Public key in PEM format
+            public_key_pem (str): Public key in PEM format, or an already
+                loaded public key object
             
         Returns:
             bool: True if signature is valid, False otherwise
         """
-        # Load the public key
-        public_key = serialization.load_pem_public_key(
-            public_key_pem.encode('utf-8'),
-            backend=self.backend
-        )
+        # Load the public key, reusing a cached parse when possible
+        public_key = public_key_pem
+        if isinstance(public_key_pem, str):
+            public_key = self.load_public_key(public_key_pem)
         
         try:
             # Verify the signature
-            public_key.verify(
-                signature,
-                document_data,
-                asymmetric_padding.PSS(
-                    mgf=asymmetric_padding.MGF1(hashes.SHA256()),
-                    salt_length=asymmetric_padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
+            if self.get_key_type(public_key) == KEY_TYPE_ED25519:
+                public_key.verify(signature, self._sha256(document_data))
+            else:
+                self._verify(public_key, signature, document_data, hashes.SHA256())
             return True
         except Exception:
             return False
     
+    def _sign(self, private_key, data, algorithm):
+        """
+        Sign with RSA-PSS or ECDSA.
+        
+        Args:
+            private_key: Loaded RSA or ECDSA private key
+            data (bytes): Data, or digest when algorithm is Prehashed
+            algorithm: Hash algorithm or Prehashed wrapper
+            
+        Returns:
+            bytes: Digital signature
+        """
+        if isinstance(private_key, ec.EllipticCurvePrivateKey):
+            return private_key.sign(data, ec.ECDSA(algorithm))
+        
+        return private_key.sign(
+            data,
+            asymmetric_padding.PSS(
+                mgf=asymmetric_padding.MGF1(hashes.SHA256()),
+                salt_length=asymmetric_padding.PSS.MAX_LENGTH
+            ),
+            algorithm
+        )
+    
+    def _verify(self, public_key, signature, data, algorithm):
+        """
+        Verify an RSA-PSS or ECDSA signature, raising InvalidSignature on failure.
+        
+        Args:
+            public_key: Loaded RSA or ECDSA public key
+            signature (bytes): Digital signature
+            data (bytes): Data, or digest when algorithm is Prehashed
+            algorithm: Hash algorithm or Prehashed wrapper
+        """
+        if isinstance(public_key, ec.EllipticCurvePublicKey):
+            public_key.verify(signature, data, ec.ECDSA(algorithm))
+            return
+        
+        public_key.verify(
+            signature,
+            data,
+            asymmetric_padding.PSS(
+                mgf=asymmetric_padding.MGF1(hashes.SHA256()),
+                salt_length=asymmetric_padding.PSS.MAX_LENGTH
+            ),
+            algorithm
+        )
+    
+    def _sha256(self, data):
+        """
+        Compute a SHA-256 digest.
+        
+        Args:
+            data (bytes): Data to hash
+            
+        Returns:
+            bytes: SHA-256 digest
+        """
+        digest = hashes.Hash(hashes.SHA256(), backend=self.backend)
+        digest.update(data)
+        return digest.finalize()
+    
+    def load_private_key(self, private_key_pem):
+        """
+        Parse a PEM-encoded, unencrypted private key.
+        
+        Args:
+            private_key_pem (str): Private key in PEM format
+            
+        Returns:
+            object: Loaded private key
+        """
+        return serialization.load_pem_private_key(
+            private_key_pem.encode('utf-8'),
+            password=None,
+            backend=self.backend
+        )
+    
+    def load_public_key(self, public_key_pem):
+        """
+        Load a public key through the parsed key cache.
+        
+        Args:
+            public_key_pem (str): Public key in PEM format
+            
+        Returns:
+            object: Loaded public key
+        """
+        return self.key_cache.get_or_load(public_key_pem, self._load_public_key)
+    
+    def _load_public_key(self, public_key_pem):
+        """
+        Parse a PEM-encoded public key.
+        
+        Args:
+            public_key_pem (str): Public key in PEM format
+            
+        Returns:
+            object: Loaded public key
+        """
+        return serialization.load_pem_public_key(
+            public_key_pem.encode('utf-8'),
+            backend=self.backend
+        )
+    
     def _derive_key(self, password, salt):
         """
         Derive an encryption key from a password and salt.
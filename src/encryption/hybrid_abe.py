@@ -3,31 +3,109 @@ Hybrid ABE integration module for the web application.
 """
 
 import os
+import hmac
 import json
 import base64
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import hashes, padding
+import hashlib
+import binascii
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes, padding, keywrap
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
+from src.encryption.access_cache import access_decision_cache
+from src.encryption import cipher_suites
+
+# update_into needs room for one cipher block beyond the input
+AEAD_BUFFER_PADDING = 15
+
+# Plaintext bytes per chunk when streaming, a multiple of 3 so base64 chunks concatenate
+STREAM_CHUNK_SIZE = 3 * 64 * 1024
+
+# Data key wrapping layouts: one KDF per attribute (legacy), or one per authority
+KEY_WRAPPING_ATTRIBUTE = 'attribute'
+KEY_WRAPPING_AUTHORITY = 'authority'
+
+# Bytes of a ciphertext document searched for the start and the end of the payload
+PAYLOAD_SEARCH_SIZE = 64 * 1024
+
+def payload_chunk_range(file_path, first, last, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Locate streamed payload chunks inside a ciphertext document.
+    
+    encrypt_stream writes the base64 ciphertext one chunk at a time, so
+    chunk i of the payload is a fixed-size slice of the file. Only the
+    head and tail of the file are read.
+    
+    Args:
+        file_path (str): Path to the ciphertext document
+        first (int): Index of the first chunk
+        last (int): Index of the last chunk
+        chunk_size (int): Plaintext bytes per chunk the document was written with
+        
+    Returns:
+        tuple: (start, end) byte offsets of the chunks' base64 text in the file
+        
+    Raises:
+        ValueError: If the file is not a ciphertext document or the chunks are out of range
+    """
+    encoded_size = (chunk_size - chunk_size % 3) // 3 * 4
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(PAYLOAD_SEARCH_SIZE)
+        f.seek(max(0, file_size - PAYLOAD_SEARCH_SIZE))
+        tail_offset = f.tell()
+        tail = f.read()
+    
+    message = head.find(b'"encrypted_message"')
+    marker = head.find(b'"ciphertext": "', message)
+    tag = tail.rfind(b'"tag"')
+    if message < 0 or marker < 0 or tag < 0:
+        raise ValueError("Not a ciphertext document")
+    payload_start = marker + len(b'"ciphertext": "')
+    payload_end = tail_offset + tail.rfind(b'"', 0, tag)
+    
+    start = payload_start + first * encoded_size
+    end = min(payload_start + (last + 1) * encoded_size, payload_end)
+    if first < 0 or last < first or start >= payload_end:
+        raise ValueError(f"Invalid payload chunks {first}-{last}")
+    return start, end
 
 class HybridABE:
     """
-    Hybrid Attribute-Based Encryption implementation using AES for data encryption
+    Hybrid Attribute-Based Encryption implementation using an AEAD cipher for data encryption
     and attribute-based policies for access control.
     
     This class provides a simpler alternative to the MA-ABE scheme while still
     maintaining attribute-based access control functionality.
+    
+    An instance reuses one scratch buffer across encryptions, so it is not
+    thread-safe: use one instance per thread or request, as EncryptionService
+    does, rather than sharing one between threads.
     """
     
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, decision_cache=None, data_key_cache=None, cipher_suite=None,
+                 key_wrapping=KEY_WRAPPING_AUTHORITY):
         """
         Initialize the HybridABE class.
         
         Args:
             verbose (bool): Whether to print verbose output
+            decision_cache (AccessDecisionCache): Cache of policy decisions,
+                defaults to the process-wide shared cache
+            data_key_cache (DataKeyCache): Optional cache of unwrapped data keys,
+                disabled when None
+            cipher_suite (str): AEAD used for new ciphertexts, defaults to the
+                suite selected at startup
+            key_wrapping (str): Data key wrapping layout for new ciphertexts,
+                'authority' (default) or the legacy 'attribute'
         """
         self.verbose = verbose
         self.backend = default_backend()
+        self.decision_cache = decision_cache if decision_cache is not None else access_decision_cache
+        self.data_key_cache = data_key_cache
+        self._buffer = bytearray()
+        self.cipher_suite = cipher_suite or cipher_suites.get_default_suite()
+        self.key_wrapping = key_wrapping
     
     def _derive_key(self, password, salt):
         """
@@ -49,9 +127,30 @@ class HybridABE:
         )
         return kdf.derive(password)
     
+    def _scratch(self, size):
+        """
+        Get a writable view over a reusable scratch buffer.
+        
+        The buffer grows to the largest size requested and is reused by later
+        calls on the same instance, so it must not be shared between threads.
+        
+        Args:
+            size (int): Minimum number of bytes needed
+            
+        Returns:
+            memoryview: View of exactly `size` bytes
+        """
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        return memoryview(self._buffer)[:size]
+    
     def _encrypt_data(self, data, key):
         """
-        Encrypt data using AES-GCM.
+        Encrypt data using the configured AEAD cipher suite.
+        
+        The ciphertext is written with `update_into` into the reusable scratch
+        buffer and base64-encoded straight from a memoryview, so no full-size
+        intermediate copies are made.
         
         Args:
             data (bytes): The data to encrypt
@@ -61,50 +160,129 @@ class HybridABE:
             dict: A dictionary containing the encrypted data and metadata
         """
         # Generate a random IV
-        iv = os.urandom(12)
+        iv = os.urandom(cipher_suites.NONCE_SIZE)
         
         # Create an encryptor
-        encryptor = Cipher(
-            algorithms.AES(key),
-            modes.GCM(iv),
-            backend=self.backend
-        ).encryptor()
+        encryptor = cipher_suites.encryptor(self.cipher_suite, key, iv)
         
-        # Encrypt the data
-        ciphertext = encryptor.update(data) + encryptor.finalize()
+        # Encrypt the data into the scratch buffer
+        buffer = self._scratch(len(data) + AEAD_BUFFER_PADDING)
+        length = encryptor.update_into(data, buffer)
+        encryptor.finalize()
         
         # Return the encrypted data and metadata
         return {
+            'alg': self.cipher_suite,
             'iv': base64.b64encode(iv).decode('utf-8'),
-            'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
+            'ciphertext': base64.b64encode(buffer[:length]).decode('utf-8'),
             'tag': base64.b64encode(encryptor.tag).decode('utf-8')
         }
     
     def _decrypt_data(self, encrypted_data, key):
         """
-        Decrypt data using AES-GCM.
+        Decrypt data with the cipher suite recorded in the ciphertext.
         
         Args:
             encrypted_data (dict): The encrypted data and metadata
             key (bytes): The decryption key
             
         Returns:
-            bytes: The decrypted data
+            bytearray: The decrypted data
         """
         # Decode the IV, ciphertext, and tag
         iv = base64.b64decode(encrypted_data['iv'])
         ciphertext = base64.b64decode(encrypted_data['ciphertext'])
         tag = base64.b64decode(encrypted_data['tag'])
         
-        # Create a decryptor
-        decryptor = Cipher(
-            algorithms.AES(key),
-            modes.GCM(iv, tag),
-            backend=self.backend
-        ).decryptor()
+        # Create a decryptor, ciphertexts without a suite predate suite selection
+        suite = encrypted_data.get('alg', cipher_suites.LEGACY_SUITE)
+        decryptor = cipher_suites.decryptor(suite, key, iv, tag)
         
-        # Decrypt the data
-        return decryptor.update(ciphertext) + decryptor.finalize()
+        # Decrypt into a single preallocated buffer and trim it in place
+        plaintext = bytearray(len(ciphertext) + AEAD_BUFFER_PADDING)
+        length = decryptor.update_into(ciphertext, plaintext)
+        decryptor.finalize()
+        del plaintext[length:]
+        
+        return plaintext
+    
+    def encrypt_stream(self, gp, pks, input_stream, output_stream, policy_str, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Encrypt a binary stream under an access policy, writing the ciphertext
+        document to another binary stream.
+        
+        The output is the same JSON document `encrypt` produces, but the
+        payload is read, encrypted and base64-encoded one chunk at a time, so
+        memory use stays bounded regardless of the input size.
+        
+        Args:
+            gp (dict): Global parameters
+            pks (dict): Public keys of authorities
+            input_stream: Readable binary stream with the message
+            output_stream: Writable binary stream for the ciphertext document
+            policy_str (str): Access policy string
+            chunk_size (int): Bytes read per chunk, rounded down to a multiple of 3
+            
+        Returns:
+            dict: The ciphertext header (policy and encrypted keys)
+        """
+        # Base64 chunks only concatenate cleanly on 3-byte boundaries
+        chunk_size -= chunk_size % 3
+        
+        # Generate and wrap the data key exactly like encrypt()
+        data_key = os.urandom(32)
+        header = {'policy': policy_str}
+        header.update(self._wrap_data_key(gp, data_key, self.compile_policy(policy_str)))
+        
+        iv = os.urandom(cipher_suites.NONCE_SIZE)
+        encryptor = cipher_suites.encryptor(self.cipher_suite, data_key, iv)
+        
+        # Write the header fields, leaving the object open for the message
+        output_stream.write((
+            json.dumps(header)[:-1] +
+            ', "encrypted_message": {"alg": ' + json.dumps(self.cipher_suite) +
+            ', "iv": "' + base64.b64encode(iv).decode('utf-8') +
+            '", "ciphertext": "'
+        ).encode('utf-8'))
+        
+        # Reuse one input and one output buffer for every chunk
+        chunk = bytearray(chunk_size)
+        chunk_view = memoryview(chunk)
+        buffer = self._scratch(chunk_size + AEAD_BUFFER_PADDING)
+        while True:
+            read = self._read_chunk(input_stream, chunk_view)
+            if not read:
+                break
+            length = encryptor.update_into(chunk_view[:read], buffer)
+            output_stream.write(base64.b64encode(buffer[:length]))
+            if read < chunk_size:
+                break
+        encryptor.finalize()
+        
+        output_stream.write((
+            '", "tag": "' + base64.b64encode(encryptor.tag).decode('utf-8') + '"}}'
+        ).encode('utf-8'))
+        
+        return header
+    
+    def _read_chunk(self, stream, view):
+        """
+        Fill a buffer from a stream, retrying short reads until end of stream.
+        
+        Args:
+            stream: Readable binary stream
+            view (memoryview): Buffer to fill
+            
+        Returns:
+            int: Number of bytes read, less than len(view) only at end of stream
+        """
+        filled = 0
+        while filled < len(view):
+            read = stream.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+        return filled
     
     def setup(self):
         """
@@ -217,7 +395,7 @@ class HybridABE:
             dict: Encrypted message
         """
         # Parse the policy
-        policy = self._parse_policy(policy_str)
+        policy = self.compile_policy(policy_str)
         
         # Generate a random data encryption key
         data_key = os.urandom(32)
@@ -225,7 +403,31 @@ class HybridABE:
         # Encrypt the message with the data key
         encrypted_message = self._encrypt_data(message, data_key)
         
-        # Encrypt the data key for each attribute in the policy
+        ct = {
+            'policy': policy_str,
+            'encrypted_message': encrypted_message
+        }
+        ct.update(self._wrap_data_key(gp, data_key, policy))
+        return ct
+    
+    def _wrap_data_key(self, gp, data_key, policy):
+        """
+        Encrypt the data key for each attribute in a policy.
+        
+        Args:
+            gp (dict): Global parameters
+            data_key (bytes): Data encryption key
+            policy (dict): Structured policy
+            
+        Returns:
+            dict: Ciphertext fields holding the wrapped data keys
+        """
+        if self.key_wrapping == KEY_WRAPPING_AUTHORITY:
+            return {
+                'key_wrapping': KEY_WRAPPING_AUTHORITY,
+                'encrypted_keys': self._wrap_data_key_by_authority(gp, data_key, policy)
+            }
+        
         encrypted_keys = {}
         master_salt = base64.b64decode(gp['master_salt'])
         
@@ -250,13 +452,74 @@ class HybridABE:
             # Encrypt the data key with the attribute key
             encrypted_keys[attr] = self._encrypt_data(data_key, attr_key)
         
-        return {
-            'policy': policy_str,
-            'encrypted_message': encrypted_message,
-            'encrypted_keys': encrypted_keys
-        }
+        return {'encrypted_keys': encrypted_keys}
+    
+    def _wrap_data_key_by_authority(self, gp, data_key, policy):
+        """
+        Wrap the data key under per-authority key-encryption keys.
+        
+        Only one PBKDF2 run is needed per authority in the policy; each
+        attribute's wrapping key is then an HMAC of the authority key, and the
+        data key is wrapped with AES key wrap (RFC 3394), which needs no IV or
+        tag and keeps each header entry to 40 bytes.
+        
+        Args:
+            gp (dict): Global parameters
+            data_key (bytes): Data encryption key
+            policy (dict): Structured policy
+            
+        Returns:
+            dict: Base64 wrapped data keys by authority, then by attribute
+        """
+        encrypted_keys = {}
+        authority_keys = {}
+        
+        for attr in sorted(self._get_attributes_from_policy(policy)):
+            parts = attr.split('@')
+            if len(parts) != 2:
+                raise ValueError(f"Invalid attribute format: {attr}")
+            
+            authority_name = parts[1]
+            if authority_name not in authority_keys:
+                authority_keys[authority_name] = self._derive_authority_kek(gp, authority_name)
+            
+            wrapping_key = self._derive_attribute_wrapping_key(authority_keys[authority_name], attr)
+            wrapped = keywrap.aes_key_wrap(wrapping_key, data_key, backend=self.backend)
+            encrypted_keys.setdefault(authority_name, {})[attr] = base64.b64encode(wrapped).decode('utf-8')
+        
+        return encrypted_keys
+    
+    def _derive_authority_kek(self, gp, authority_name):
+        """
+        Derive the key-encryption key shared by an authority's attributes.
+        
+        Args:
+            gp (dict): Global parameters
+            authority_name (str): Authority name
+            
+        Returns:
+            bytes: Authority key-encryption key
+        """
+        master_salt = base64.b64decode(gp['master_salt'])
+        return self._derive_key(
+            authority_name.encode('utf-8'),
+            master_salt + b'authority:' + authority_name.encode('utf-8')
+        )
+    
+    def _derive_attribute_wrapping_key(self, authority_kek, attr):
+        """
+        Derive an attribute's wrapping key from its authority's key-encryption key.
+        
+        Args:
+            authority_kek (bytes): Authority key-encryption key
+            attr (str): Attribute in 'attribute@authority' format
+            
+        Returns:
+            bytes: 256-bit wrapping key
+        """
+        return hmac.new(authority_kek, attr.encode('utf-8'), hashlib.sha256).digest()
     
-    def decrypt(self, gp, sk, ct):
+    def decrypt(self, gp, sk, ct, document_id=None):
         """
         Decrypt a ciphertext using user's secret keys.
         
@@ -264,28 +527,219 @@ class HybridABE:
             gp (dict): Global parameters
             sk (dict): User's secret keys
             ct (dict): Ciphertext to decrypt
+            document_id (str): Optional identifier of this ciphertext, used to
+                cache the unwrapped data key when a data-key cache is configured.
+                It must change whenever the document is re-encrypted, like the
+                ciphertext filenames EncryptionService generates per encryption.
             
         Returns:
             bytes: Decrypted message
         """
-        # Parse the policy
-        policy = self._parse_policy(ct['policy'])
+        satisfying_attributes = self._get_satisfying_attributes(sk, ct)
+        
+        # Reuse a recently unwrapped data key for the same ciphertext and authorized attributes
+        cache_key, data_key = self._get_cached_data_key(satisfying_attributes, document_id)
+        if data_key is not None:
+            try:
+                return self._decrypt_data(ct['encrypted_message'], data_key)
+            except InvalidTag:
+                # A reused identifier with a new key; unwrap it and replace the entry
+                pass
+        
+        data_key = self._unwrap_data_key(gp, sk, ct, satisfying_attributes)
+        if cache_key is not None:
+            self.data_key_cache.put(document_id, cache_key, data_key)
+        
+        # Decrypt the message
+        return self._decrypt_data(ct['encrypted_message'], data_key)
+    
+    def decrypt_stream(self, gp, sk, input_stream, output_stream, document_id=None, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Decrypt a ciphertext document from a seekable binary stream, writing
+        the message to another binary stream.
+        
+        Accepts the documents both `encrypt` and `encrypt_stream` produce.
+        Only the fields around the payload are parsed as JSON; the base64
+        payload is decoded and decrypted one chunk at a time into a reused
+        buffer, so memory use stays bounded regardless of the document size.
+        
+        The tag is only checked after the whole payload has been written, so
+        the output must be discarded if this raises. When a cached data key
+        turns out to be stale the output stream is rewound and truncated, so
+        it must be seekable when a data-key cache is configured.
+        
+        Args:
+            gp (dict): Global parameters
+            sk (dict): User's secret keys
+            input_stream: Seekable binary stream with the ciphertext document
+            output_stream: Writable binary stream for the message
+            document_id (str): Optional identifier of this ciphertext, see `decrypt`
+            chunk_size (int): Plaintext bytes decrypted per chunk, rounded down to a multiple of 3
+            
+        Returns:
+            int: Number of message bytes written
+            
+        Raises:
+            ValueError: If the stream is not a ciphertext document
+            InvalidTag: If the payload or its tag was tampered with
+        """
+        ct, payload_start, payload_end = self._read_stream_header(input_stream)
+        satisfying_attributes = self._get_satisfying_attributes(sk, ct)
+        
+        cache_key, data_key = self._get_cached_data_key(satisfying_attributes, document_id)
+        if data_key is not None:
+            output_start = output_stream.tell()
+            try:
+                return self._decrypt_payload(ct['encrypted_message'], data_key, input_stream,
+                                             payload_start, payload_end, output_stream, chunk_size)
+            except InvalidTag:
+                # A reused identifier with a new key; discard the output and unwrap it
+                output_stream.seek(output_start)
+                output_stream.truncate()
+        
+        data_key = self._unwrap_data_key(gp, sk, ct, satisfying_attributes)
+        if cache_key is not None:
+            self.data_key_cache.put(document_id, cache_key, data_key)
+        
+        return self._decrypt_payload(ct['encrypted_message'], data_key, input_stream,
+                                     payload_start, payload_end, output_stream, chunk_size)
+    
+    def _read_stream_header(self, stream):
+        """
+        Parse a ciphertext document without its payload.
         
-        # Get the attributes that satisfy the policy
-        user_attributes = set(sk['keys'].keys())
-        satisfying_attributes = self._find_satisfying_attributes(policy, user_attributes)
+        The payload is the encrypted message's base64 ciphertext, which starts
+        within the head of the document and ends within its tail.
+        
+        Args:
+            stream: Seekable binary stream with the ciphertext document
+            
+        Returns:
+            tuple: (ct, payload_start, payload_end) with an empty ciphertext in ct
+                and the payload's byte offsets in the stream
+        """
+        stream.seek(0)
+        head = stream.read(PAYLOAD_SEARCH_SIZE)
+        message = head.find(b'"encrypted_message"')
+        marker = head.find(b'"ciphertext": "', message)
+        if message < 0 or marker < 0:
+            raise ValueError("Not a ciphertext document")
+        payload_start = marker + len(b'"ciphertext": "')
+        
+        # Base64 has no quotes, so the first one after the payload starts ends it
+        tail_offset = max(payload_start, stream.seek(0, os.SEEK_END) - PAYLOAD_SEARCH_SIZE)
+        stream.seek(tail_offset)
+        tail = stream.read(PAYLOAD_SEARCH_SIZE)
+        quote = tail.find(b'"')
+        if quote < 0:
+            raise ValueError("Not a ciphertext document")
+        
+        ct = json.loads(head[:payload_start] + tail[quote:])
+        return ct, payload_start, tail_offset + quote
+    
+    def _decrypt_payload(self, encrypted_message, key, input_stream, start, end, output_stream, chunk_size):
+        """
+        Decrypt a base64 payload from a stream one chunk at a time.
+        
+        Args:
+            encrypted_message (dict): Encrypted message fields, without the ciphertext
+            key (bytes): The data key
+            input_stream: Seekable binary stream holding the payload
+            start (int): Offset of the payload in the stream
+            end (int): Offset just past the payload
+            output_stream: Writable binary stream for the message
+            chunk_size (int): Plaintext bytes per chunk
+            
+        Returns:
+            int: Number of message bytes written
+        """
+        iv = base64.b64decode(encrypted_message['iv'])
+        tag = base64.b64decode(encrypted_message['tag'])
+        suite = encrypted_message.get('alg', cipher_suites.LEGACY_SUITE)
+        decryptor = cipher_suites.decryptor(suite, key, iv, tag)
+        
+        # Whole base64 quanta decode independently of how the payload was written
+        chunk_size -= chunk_size % 3
+        encoded = bytearray(chunk_size // 3 * 4)
+        encoded_view = memoryview(encoded)
+        buffer = self._scratch(chunk_size + AEAD_BUFFER_PADDING)
+        
+        input_stream.seek(start)
+        remaining = end - start
+        written = 0
+        while remaining:
+            read = self._read_chunk(input_stream, encoded_view[:min(remaining, len(encoded))])
+            if not read:
+                raise ValueError("Truncated ciphertext document")
+            remaining -= read
+            # a2b_base64 decodes straight from the buffer, without an intermediate copy
+            length = decryptor.update_into(binascii.a2b_base64(encoded_view[:read]), buffer)
+            output_stream.write(buffer[:length])
+            written += length
+        decryptor.finalize()
+        
+        return written
+    
+    def _get_satisfying_attributes(self, sk, ct):
+        """
+        Get the user's attributes that satisfy a ciphertext's policy.
+        
+        Args:
+            sk (dict): User's secret keys
+            ct (dict): Ciphertext
+            
+        Returns:
+            frozenset: Satisfying attributes
+        """
+        satisfying_attributes = self.find_satisfying_attributes(ct['policy'], sk['keys'].keys())
         
         if not satisfying_attributes:
             raise Exception("User attributes do not satisfy the access policy")
         
+        return satisfying_attributes
+    
+    def _get_cached_data_key(self, satisfying_attributes, document_id):
+        """
+        Look up a recently unwrapped data key.
+        
+        Args:
+            satisfying_attributes (frozenset): Attributes authorizing the decryption
+            document_id (str): Identifier of the ciphertext, or None
+            
+        Returns:
+            tuple: (cache_key, data_key), cache_key None when not caching and
+                data_key None on a miss
+        """
+        if self.data_key_cache is None or document_id is None:
+            return None, None
+        cache_key = self.decision_cache.attribute_set_hash(satisfying_attributes)
+        return cache_key, self.data_key_cache.get(document_id, cache_key)
+    
+    def _unwrap_data_key(self, gp, sk, ct, satisfying_attributes):
+        """
+        Unwrap a ciphertext's data key with the user's secret keys.
+        
+        Args:
+            gp (dict): Global parameters
+            sk (dict): User's secret keys
+            ct (dict): Ciphertext
+            satisfying_attributes (frozenset): Attributes that satisfy its policy
+            
+        Returns:
+            bytes: The data key
+        """
         # Use the first satisfying attribute to decrypt
         attr = next(iter(satisfying_attributes))
+        authority_wrapped = ct.get('key_wrapping') == KEY_WRAPPING_AUTHORITY
         
         # Get the encrypted data key for this attribute
-        if attr not in ct['encrypted_keys']:
-            raise Exception(f"Attribute {attr} not found in ciphertext")
+        if authority_wrapped:
+            encrypted_data_key = ct['encrypted_keys'].get(attr.split('@')[-1], {}).get(attr)
+        else:
+            encrypted_data_key = ct['encrypted_keys'].get(attr)
         
-        encrypted_data_key = ct['encrypted_keys'][attr]
+        if encrypted_data_key is None:
+            raise Exception(f"Attribute {attr} not found in ciphertext")
         
         # Get the user's key for this attribute
         user_attr_key_data = sk['keys'][attr]
@@ -300,6 +754,18 @@ class HybridABE:
             authority_key
         )
         
+        if authority_wrapped:
+            # Derive the authority key-encryption key, then the attribute's wrapping key
+            authority_kek = self._derive_authority_kek(gp, attr.split('@')[-1])
+            wrapping_key = self._derive_attribute_wrapping_key(authority_kek, attr)
+            
+            # Unwrap the data key
+            return keywrap.aes_key_unwrap(
+                wrapping_key,
+                base64.b64decode(encrypted_data_key),
+                backend=self.backend
+            )
+        
         # Derive the attribute key
         master_salt = base64.b64decode(gp['master_salt'])
         attribute_salt = attr.encode('utf-8')
@@ -311,10 +777,59 @@ class HybridABE:
         )
         
         # Decrypt the data key
-        data_key = self._decrypt_data(encrypted_data_key, attr_key)
+        return bytes(self._decrypt_data(encrypted_data_key, attr_key))
+    
+    def compile_policy(self, policy_str):
+        """
+        Parse a policy string, reusing the shared compiled-policy cache.
         
-        # Decrypt the message
-        return self._decrypt_data(ct['encrypted_message'], data_key)
+        Args:
+            policy_str (str): Policy string
+            
+        Returns:
+            dict: Structured policy
+        """
+        return self._compiled_policy(policy_str)[0]
+    
+    def find_satisfying_attributes(self, policy_str, user_attributes):
+        """
+        Find attributes that satisfy a policy, using the access-decision cache.
+        
+        Args:
+            policy_str (str): Policy string
+            user_attributes (iterable): User's attributes in 'attribute@authority' format
+            
+        Returns:
+            frozenset: Satisfying attributes, empty if access is denied
+        """
+        user_attributes = frozenset(user_attributes)
+        policy, policy_hash = self._compiled_policy(policy_str)
+        
+        attribute_hash = self.decision_cache.attribute_set_hash(user_attributes)
+        decision = self.decision_cache.get(attribute_hash, policy_hash)
+        if decision is None:
+            decision = self.decision_cache.put(
+                attribute_hash,
+                policy_hash,
+                user_attributes,
+                self._find_satisfying_attributes(policy, user_attributes)
+            )
+        return decision
+    
+    def _compiled_policy(self, policy_str):
+        """
+        Get a compiled policy and its hash from the shared cache.
+        
+        Args:
+            policy_str (str): Policy string
+            
+        Returns:
+            tuple: (policy, policy_hash)
+        """
+        entry = self.decision_cache.get_policy(policy_str)
+        if entry is None:
+            entry = self.decision_cache.put_policy(policy_str, self._parse_policy(policy_str))
+        return entry
     
     def _parse_policy(self, policy_str):
         """
@@ -492,9 +1007,8 @@ class HybridABE:
                 }
             
             # For testing purposes, we'll just check if the policy is satisfied
-            policy = self._parse_policy(encrypted_data['policy'])
             user_attr_set = set(attr.name + '@' + attr.authority_name for attr in user_attributes)
-            satisfying_attributes = self._find_satisfying_attributes(policy, user_attr_set)
+            satisfying_attributes = self.find_satisfying_attributes(encrypted_data['policy'], user_attr_set)
             
             if not satisfying_attributes:
                 if self.verbose:
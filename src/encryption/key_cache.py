@@ -0,0 +1,99 @@
+"""
+Unwrapped data-key cache for repeated decryption of hot documents.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+class DataKeyCache:
+    """
+    Memory-only cache of unwrapped per-document data keys.
+
+    Keys are stored under (ciphertext, authorized attribute set) with a short
+    time-to-live and a bounded number of entries, so a repeat decrypt by the
+    same team only costs the symmetric pass over the payload. Nothing is
+    ever written to disk.
+
+    There is no per-document invalidation: every encryption writes a new
+    ciphertext under a new name, so a re-encrypted document is never looked
+    up under its old entry, which simply expires.
+    """
+
+    def __init__(self, ttl=300, max_entries=256):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an unwrapped key stays usable
+            max_entries (int): Maximum number of cached keys
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, ttl=None, max_entries=None):
+        """
+        Update the cache limits and drop any cached keys.
+
+        Args:
+            ttl (float): Seconds an unwrapped key stays usable
+            max_entries (int): Maximum number of cached keys
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._entries.clear()
+
+    def get(self, document_id, attribute_hash):
+        """
+        Get a cached data key.
+
+        Args:
+            document_id (str): Identifier of the ciphertext, unique per encryption
+            attribute_hash (str): Hash of the attribute set that authorized access
+
+        Returns:
+            bytes: The data key, or None if missing or expired
+        """
+        key = (document_id, attribute_hash)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, document_id, attribute_hash, data_key):
+        """
+        Cache a data key.
+
+        Args:
+            document_id (str): Identifier of the ciphertext, unique per encryption
+            attribute_hash (str): Hash of the attribute set that authorized access
+            data_key (bytes): Unwrapped data key
+        """
+        key = (document_id, attribute_hash)
+        with self._lock:
+            self._entries[key] = (data_key, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached keys."""
+        with self._lock:
+            self._entries.clear()
+
+# Shared cache, only used when DATA_KEY_CACHE_ENABLED is set
+data_key_cache = DataKeyCache()
@@ -0,0 +1,269 @@
+"""
+Merkle trees of per-chunk hashes for partial and incremental signature verification.
+"""
+
+import os
+import struct
+import hashlib
+
+# Default bytes per leaf chunk
+MERKLE_CHUNK_SIZE = 64 * 1024
+
+# Prefix of the digest algorithm recorded in signature containers, followed by the chunk size
+MERKLE_DIGEST_PREFIX = 'merkle-sha256/'
+
+MERKLE_EXTENSION = '.merkle'
+
+# Tree file layout (big-endian): magic (4) | chunk size (u32) | document size (u64)
+# | leaf count (u32) | leaf hashes (32 bytes each)
+_MAGIC = b'SDMT'
+_HEADER = struct.Struct('>4sIQI')
+
+# Domain separation keeps a leaf hash from ever equalling an inner node hash
+_LEAF_PREFIX = b'\x00'
+_NODE_PREFIX = b'\x01'
+
+def hash_leaf(chunk):
+    """Hash one chunk of the document."""
+    return hashlib.sha256(_LEAF_PREFIX + chunk).digest()
+
+def hash_node(left, right):
+    """Hash two child hashes into their parent."""
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+def digest_algorithm(chunk_size):
+    """
+    Get the digest algorithm name recorded for a Merkle-signed document.
+
+    Args:
+        chunk_size (int): Bytes per leaf chunk
+
+    Returns:
+        str: e.g. 'merkle-sha256/65536'
+    """
+    return f"{MERKLE_DIGEST_PREFIX}{chunk_size}"
+
+def parse_digest_algorithm(name):
+    """
+    Get the chunk size from a Merkle digest algorithm name.
+
+    Args:
+        name (str): Digest algorithm name
+
+    Returns:
+        int: Chunk size, or None if the name is not a Merkle digest
+    """
+    if not name or not name.startswith(MERKLE_DIGEST_PREFIX):
+        return None
+    return int(name[len(MERKLE_DIGEST_PREFIX):])
+
+def tree_filename(signature_filename):
+    """
+    Get the name of the tree file stored next to a signature file.
+
+    Args:
+        signature_filename (str): Signature file name or path
+
+    Returns:
+        str: Tree file name or path
+    """
+    return os.path.splitext(signature_filename)[0] + MERKLE_EXTENSION
+
+class MerkleTree:
+    """
+    Binary Merkle tree over fixed-size chunks of a document.
+
+    Every level is kept in memory, so the root, a proof for any chunk and
+    the update of a single chunk all cost O(log n) hashes. An odd node at
+    the end of a level is promoted to the next level unchanged.
+    """
+
+    def __init__(self, leaves, chunk_size=MERKLE_CHUNK_SIZE, size=0):
+        """
+        Build the tree from leaf hashes.
+
+        Args:
+            leaves (list): Leaf hashes, one per chunk
+            chunk_size (int): Bytes per chunk
+            size (int): Document size in bytes
+        """
+        self.chunk_size = chunk_size
+        self.size = size
+        self.levels = [list(leaves) or [hash_leaf(b'')]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([
+                hash_node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ])
+
+    @classmethod
+    def from_stream(cls, stream, chunk_size=MERKLE_CHUNK_SIZE):
+        """
+        Build a tree by reading a stream one chunk at a time.
+
+        Args:
+            stream: Binary file-like object
+            chunk_size (int): Bytes per chunk
+
+        Returns:
+            MerkleTree: The tree
+        """
+        leaves = []
+        size = 0
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            leaves.append(hash_leaf(chunk))
+            size += len(chunk)
+        return cls(leaves, chunk_size, size)
+
+    @classmethod
+    def from_file(cls, file_path, chunk_size=MERKLE_CHUNK_SIZE):
+        """
+        Build a tree over a file.
+
+        Args:
+            file_path (str): Path to the file
+            chunk_size (int): Bytes per chunk
+
+        Returns:
+            MerkleTree: The tree
+        """
+        with open(file_path, 'rb') as f:
+            return cls.from_stream(f, chunk_size)
+
+    @property
+    def root(self):
+        """Root hash, the value that gets signed."""
+        return self.levels[-1][0]
+
+    @property
+    def leaves(self):
+        """Leaf hashes."""
+        return self.levels[0]
+
+    def chunk_range(self, start, end):
+        """
+        Get the indexes of the chunks covering a byte range.
+
+        Args:
+            start (int): First byte
+            end (int): Byte after the last one
+
+        Returns:
+            range: Chunk indexes
+        """
+        if start < 0 or end > self.size or start >= end:
+            raise ValueError(f"Invalid byte range {start}-{end} for {self.size} bytes")
+        return range(start // self.chunk_size, (end - 1) // self.chunk_size + 1)
+
+    def proof(self, index):
+        """
+        Get the sibling hashes proving one chunk against the root.
+
+        Args:
+            index (int): Chunk index
+
+        Returns:
+            list: (sibling hash, sibling_is_left) pairs from the leaf upwards
+        """
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling], sibling < index))
+            index //= 2
+        return path
+
+    def update_leaf(self, index, chunk):
+        """
+        Replace one chunk's hash and recompute its path to the root.
+
+        Args:
+            index (int): Chunk index
+            chunk (bytes): New chunk content
+        """
+        self.levels[0][index] = hash_leaf(chunk)
+        for depth in range(1, len(self.levels)):
+            child = self.levels[depth - 1]
+            index //= 2
+            left = 2 * index
+            self.levels[depth][index] = hash_node(child[left], child[left + 1]) \
+                if left + 1 < len(child) else child[left]
+
+    def to_bytes(self):
+        """
+        Serialize the tree; only the leaves are stored.
+
+        Returns:
+            bytes: Tree file content
+        """
+        return _HEADER.pack(_MAGIC, self.chunk_size, self.size, len(self.leaves)) + b''.join(self.leaves)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a serialized tree, rebuilding the inner levels from the leaves.
+
+        Args:
+            data (bytes): Tree file content
+
+        Returns:
+            MerkleTree: The tree
+
+        Raises:
+            ValueError: If the data is not a valid tree file
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated Merkle tree")
+        magic, chunk_size, size, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or len(data) != _HEADER.size + 32 * count:
+            raise ValueError("Invalid Merkle tree")
+        leaves = [data[_HEADER.size + 32 * i:_HEADER.size + 32 * (i + 1)] for i in range(count)]
+        return cls(leaves, chunk_size, size)
+
+    def save(self, file_path):
+        """Write the tree to a file."""
+        with open(file_path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    def save_leaves(self, file_path, indexes):
+        """
+        Rewrite only some leaf hashes of a tree file saved with the same shape.
+
+        Args:
+            file_path (str): Path to the tree file
+            indexes (iterable): Indexes of the leaves to write
+
+        Raises:
+            ValueError: If the file holds a tree of another shape
+        """
+        with open(file_path, 'r+b') as f:
+            magic, chunk_size, _, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or chunk_size != self.chunk_size or count != len(self.leaves):
+                raise ValueError("Merkle tree file does not match the tree")
+            for index in sorted(indexes):
+                f.seek(_HEADER.size + 32 * index)
+                f.write(self.leaves[index])
+
+    @classmethod
+    def load(cls, file_path):
+        """Read a tree from a file."""
+        with open(file_path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def verify_proof(chunk, proof, root):
+    """
+    Check one chunk against a signed root without the rest of the document.
+
+    Args:
+        chunk (bytes): Chunk content
+        proof (list): Result of MerkleTree.proof for the chunk
+        root (bytes): Signed root hash
+
+    Returns:
+        bool: True if the chunk belongs to the tree
+    """
+    node = hash_leaf(chunk)
+    for sibling, sibling_is_left in proof:
+        node = hash_node(sibling, node) if sibling_is_left else hash_node(node, sibling)
+    return node == root
@@ -0,0 +1,98 @@
+"""
+Parsed public key cache for signature verification.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+def key_fingerprint(public_key_pem):
+    """
+    Compute the fingerprint of a PEM-encoded public key.
+
+    Args:
+        public_key_pem (str): Public key in PEM format
+
+    Returns:
+        str: SHA-256 hex digest of the PEM text, ignoring surrounding whitespace
+    """
+    return hashlib.sha256(public_key_pem.strip().encode('utf-8')).hexdigest()
+
+class PublicKeyCache:
+    """
+    LRU cache of loaded public key objects keyed by key fingerprint.
+
+    Parsing PEM/DER and validating a key costs far more than a verification
+    against an already-loaded key, and verification traffic is dominated by
+    a handful of signers.
+    """
+
+    def __init__(self, max_entries=1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached key objects
+        """
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, public_key_pem, loader):
+        """
+        Get a key object, loading and caching it on a miss.
+
+        Args:
+            public_key_pem (str): Public key in PEM format
+            loader (callable): Function parsing the PEM into a key object
+
+        Returns:
+            object: Loaded public key
+        """
+        fingerprint = key_fingerprint(public_key_pem)
+        with self._lock:
+            key = self._keys.get(fingerprint)
+            if key is not None:
+                self._keys.move_to_end(fingerprint)
+                self.hits += 1
+                return key
+            self.misses += 1
+
+        # Parse outside the lock, concurrent misses for one key are harmless
+        key = loader(public_key_pem)
+        with self._lock:
+            self._keys[fingerprint] = key
+            self._keys.move_to_end(fingerprint)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+        return key
+
+    def invalidate(self, public_key_pem):
+        """
+        Drop a key from the cache.
+
+        Args:
+            public_key_pem (str): Public key in PEM format
+        """
+        with self._lock:
+            self._keys.pop(key_fingerprint(public_key_pem), None)
+
+    def clear(self):
+        """Drop all cached keys."""
+        with self._lock:
+            self._keys.clear()
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Entry count, hits and misses
+        """
+        with self._lock:
+            return {'entries': len(self._keys), 'hits': self.hits, 'misses': self.misses}
+
+# Shared cache used by every DigitalSignature instance in the process
+public_key_cache = PublicKeyCache()
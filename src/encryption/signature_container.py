@@ -0,0 +1,165 @@
+"""
+Compact binary container for detached document signatures.
+"""
+
+import struct
+from datetime import datetime, timezone
+
+# Layout (big-endian):
+#   magic (4) | version (1) | timestamp, microseconds since the epoch UTC (8)
+#   algorithm (u8 length + ASCII) | digest (u8 length + bytes)
+#   digest algorithm (u8 length + ASCII, version 2 and later)
+#   key fingerprint (u8 length + bytes) | signer (u16 length + UTF-8)
+#   document (u16 length + UTF-8) | signature (u16 length + bytes)
+MAGIC = b'SDSG'
+VERSION = 2
+
+# Version 1 containers have no digest algorithm field and always hold a plain SHA-256
+DEFAULT_DIGEST_ALGORITHM = 'sha256'
+
+CONTAINER_EXTENSION = '.sigc'
+
+# Upper bound of a container; one read of this size always gets a whole file
+MAX_CONTAINER_SIZE = 16 * 1024
+
+_HEADER = struct.Struct('>4sBq')
+
+def pack_signature(signature, digest, algorithm, key_fingerprint, signer_id, document, timestamp=None,
+                   digest_algorithm=DEFAULT_DIGEST_ALGORITHM):
+    """
+    Serialize a signature and its metadata into a container.
+
+    Args:
+        signature (bytes): Digital signature
+        digest (bytes): Signed digest of the document
+        algorithm (str): Signature algorithm name, e.g. 'rsa-pss-sha256'
+        key_fingerprint (str): Hex fingerprint of the signer's public key
+        signer_id (str): Signer identifier
+        document (str): Name of the signed document file
+        timestamp (datetime): Signing time, defaults to now
+        digest_algorithm (str): How the digest was computed, 'sha256' or a
+            Merkle root such as 'merkle-sha256/65536'
+
+    Returns:
+        bytes: Container bytes
+    """
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    micros = int(timestamp.timestamp() * 1_000_000)
+
+    return b''.join([
+        _HEADER.pack(MAGIC, VERSION, micros),
+        _pack_field(algorithm.encode('ascii'), '>B'),
+        _pack_field(digest, '>B'),
+        _pack_field(digest_algorithm.encode('ascii'), '>B'),
+        _pack_field(bytes.fromhex(key_fingerprint), '>B'),
+        _pack_field(str(signer_id).encode('utf-8'), '>H'),
+        _pack_field(document.encode('utf-8'), '>H'),
+        _pack_field(signature, '>H')
+    ])
+
+def unpack_signature(data):
+    """
+    Parse a container.
+
+    Args:
+        data (bytes): Container bytes
+
+    Returns:
+        dict: signature, digest (bytes), digest_algorithm, algorithm,
+            key_fingerprint (hex), signer_id, document and timestamp (ISO 8601 string)
+
+    Raises:
+        ValueError: If the data is not a valid container
+    """
+    if not is_container(data):
+        raise ValueError("Not a signature container")
+    try:
+        _, version, micros = _HEADER.unpack_from(data, 0)
+        if version not in (1, VERSION):
+            raise ValueError(f"Unsupported signature container version: {version}")
+
+        offset = _HEADER.size
+        algorithm, offset = _unpack_field(data, offset, '>B')
+        digest, offset = _unpack_field(data, offset, '>B')
+        digest_algorithm = DEFAULT_DIGEST_ALGORITHM.encode('ascii')
+        if version >= 2:
+            digest_algorithm, offset = _unpack_field(data, offset, '>B')
+        fingerprint, offset = _unpack_field(data, offset, '>B')
+        signer_id, offset = _unpack_field(data, offset, '>H')
+        document, offset = _unpack_field(data, offset, '>H')
+        signature, offset = _unpack_field(data, offset, '>H')
+    except struct.error:
+        raise ValueError("Truncated signature container")
+
+    timestamp = datetime.fromtimestamp(micros / 1_000_000, tz=timezone.utc)
+    return {
+        'signature': signature,
+        'digest': digest,
+        'digest_algorithm': digest_algorithm.decode('ascii'),
+        'algorithm': algorithm.decode('ascii'),
+        'key_fingerprint': fingerprint.hex(),
+        'signer_id': signer_id.decode('utf-8'),
+        'document': document.decode('utf-8'),
+        'timestamp': timestamp.isoformat()
+    }
+
+def is_container(data):
+    """
+    Check whether bytes start with the container magic.
+
+    Args:
+        data (bytes): File content or its first bytes
+
+    Returns:
+        bool: True for a container, False for e.g. a raw legacy signature
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+def write_container(path, **fields):
+    """
+    Write a container file.
+
+    Args:
+        path (str): Destination path
+        **fields: Arguments of pack_signature
+
+    Returns:
+        bytes: The container bytes written
+    """
+    data = pack_signature(**fields)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
+
+def read_signature_file(path):
+    """
+    Read a signature file with a single read, accepting both containers
+    and legacy raw signature files.
+
+    Args:
+        path (str): Path to the signature file
+
+    Returns:
+        dict: Parsed container; for a raw signature only 'signature' is set
+    """
+    with open(path, 'rb') as f:
+        data = f.read(MAX_CONTAINER_SIZE)
+    if is_container(data):
+        return unpack_signature(data)
+    return {'signature': data}
+
+def _pack_field(value, length_format):
+    """Prefix a field with its length."""
+    return struct.pack(length_format, len(value)) + value
+
+def _unpack_field(data, offset, length_format):
+    """Read a length-prefixed field, returning it and the next offset."""
+    (length,) = struct.unpack_from(length_format, data, offset)
+    offset += struct.calcsize(length_format)
+    value = data[offset:offset + length]
+    if len(value) != length:
+        raise struct.error("field extends past the end of the data")
+    return value, offset + length
@@ -6,6 +6,7 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import logging
+import threading
 from flask import Flask, render_template
 from flask_migrate import Migrate
 from src.extensions import db, login_manager
@@ -14,6 +15,9 @@ from src.extensions import db, login_manager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Guards start_services() against concurrent first requests
+_services_lock = threading.Lock()
+
 def create_app(config=None):
     """Create and configure the Flask application."""
     app = Flask(__name__, 
@@ -27,9 +31,108 @@ def create_app(config=None):
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
     
+    # Resumable uploads: each chunk is one request within MAX_CONTENT_LENGTH
+    app.config['RESUMABLE_UPLOAD_MAX_SIZE'] = int(os.environ.get('RESUMABLE_UPLOAD_MAX_SIZE', 10 * 1024 ** 3))  # bytes
+    app.config['RESUMABLE_UPLOAD_CHUNK_SIZE'] = int(os.environ.get('RESUMABLE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # bytes
+    
+    # Opt-in, memory-only cache of unwrapped data keys for hot documents
+    app.config['DATA_KEY_CACHE_ENABLED'] = os.environ.get('DATA_KEY_CACHE_ENABLED', '0') == '1'
+    app.config['DATA_KEY_CACHE_TTL'] = int(os.environ.get('DATA_KEY_CACHE_TTL', 300))  # seconds
+    app.config['DATA_KEY_CACHE_SIZE'] = int(os.environ.get('DATA_KEY_CACHE_SIZE', 256))
+    
+    # Session-scoped signing key unlock
+    app.config['KEY_SESSION_TTL'] = int(os.environ.get('KEY_SESSION_TTL', 900))  # seconds
+    app.config['KEY_SESSION_IDLE_TIMEOUT'] = int(os.environ.get('KEY_SESSION_IDLE_TIMEOUT', 300))  # seconds
+    
+    # Key type for new signature key pairs: 'rsa', 'ecdsa-p256' or 'ed25519'
+    app.config['SIGNATURE_KEY_TYPE'] = os.environ.get('SIGNATURE_KEY_TYPE', 'rsa')
+    
+    # Number of signature key pairs generated ahead of time in the background, 0 disables the pool
+    app.config['KEY_POOL_SIZE'] = int(os.environ.get('KEY_POOL_SIZE', 4))
+    
+    # Documents at least this large are signed as a Merkle tree of chunk hashes, 0 disables
+    app.config['SIGNATURE_MERKLE_MIN_SIZE'] = int(os.environ.get('SIGNATURE_MERKLE_MIN_SIZE', 0))  # bytes
+    app.config['SIGNATURE_MERKLE_CHUNK_SIZE'] = int(os.environ.get('SIGNATURE_MERKLE_CHUNK_SIZE', 64 * 1024))  # bytes
+    
+    # Worker pool size for batch signature verification, None uses the CPU count
+    app.config['SIGNATURE_VERIFY_WORKERS'] = int(os.environ['SIGNATURE_VERIFY_WORKERS']) \
+        if os.environ.get('SIGNATURE_VERIFY_WORKERS') else None
+    
+    # Backend for document content: 'local' keeps it in UPLOAD_FOLDER, 's3' in a shared bucket
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')
+    app.config['STORAGE_S3_BUCKET'] = os.environ.get('STORAGE_S3_BUCKET')
+    app.config['STORAGE_S3_PREFIX'] = os.environ.get('STORAGE_S3_PREFIX', '')
+    app.config['STORAGE_S3_ENDPOINT_URL'] = os.environ.get('STORAGE_S3_ENDPOINT_URL')  # e.g. a MinIO server
+    app.config['STORAGE_S3_REGION'] = os.environ.get('STORAGE_S3_REGION')
+    # Node-local copies of objects for code that needs a file path, defaults to UPLOAD_FOLDER/cache
+    app.config['STORAGE_CACHE_FOLDER'] = os.environ.get('STORAGE_CACHE_FOLDER')
+    
+    # Background collection of unreferenced upload artifacts, 0 disables it
+    app.config['GC_INTERVAL'] = int(os.environ.get('GC_INTERVAL', 3600))  # seconds
+    app.config['GC_BATCH_SIZE'] = int(os.environ.get('GC_BATCH_SIZE', 500))  # files per database query
+    # 'delete' removes collected files, 'quarantine' moves them to UPLOAD_FOLDER/quarantine first
+    app.config['GC_MODE'] = os.environ.get('GC_MODE', 'delete')
+    app.config['GC_TTL_TEMP'] = int(os.environ.get('GC_TTL_TEMP', 3600))  # seconds
+    app.config['GC_TTL_DECRYPTED'] = int(os.environ.get('GC_TTL_DECRYPTED', 3600))  # seconds
+    app.config['GC_TTL_ORPHAN'] = int(os.environ.get('GC_TTL_ORPHAN', 86400))  # seconds
+    app.config['GC_TTL_USER_KEYS'] = int(os.environ.get('GC_TTL_USER_KEYS', 86400))  # seconds
+    app.config['GC_TTL_UPLOAD_SESSION'] = int(os.environ.get('GC_TTL_UPLOAD_SESSION', 86400))  # seconds
+    app.config['GC_TTL_CACHE'] = int(os.environ.get('GC_TTL_CACHE', 86400))  # seconds
+    app.config['GC_TTL_QUARANTINE'] = int(os.environ.get('GC_TTL_QUARANTINE', 7 * 86400))  # seconds
+    
+    # Let the front proxy send local downloads: '' serves them from Python,
+    # 'x-sendfile' for Apache/lighttpd, 'x-accel-redirect' for nginx
+    app.config['DOWNLOAD_OFFLOAD'] = os.environ.get('DOWNLOAD_OFFLOAD', '')
+    # nginx internal location aliased to UPLOAD_FOLDER, used with 'x-accel-redirect'
+    app.config['DOWNLOAD_ACCEL_REDIRECT_PREFIX'] = os.environ.get('DOWNLOAD_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+    
+    # AEAD for new ciphertexts: 'auto' benchmarks the suites when the server starts and picks the fastest
+    app.config['CIPHER_SUITE'] = os.environ.get('CIPHER_SUITE', 'auto')
+    
+    if config:
+        app.config.update(config)
+    
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Create the storage backend
+    from src.storage import init_storage
+    init_storage(app)
+    
+    # Select the cipher suite; 'auto' keeps the built-in default until start_services() benchmarks
+    from src.encryption import cipher_suites
+    if app.config['CIPHER_SUITE'] != 'auto':
+        cipher_suites.set_default_suite(app.config['CIPHER_SUITE'])
+    
+    # Apply cache limits
+    from src.encryption.key_cache import data_key_cache
+    data_key_cache.configure(
+        ttl=app.config['DATA_KEY_CACHE_TTL'],
+        max_entries=app.config['DATA_KEY_CACHE_SIZE']
+    )
+    
+    from src.services.key_session_store import key_session_store
+    key_session_store.configure(
+        ttl=app.config['KEY_SESSION_TTL'],
+        idle_timeout=app.config['KEY_SESSION_IDLE_TIMEOUT']
+    )
+    
+    # Size the key pair pool; start_services() starts refilling it
+    from src.services.key_pool import key_pair_pool
+    key_pair_pool.configure(
+        depth=app.config['KEY_POOL_SIZE'],
+        key_type=app.config['SIGNATURE_KEY_TYPE']
+    )
+    
+    # Configure the upload GC; start_services() starts its thread
+    from src.services.upload_gc import upload_gc, DEFAULT_TTLS
+    upload_gc.configure(
+        interval=app.config['GC_INTERVAL'],
+        batch_size=app.config['GC_BATCH_SIZE'],
+        ttls={rule: app.config[f'GC_TTL_{rule.upper()}'] for rule in DEFAULT_TTLS},
+        quarantine=app.config['GC_MODE'] == 'quarantine'
+    )
+    
     # Initialize extensions with the app
     db.init_app(app)
     login_manager.init_app(app)
@@ -70,6 +173,13 @@ def create_app(config=None):
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
+    # WSGI servers import the app rather than running this module, so start
+    # the services with the first request; scripts never pay for them
+    @app.before_request
+    def ensure_services_started():
+        """Start the background services before serving the first request."""
+        start_services(app)
+    
     # Register routes
     @app.route('/')
     def index():
@@ -83,6 +193,34 @@ def create_app(config=None):
     
     return app
 
+def start_services(app):
+    """
+    Start the work only a serving process needs: the cipher suite benchmark,
+    the key pair pool's refill thread and the upload GC thread.
+    
+    Runs once per application; later calls return immediately.
+    
+    Args:
+        app: Flask application
+    """
+    with _services_lock:
+        if app.extensions.get('services_started'):
+            return
+        app.extensions['services_started'] = True
+    
+    # Benchmark the cipher suites and make the fastest the default
+    if app.config['CIPHER_SUITE'] == 'auto':
+        from src.encryption import cipher_suites
+        cipher_suites.select_fastest_suite()
+    
+    # Start refilling the key pair pool
+    from src.services.key_pool import key_pair_pool
+    key_pair_pool.start()
+    
+    # Start collecting unreferenced upload artifacts
+    from src.services.upload_gc import upload_gc
+    upload_gc.start(app)
+
 # Create the application instance
 app = create_app()
 
@@ -94,4 +232,5 @@ def create_tables():
 
 if __name__ == '__main__':
     create_tables()
+    start_services(app)
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
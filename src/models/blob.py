@@ -0,0 +1,22 @@
+"""
+Blob model for the web application.
+"""
+
+from datetime import datetime
+from src.extensions import db
+
+class Blob(db.Model):
+    """
+    Content-addressed file in the upload folder, shared by every document
+    with the same content.
+
+    The file is named after its SHA-256 digest and never modified; it is
+    deleted when the last document referencing it is deleted.
+    """
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 hex, also the file name
+    size = db.Column(db.Integer, nullable=False)  # Size in bytes
+    ref_count = db.Column(db.Integer, nullable=False, default=1)  # Documents referencing the blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Blob {self.digest[:12]} refs={self.ref_count}>'
@@ -3,8 +3,9 @@ Document model for the web application.
 """
 
 from datetime import datetime
-import os
 from src.extensions import db
+from src.storage import get_storage, fetch_file
+from src.utils.file_utils import artifact_kind, storage_key, KIND_BLOBS
 
 class Document(db.Model):
     """Document model for storing file information."""
@@ -13,6 +14,7 @@ class Document(db.Model):
     original_filename = db.Column(db.String(256), nullable=False)
     file_type = db.Column(db.String(64))
     file_size = db.Column(db.Integer)  # Size in bytes
+    digest = db.Column(db.String(64), index=True, nullable=True)  # SHA-256 hex of the content
     
     # Document type and status
     doc_type = db.Column(db.String(20))  # 'original', 'encrypted', 'signed'
@@ -45,16 +47,35 @@ class Document(db.Model):
         return f'<Document {self.original_filename}>'
     
     def get_file_path(self):
-        """Get the full path to the document file."""
-        from src.main import app
-        return os.path.join(app.config['UPLOAD_FOLDER'], self.filename)
+        """
+        Get the full path to the document file; for content in a remote
+        storage backend, a local copy is fetched first.
+        """
+        if self.is_blob():
+            return get_storage().local_path(self.get_storage_key())
+        return fetch_file(self.filename)
+    
+    def is_blob(self):
+        """Check whether the content is a blob in the storage backend."""
+        return bool(self.filename) and artifact_kind(self.filename) == KIND_BLOBS
+    
+    def get_storage_key(self):
+        """Get the storage backend key of a blob document, or None for other documents."""
+        return storage_key(self.filename, KIND_BLOBS) if self.is_blob() else None
     
     def get_signature_path(self):
-        """Get the full path to the signature file if it exists."""
+        """Get the full path to the signature file, fetched from a remote storage backend if needed."""
         if not self.signature_file:
             return None
-        from src.main import app
-        return os.path.join(app.config['UPLOAD_FOLDER'], self.signature_file)
+        return fetch_file(self.signature_file)
+    
+    def has_content(self):
+        """Check whether the content is stored; it is not for plaintext encrypted on upload."""
+        return bool(self.filename)
+    
+    def get_digest(self):
+        """Get the stored SHA-256 digest as bytes, or None if not computed yet."""
+        return bytes.fromhex(self.digest) if self.digest else None
     
     def to_dict(self):
         """Convert document to dictionary."""
@@ -63,6 +84,7 @@ class Document(db.Model):
             'original_filename': self.original_filename,
             'file_type': self.file_type,
             'file_size': self.file_size,
+            'digest': self.digest,
             'doc_type': self.doc_type,
             'encryption_method': self.encryption_method,
             'access_policy': self.access_policy,
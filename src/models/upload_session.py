@@ -0,0 +1,44 @@
+"""
+Upload session model for the web application.
+"""
+
+from datetime import datetime
+from src.extensions import db
+
+class UploadSession(db.Model):
+    """
+    Server-side state of a resumable upload.
+
+    The bytes received so far are kept in a partial file in the upload
+    folder; 'received' is the offset the next chunk must start at.
+    """
+    id = db.Column(db.String(32), primary_key=True)  # Random hex token
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(256), nullable=False)  # Original filename
+    content_type = db.Column(db.String(128), nullable=True)
+    size = db.Column(db.BigInteger, nullable=True)  # Declared total size, None if unknown
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # Bytes received so far
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received}/{self.size}>'
+
+    @property
+    def part_filename(self):
+        """Name of the partial file holding the bytes received so far."""
+        return f"upload_{self.id}.part"
+
+    def to_dict(self):
+        """Convert upload session to dictionary."""
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'offset': self.received,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
@@ -7,6 +7,7 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from src.extensions import db  # Import từ extensions thay vì main
+from src.encryption.access_cache import access_decision_cache
 
 # Association table for user attributes
 user_attributes = db.Table('user_attributes',
@@ -54,6 +55,8 @@ class User(UserMixin, db.Model):
             db.session.add(attr)
         
         if attr not in self.attributes:
+            # Cached policy decisions for the old attribute set no longer apply to this user
+            access_decision_cache.invalidate_attributes(self.get_attributes_list())
             self.attributes.append(attr)
     
     def has_attribute(self, attribute_name, authority_name):
@@ -0,0 +1,29 @@
+"""
+Verification result model for the web application.
+"""
+
+from datetime import datetime
+from src.extensions import db
+
+class VerificationResult(db.Model):
+    """
+    Cached outcome of a signature verification.
+
+    The key covers everything the outcome depends on: the document content,
+    the signature bytes and the signer's public key. Changing any of them
+    produces a different key, so stale results are never returned.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    document_digest = db.Column(db.String(64), nullable=False)  # SHA-256 hex of the document
+    signature_digest = db.Column(db.String(64), nullable=False)  # SHA-256 hex of the signature
+    key_fingerprint = db.Column(db.String(64), nullable=False)  # SHA-256 hex of the public key PEM
+    valid = db.Column(db.Boolean, nullable=False)
+    verified_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('document_digest', 'signature_digest', 'key_fingerprint',
+                            name='_verification_key_uc'),
+    )
+
+    def __repr__(self):
+        return f'<VerificationResult {self.document_digest[:12]} valid={self.valid}>'
@@ -2,7 +2,7 @@
 Authentication routes for the web application.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, session
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 # Fix for Werkzeug import error - use urllib.parse instead of werkzeug.urls
@@ -162,6 +162,11 @@ def register():
 @login_required
 def logout():
     """Handle user logout."""
+    # Wipe the signing key unlocked in this session, leaving the user's other sessions alone
+    token = session.pop('key_session_id', None)
+    if token:
+        SignatureService().lock_private_key(current_user.id, token)
+    
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
@@ -2,12 +2,17 @@
 Document routes for the web application.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import current_user, login_required
-import os
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge, HTTPException
+from urllib.parse import unquote
 from src.models.document import Document
 from src.services.document_service import DocumentService
-from src.utils.file_utils import allowed_file, get_file_path
+from src.services.upload_service import UploadService
+from src.services.encryption_service import EncryptionService
+from src.utils.file_utils import allowed_file
+from src.utils.download_utils import send_stored_file
 from src.extensions import db
 
 document_bp = Blueprint('document', __name__)
@@ -35,7 +40,8 @@ def upload():
         try:
             # Save document
             document_service = DocumentService(db)
-            document = document_service.save_document(file, current_user.id)
+            document = document_service.save_document(file, current_user.id,
+                                                      max_size=current_app.config['MAX_CONTENT_LENGTH'])
             
             flash('File uploaded successfully', 'success')
             return redirect(url_for('document.list'))
@@ -47,6 +53,174 @@ def upload():
     
     return render_template('document/upload.html', title='Upload Document')
 
+@document_bp.route('/upload-stream', methods=['POST', 'PUT'])
+@login_required
+def upload_stream():
+    """
+    Upload a document sent as the raw request body.
+    
+    The body is read once, in chunks, while it is hashed, counted and
+    written, without multipart parsing or a spooled copy. The original
+    filename comes from the 'X-Filename' header or the 'filename' query
+    parameter, the type from the Content-Type header.
+    """
+    filename = unquote(request.headers.get('X-Filename') or request.args.get('filename') or '')
+    
+    if not filename:
+        return jsonify({'error': 'A filename is required'}), 400
+    
+    if not allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    # Without a length, the body is only readable if the server ended it, e.g. chunked encoding
+    if not request.content_length and not request.environ.get('wsgi.input_terminated'):
+        return jsonify({'error': 'A request body with a Content-Length is required'}), 411
+    
+    # Reject a declared oversized body before reading any of it
+    max_size = current_app.config['MAX_CONTENT_LENGTH']
+    if max_size is not None and request.content_length is not None and request.content_length > max_size:
+        return jsonify({'error': f'Upload exceeds {max_size} bytes'}), 413
+    
+    file = FileStorage(
+        stream=request.stream,
+        filename=filename,
+        content_type=request.mimetype if request.content_type else None
+    )
+    
+    try:
+        document = DocumentService(db).save_document(file, current_user.id, max_size=max_size)
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload exceeds {max_size} bytes'}), 413
+    except Exception as e:
+        current_app.logger.error(f"Upload error: {str(e)}")
+        return jsonify({'error': 'Upload failed'}), 500
+    
+    return jsonify(document.to_dict()), 201
+
+@document_bp.route('/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """
+    Open a resumable upload.
+    
+    Accepts a JSON body with 'filename' and optionally 'size' (total bytes)
+    and 'content_type'. Chunks are then PUT to the returned upload and it
+    is finalized once every byte has arrived.
+    """
+    params = request.get_json(silent=True) or {}
+    filename = params.get('filename')
+    
+    if not filename:
+        return jsonify({'error': 'A filename is required'}), 400
+    
+    if not allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    size = params.get('size')
+    if size is not None and (not isinstance(size, int) or size < 0):
+        return jsonify({'error': 'size must be a non-negative integer'}), 400
+    
+    try:
+        upload = UploadService(db).create_upload(current_user.id, filename, size, params.get('content_type'))
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    
+    result = upload.to_dict()
+    result['chunk_size'] = current_app.config['RESUMABLE_UPLOAD_CHUNK_SIZE']
+    return jsonify(result), 201, {'Upload-Offset': str(upload.received)}
+
+@document_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    """Get the offset a resumable upload continues from."""
+    upload = UploadService(db).get_upload(upload_id, current_user.id)
+    
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    return jsonify(upload.to_dict()), 200, {'Upload-Offset': str(upload.received)}
+
+@document_bp.route('/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    """
+    Append one chunk, sent as the raw request body, to a resumable upload.
+    
+    The chunk's offset comes from the 'Upload-Offset' header or the
+    'offset' query parameter and must equal the upload's current offset;
+    otherwise the response is 409 with the offset to resume from.
+    """
+    upload_service = UploadService(db)
+    upload = upload_service.get_upload(upload_id, current_user.id)
+    
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'An integer offset is required'}), 400
+    
+    if not request.content_length and not request.environ.get('wsgi.input_terminated'):
+        return jsonify({'error': 'A request body with a Content-Length is required'}), 411
+    
+    try:
+        upload_service.write_chunk(upload, offset, request.stream)
+    except HTTPException as e:
+        db.session.rollback()
+        return jsonify({'error': e.description, 'offset': upload.received}), e.code, \
+            {'Upload-Offset': str(upload.received)}
+    
+    return jsonify(upload.to_dict()), 200, {'Upload-Offset': str(upload.received)}
+
+@document_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    """
+    Turn a complete resumable upload into a document.
+    
+    Accepts a JSON body with an optional 'encrypt' flag, with
+    'access_policy' and 'encryption_method' to encrypt the document
+    instead of storing its plaintext.
+    """
+    upload_service = UploadService(db)
+    upload = upload_service.get_upload(upload_id, current_user.id)
+    
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    params = request.get_json(silent=True) or {}
+    
+    try:
+        document = upload_service.finalize(
+            upload,
+            encrypt=bool(params.get('encrypt')),
+            access_policy=params.get('access_policy'),
+            encryption_method=params.get('encryption_method', 'hybrid')
+        )
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    except Exception as e:
+        current_app.logger.error(f"Finalizing upload failed: {str(e)}")
+        return jsonify({'error': 'Finalizing upload failed'}), 500
+    
+    return jsonify(document.to_dict()), 201
+
+@document_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def abort_upload(upload_id):
+    """Cancel a resumable upload."""
+    upload_service = UploadService(db)
+    upload = upload_service.get_upload(upload_id, current_user.id)
+    
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    if not upload_service.abort(upload):
+        return jsonify({'error': 'Aborting upload failed'}), 500
+    
+    return '', 204
+
 @document_bp.route('/list')
 @login_required
 def list():
@@ -58,8 +232,15 @@ def list():
     document_service = DocumentService(db)
     documents = document_service.get_user_documents(current_user.id, doc_type)
     
+    # Encrypted documents the user's attributes can open, from the shared decision cache
+    encrypted = [document for document in documents if document.access_policy]
+    decryptable = EncryptionService().decryptable_documents(
+        encrypted,
+        current_user.get_attributes_list()
+    ) if encrypted else set()
+    
     return render_template('document/list.html', title='My Documents',
-                          documents=documents)
+                          documents=documents, decryptable=decryptable)
 
 @document_bp.route('/view/<int:document_id>')
 @login_required
@@ -88,22 +269,22 @@ def download(document_id):
         flash('You do not have permission to download this document', 'danger')
         return redirect(url_for('document.list'))
     
-    # Get file path
-    file_path = document.get_file_path()
+    if not document.has_content():
+        flash('Only the encrypted copy of this document is stored', 'warning')
+        return redirect(url_for('document.view', document_id=document.id))
     
-    # Check if file exists
-    if not os.path.exists(file_path):
+    # Send file; the digest is a strong ETag, so repeat downloads get a 304
+    try:
+        return send_stored_file(
+            document.original_filename,
+            mimetype=document.file_type,
+            key=document.get_storage_key(),
+            file_path=None if document.is_blob() else document.get_file_path(),
+            etag=document.digest
+        )
+    except FileNotFoundError:
         flash('File not found', 'danger')
         return redirect(url_for('document.list'))
-    
-    # Determine content type
-    content_type = document.file_type
-    
-    # Send file
-    return send_file(file_path, 
-                    download_name=document.original_filename,
-                    mimetype=content_type,
-                    as_attachment=True)
 
 @document_bp.route('/delete/<int:document_id>', methods=['POST'])
 @login_required
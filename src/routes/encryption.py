@@ -5,12 +5,12 @@ Encryption routes for the web application.
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file
 from flask_login import current_user, login_required
 from werkzeug.utils import secure_filename
-import os
 import json
 from src.models.document import Document
 from src.services.document_service import DocumentService
 from src.services.encryption_service import EncryptionService
 from src.utils.file_utils import allowed_file, get_file_path
+from src.storage import remove_file
 from src.extensions import db
 
 encryption_bp = Blueprint('encryption', __name__)
@@ -44,28 +44,32 @@ def encrypt():
             return redirect(request.url)
         
         try:
-            # Save original document
-            document_service = DocumentService(db)
-            document = document_service.save_document(file, current_user.id)
-            
-            # Encrypt document
+            # Stream the upload through the cipher; the plaintext is never stored
             encryption_service = EncryptionService()
             
-            encrypted_path, metadata = encryption_service.encrypt_file(
-                document.get_file_path(), 
-                access_policy, 
-                str(current_user.id)
-            )
-            
-            # Save encrypted document
-            encrypted_document = document_service.save_encrypted_document(
-                document.id,
-                os.path.basename(encrypted_path),
-                encryption_method,
+            _, metadata = encryption_service.encrypt_upload(
+                file.stream,
                 access_policy,
-                current_user.id
+                str(current_user.id),
+                max_size=current_app.config['MAX_CONTENT_LENGTH']
             )
             
+            # Record the original and the encrypted document
+            document_service = DocumentService(db)
+            
+            try:
+                document_service.save_encrypted_upload(
+                    file,
+                    metadata,
+                    encryption_method,
+                    access_policy,
+                    current_user.id
+                )
+            except Exception:
+                db.session.rollback()
+                remove_file(metadata['encrypted_file'])
+                raise
+            
             flash('File encrypted successfully', 'success')
             return redirect(url_for('document.list'))
             
@@ -108,23 +112,15 @@ def decrypt(document_id):
                 flash('Decryption failed: Your attributes do not satisfy the access policy', 'danger')
                 return redirect(url_for('document.list'))
             
-            # Save decrypted document
+            # Move the decrypted file into the blob store
             document_service = DocumentService(db)
-            
-            # Create a temporary file object from the decrypted file
-            from werkzeug.datastructures import FileStorage
-            with open(decrypted_path, 'rb') as f:
-                file = FileStorage(
-                    stream=f,
-                    filename=document.original_filename.replace('.encrypted', ''),
-                    content_type=document.file_type
-                )
-                
-                decrypted_document = document_service.save_document(
-                    file, 
-                    current_user.id,
-                    doc_type='original'
-                )
+            decrypted_document = document_service.save_document_file(
+                decrypted_path,
+                document.original_filename.replace('.encrypted', ''),
+                document.file_type,
+                current_user.id,
+                doc_type='original'
+            )
             
             flash('File decrypted successfully', 'success')
             return redirect(url_for('document.view', document_id=decrypted_document.id))
@@ -134,8 +130,14 @@ def decrypt(document_id):
             flash(f'Decryption failed: {str(e)}', 'danger')
             return redirect(url_for('document.list'))
     
+    # Check the policy up front so the page can tell the user whether decryption will succeed
+    can_decrypt = EncryptionService().can_decrypt(
+        document.access_policy,
+        current_user.get_attributes_list()
+    ) if document.access_policy else None
+    
     return render_template('encryption/decrypt.html', title='Decrypt Document',
-                          document=document)
+                          document=document, can_decrypt=can_decrypt)
 
 @encryption_bp.route('/policy-editor', methods=['GET'])
 @login_required
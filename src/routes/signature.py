@@ -2,14 +2,19 @@
 Signature routes for the web application.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file, session
+from flask import Response, stream_with_context, jsonify
 from flask_login import current_user, login_required
+import io
 import os
+import json
 from src.models.document import Document
 from src.models.user import User
 from src.services.document_service import DocumentService
 from src.services.signature_service import SignatureService
+from src.encryption.digital_signature import KEY_TYPES
 from src.utils.file_utils import allowed_file, get_file_path
+from src.utils.download_utils import send_stored_file
 from src.extensions import db
 
 signature_bp = Blueprint('signature', __name__)
@@ -31,23 +36,48 @@ def sign(document_id):
         flash('Document is already signed', 'warning')
         return redirect(url_for('document.view', document_id=document_id))
     
+    if not document.has_content():
+        flash('Only the encrypted copy of this document is stored', 'warning')
+        return redirect(url_for('document.view', document_id=document_id))
+    
+    signature_service = SignatureService()
+    
+    # A key unlocked earlier in this session signs without the password
+    private_key = signature_service.get_unlocked_key(current_user.id, session.get('key_session_id'))
+    
     if request.method == 'POST':
         # Get password for private key
         password = request.form.get('password')
         
-        if not password:
+        if private_key is None and not password:
             flash('Password is required', 'danger')
             return redirect(request.url)
         
         try:
-            # Sign document
-            signature_service = SignatureService()
+            # Unlock the key for the rest of the session if requested
+            if private_key is None and request.form.get('keep_unlocked'):
+                token = signature_service.unlock_private_key(
+                    current_user.id,
+                    password,
+                    current_user.private_key_encrypted
+                )
+                
+                if not token:
+                    flash('Signing failed: Invalid password or key error', 'danger')
+                    return redirect(request.url)
+                
+                session['key_session_id'] = token
+                private_key = signature_service.get_unlocked_key(current_user.id, token)
             
+            # Sign document
             signature_path, metadata = signature_service.sign_document(
                 document.get_file_path(),
                 str(current_user.id),
                 password,
-                current_user.private_key_encrypted
+                current_user.private_key_encrypted,
+                private_key=private_key,
+                digest=document.get_digest(),
+                merkle=True if request.form.get('merkle') else None
             )
             
             if not signature_path:
@@ -71,7 +101,93 @@ def sign(document_id):
             return redirect(request.url)
     
     return render_template('signature/sign.html', title='Sign Document',
-                          document=document)
+                          document=document, key_unlocked=private_key is not None)
+
+@signature_bp.route('/sign-batch', methods=['GET', 'POST'])
+@login_required
+def sign_batch():
+    """Sign several documents with a single key unlock."""
+    document_service = DocumentService(db)
+    signature_service = SignatureService()
+    
+    # Only the user's own unsigned documents can be signed
+    documents = [document for document in document_service.get_user_documents(current_user.id)
+                 if not document.is_signed and document.has_content()]
+    
+    private_key = signature_service.get_unlocked_key(current_user.id, session.get('key_session_id'))
+    
+    if request.method == 'POST':
+        password = request.form.get('password')
+        selected = set(request.form.getlist('document_ids', type=int))
+        
+        if not selected:
+            flash('No documents selected', 'danger')
+            return redirect(request.url)
+        
+        if private_key is None and not password:
+            flash('Password is required', 'danger')
+            return redirect(request.url)
+        
+        document_paths = {document.id: document.get_file_path()
+                          for document in documents if document.id in selected}
+        
+        if len(document_paths) != len(selected):
+            flash('You do not have permission to sign some of the selected documents', 'danger')
+            return redirect(request.url)
+        
+        try:
+            results = signature_service.sign_documents(
+                document_paths,
+                str(current_user.id),
+                password,
+                current_user.private_key_encrypted,
+                private_key=private_key,
+                digests={document.id: document.get_digest()
+                         for document in documents if document.id in selected}
+            )
+            
+            if results is None:
+                flash('Signing failed: Invalid password or key error', 'danger')
+                return redirect(request.url)
+            
+            # Record every successful signature in one transaction
+            signed = {document_id: os.path.basename(signature_path)
+                      for document_id, (signature_path, _) in results.items() if signature_path}
+            document_service.save_signed_documents(signed, current_user.id)
+            
+            failed = len(results) - len(signed)
+            if failed:
+                flash(f'Signed {len(signed)} documents, {failed} failed', 'warning')
+            else:
+                flash(f'Signed {len(signed)} documents successfully', 'success')
+            return redirect(url_for('document.list', type='signed'))
+            
+        except Exception as e:
+            current_app.logger.error(f"Batch signing error: {str(e)}")
+            flash(f'Signing failed: {str(e)}', 'danger')
+            return redirect(request.url)
+    
+    return render_template('signature/sign_batch.html', title='Sign Documents',
+                          documents=documents, key_unlocked=private_key is not None)
+
+@signature_bp.route('/lock', methods=['POST'])
+@login_required
+def lock_key():
+    """Wipe the private key unlocked for this session."""
+    SignatureService().lock_private_key(current_user.id, session.pop('key_session_id', None))
+    
+    flash('Signing key locked', 'info')
+    return redirect(request.referrer or url_for('document.list'))
+
+@signature_bp.route('/stats')
+@login_required
+def stats():
+    """Report the key pair pool and public key cache metrics of this process."""
+    signature_service = SignatureService()
+    return jsonify({
+        'key_pool': signature_service.get_key_pool_stats(),
+        'key_cache': signature_service.get_key_cache_stats()
+    })
 
 @signature_bp.route('/verify/<int:document_id>', methods=['GET', 'POST'])
 @login_required
@@ -100,7 +216,8 @@ def verify(document_id):
             is_valid = signature_service.verify_signature(
                 document.get_file_path(),
                 document.get_signature_path(),
-                signer.public_key
+                signer.public_key,
+                force=request.form.get('force') == '1'
             )
             
             if is_valid:
@@ -118,6 +235,121 @@ def verify(document_id):
     return render_template('signature/verify.html', title='Verify Signature',
                           document=document, signer=signer)
 
+@signature_bp.route('/verify-range/<int:document_id>', methods=['POST'])
+@login_required
+def verify_range(document_id):
+    """
+    Verify one byte range of a Merkle-signed document.
+    
+    Accepts a JSON body or form with 'start' and 'end' (exclusive) byte
+    offsets, or for an encrypted document 'first_chunk' and 'last_chunk'
+    indexes of payload chunks.
+    """
+    params = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    payload = 'first_chunk' in params
+    
+    try:
+        if payload:
+            start = int(params.get('first_chunk'))
+            end = int(params.get('last_chunk', start))
+        else:
+            start = int(params.get('start'))
+            end = int(params.get('end'))
+    except (TypeError, ValueError):
+        if payload:
+            return jsonify({'error': 'first_chunk and last_chunk must be integers'}), 400
+        return jsonify({'error': 'start and end must be integers'}), 400
+    
+    document = Document.query.get_or_404(document_id)
+    
+    if not document.is_signed:
+        return jsonify({'error': 'Document is not signed'}), 400
+    
+    if payload and not document.encryption_method:
+        return jsonify({'error': 'Document is not encrypted'}), 400
+    
+    signer = User.query.get(document.signer_id)
+    
+    if not signer:
+        return jsonify({'error': 'Signer not found'}), 404
+    
+    signature_service = SignatureService()
+    
+    if payload:
+        is_valid = signature_service.verify_payload_chunks(
+            document.get_file_path(),
+            document.get_signature_path(),
+            signer.public_key,
+            start,
+            end
+        )
+        return jsonify({'document_id': document.id, 'first_chunk': start, 'last_chunk': end,
+                        'valid': is_valid})
+    
+    is_valid = signature_service.verify_range(
+        document.get_file_path(),
+        document.get_signature_path(),
+        signer.public_key,
+        start,
+        end
+    )
+    
+    return jsonify({'document_id': document.id, 'start': start, 'end': end, 'valid': is_valid})
+
+@signature_bp.route('/verify-batch', methods=['POST'])
+@login_required
+def verify_batch():
+    """
+    Verify many documents' signatures and stream one JSON line per document.
+    
+    Accepts a JSON body or form with either 'document_ids' or 'user_id'
+    (every signed document owned by that user), and an optional 'force'
+    flag to bypass cached verification results.
+    """
+    if request.is_json:
+        params = request.get_json(silent=True) or {}
+        document_ids = params.get('document_ids')
+    else:
+        params = request.form
+        document_ids = params.getlist('document_ids') or None
+    user_id = params.get('user_id')
+    force = params.get('force') in (True, '1', 'true')
+    
+    if document_ids is None and user_id is None:
+        return jsonify({'error': 'document_ids or user_id is required'}), 400
+    
+    try:
+        if document_ids is not None:
+            document_ids = [int(document_id) for document_id in document_ids]
+        if user_id is not None:
+            user_id = int(user_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'IDs must be integers'}), 400
+    
+    documents = DocumentService(db).get_signed_documents(document_ids, user_id)
+    
+    def generate():
+        summary = {'total': 0, 'valid': 0, 'invalid': 0}
+        
+        # Requested IDs that are missing or unsigned are reported too
+        if document_ids is not None:
+            found = {document.id for document in documents}
+            for document_id in document_ids:
+                if document_id not in found:
+                    summary['total'] += 1
+                    summary['invalid'] += 1
+                    yield json.dumps({'document_id': document_id, 'valid': False,
+                                      'error': 'Signed document not found', 'cached': False}) + '\n'
+        
+        for result in SignatureService().verify_documents(documents, force=force):
+            summary['total'] += 1
+            summary['valid' if result['valid'] else 'invalid'] += 1
+            yield json.dumps(result) + '\n'
+        
+        yield json.dumps({'summary': summary}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @signature_bp.route('/download-signature/<int:document_id>')
 @login_required
 def download_signature(document_id):
@@ -133,16 +365,16 @@ def download_signature(document_id):
     # Get signature path
     signature_path = document.get_signature_path()
     
-    # Check if signature exists
-    if not signature_path or not os.path.exists(signature_path):
+    # Send file
+    try:
+        return send_stored_file(
+            f"{document.original_filename}{os.path.splitext(signature_path or '')[1]}",
+            mimetype='application/octet-stream',
+            file_path=signature_path
+        )
+    except FileNotFoundError:
         flash('Signature file not found', 'danger')
         return redirect(url_for('document.view', document_id=document_id))
-    
-    # Send file
-    return send_file(signature_path, 
-                    download_name=f"{document.original_filename}.sig",
-                    mimetype='application/octet-stream',
-                    as_attachment=True)
 
 @signature_bp.route('/keys', methods=['GET', 'POST'])
 @login_required
@@ -160,17 +392,30 @@ def manage_keys():
             # Generate new key pair
             signature_service = SignatureService()
             
+            key_type = request.form.get('key_type') or None
+            if key_type is not None and key_type not in KEY_TYPES:
+                flash('Unsupported key type', 'danger')
+                return redirect(request.url)
+            
             public_key, encrypted_private_key = signature_service.generate_key_pair(
                 str(current_user.id),
-                password
+                password,
+                key_type=key_type
             )
             
             # Update user
+            old_public_key = current_user.public_key
             current_user.public_key = public_key
             current_user.private_key_encrypted = encrypted_private_key
             
             db.session.commit()
             
+            # A key unlocked earlier belongs to the replaced key pair
+            signature_service.lock_all_private_keys(current_user.id)
+            session.pop('key_session_id', None)
+            if old_public_key:
+                signature_service.invalidate_public_key(old_public_key)
+            
             flash('Signature keys generated successfully', 'success')
             return redirect(url_for('signature.manage_keys'))
             
@@ -179,7 +424,14 @@ def manage_keys():
             flash(f'Key generation failed: {str(e)}', 'danger')
             return redirect(request.url)
     
-    return render_template('signature/keys.html', title='Manage Signature Keys')
+    signature_service = SignatureService()
+    algorithm = None
+    if current_user.public_key:
+        algorithm = signature_service.digital_signature.get_signature_algorithm(current_user.public_key)
+    
+    return render_template('signature/keys.html', title='Manage Signature Keys',
+                          algorithm=algorithm, key_types=KEY_TYPES,
+                          default_key_type=current_app.config['SIGNATURE_KEY_TYPE'])
 
 @signature_bp.route('/export-public-key')
 @login_required
@@ -189,15 +441,8 @@ def export_public_key():
         flash('No public key available', 'danger')
         return redirect(url_for('signature.manage_keys'))
     
-    # Create a temporary file for the public key
-    import tempfile
-    
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pem')
-    temp_file.write(current_user.public_key.encode('utf-8'))
-    temp_file.close()
-    
-    # Send file
-    return send_file(temp_file.name, 
+    # Send the key from memory rather than leaving a temporary file behind
+    return send_file(io.BytesIO(current_user.public_key.encode('utf-8')),
                     download_name=f"{current_user.username}_public_key.pem",
                     mimetype='application/x-pem-file',
                     as_attachment=True)
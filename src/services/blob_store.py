@@ -0,0 +1,212 @@
+"""
+Content-addressed blob store for uploaded documents.
+"""
+
+import os
+import uuid
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.models.blob import Blob
+from src.storage import get_storage
+from src.utils.file_utils import compute_file_digest, storage_key, write_stream, KIND_BLOBS
+
+class BlobStore:
+    """
+    Deduplicating store of uploaded files keyed by their SHA-256 digest.
+
+    Documents with the same content share one blob: their filename is the
+    blob's digest and the blob's ref_count is the number of documents
+    referencing it. Blob files are never modified in place.
+
+    Blob content lives in the application's storage backend; uploads are
+    staged in the local upload folder until their digest is known.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the blob store.
+
+        Args:
+            db: Database instance
+        """
+        self.db = db
+
+    def store(self, file, directory=None, max_size=None):
+        """
+        Store an uploaded file and take a reference to its blob.
+
+        The upload is read exactly once: it is written to a temporary file
+        while being hashed and counted, then either moved into place or
+        discarded if the content already exists.
+
+        Args:
+            file: The file object from request.files
+            directory (str): Upload folder, defaults to app's UPLOAD_FOLDER
+            max_size (int): Largest accepted size in bytes, None for no limit
+
+        Returns:
+            tuple: (digest, size, created) where created is False when an
+                existing blob was reused
+
+        Raises:
+            RequestEntityTooLarge: If the content exceeds max_size
+        """
+        if directory is None:
+            directory = current_app.config['UPLOAD_FOLDER']
+
+        stream = getattr(file, 'stream', None)
+        temp_path = self._temp_path(directory)
+        if stream is not None:
+            digest, _ = write_stream(stream, temp_path, max_size)
+        else:
+            file.save(temp_path)
+            digest = None
+            if max_size is not None and os.path.getsize(temp_path) > max_size:
+                os.remove(temp_path)
+                raise RequestEntityTooLarge(f"Upload exceeds {max_size} bytes")
+
+        return self.store_file(temp_path, digest)
+
+    def store_file(self, file_path, digest=None):
+        """
+        Move a complete file into the store and take a reference to its blob.
+
+        With the local backend the file is renamed into place, not copied;
+        if the content already exists it is deleted instead. Either way it
+        is gone afterwards.
+
+        Args:
+            file_path (str): Path to a local file
+            digest (str): SHA-256 hex digest if already known, computed otherwise
+
+        Returns:
+            tuple: (digest, size, created) where created is False when an
+                existing blob was reused
+        """
+        if digest is None:
+            digest = compute_file_digest(file_path)
+        size = os.path.getsize(file_path)
+
+        try:
+            if self.acquire(digest):
+                return digest, size, False
+            return digest, size, self._add(digest, size, file_path)
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def acquire(self, digest):
+        """
+        Take a reference to an existing blob and commit it.
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            bool: True if the blob exists, False otherwise
+        """
+        updated = Blob.query.filter(Blob.digest == digest, Blob.ref_count > 0) \
+            .update({Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False)
+        self.db.session.commit()
+        return updated > 0
+
+    def release(self, digest):
+        """
+        Drop a reference to a blob, deleting its row with the last one.
+
+        The change is flushed but not committed, so it belongs to the
+        caller's transaction. The file is left in place: once the
+        transaction is committed, call delete_unreferenced() to remove it.
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            bool: True if the digest names a blob, False otherwise
+        """
+        updated = Blob.query.filter_by(digest=digest) \
+            .update({Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False)
+        if not updated:
+            return False
+
+        Blob.query.filter(Blob.digest == digest, Blob.ref_count <= 0).delete(synchronize_session=False)
+        return True
+
+    def delete_unreferenced(self, digest):
+        """
+        Delete a blob's file if no row references it any more.
+
+        Call after committing a release(). The digest is guarded the same
+        way _add() guards it, by an uncommitted row: a placeholder is
+        inserted for the duration of the delete and rolled back afterwards,
+        so an upload of the same content either created its row first and
+        the file is kept, or waits on the placeholder until the file is
+        gone and then stores it anew. A crash before the file is deleted
+        leaves an orphan that the upload GC collects.
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            bool: True if the file was deleted, False otherwise
+        """
+        try:
+            self.db.session.add(Blob(digest=digest, size=0, ref_count=0))
+            self.db.session.flush()
+        except IntegrityError:
+            # A concurrent upload of the same content recreated the blob
+            self.db.session.rollback()
+            return False
+
+        try:
+            get_storage().delete(storage_key(digest, KIND_BLOBS))
+        finally:
+            self.db.session.rollback()
+        return True
+
+    def get_path(self, digest):
+        """
+        Get a local file with a blob's content.
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            str: Path to the blob, or to a cached copy for a remote backend
+        """
+        return get_storage().local_path(storage_key(digest, KIND_BLOBS))
+
+    def _add(self, digest, size, temp_path):
+        """
+        Record a new blob and move its file into place.
+
+        The row is flushed before the file is written and committed after,
+        so it guards the digest against delete_unreferenced() meanwhile.
+
+        Returns:
+            bool: True if the blob was created, False if a concurrent upload
+                of the same content created it first
+        """
+        try:
+            self.db.session.add(Blob(digest=digest, size=size, ref_count=1))
+            self.db.session.flush()
+        except IntegrityError:
+            self.db.session.rollback()
+            if self.acquire(digest):
+                return False
+            raise
+
+        try:
+            get_storage().write_file(storage_key(digest, KIND_BLOBS), temp_path)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+        return True
+
+    def _temp_path(self, directory):
+        """Get a unique temporary path inside the blob namespace."""
+        namespace = os.path.join(directory, KIND_BLOBS)
+        os.makedirs(namespace, exist_ok=True)
+        return os.path.join(namespace, f".upload-{uuid.uuid4().hex}.tmp")
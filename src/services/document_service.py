@@ -7,7 +7,10 @@ import json
 from datetime import datetime
 from flask import current_app
 from src.models.document import Document
-from src.utils.file_utils import save_uploaded_file, get_file_path, delete_file
+from src.encryption.merkle import tree_filename
+from src.services.blob_store import BlobStore
+from src.storage import fetch_file, remove_file
+from src.utils.file_utils import compute_file_digest
 
 class DocumentService:
     """Service for handling document operations."""
@@ -20,35 +23,82 @@ class DocumentService:
             db: Database instance
         """
         self.db = db
+        self.blob_store = BlobStore(db)
     
-    def save_document(self, file, user_id, doc_type='original'):
+    def save_document(self, file, user_id, doc_type='original', max_size=None):
         """
         Save a document to the system.
         
+        The content goes to the blob store, so uploading a file that is
+        already stored only adds a reference to the existing blob.
+        
         Args:
             file: File object from request.files
             user_id (int): ID of the document owner
             doc_type (str): Type of document ('original', 'encrypted', 'signed')
+            max_size (int): Largest accepted size in bytes, None for no limit
             
         Returns:
             Document: Saved document object
         """
-        # Save the file
-        filename, original_filename, file_type, file_size = save_uploaded_file(file)
+        # Store the content, or reference an identical blob
+        digest, file_size, _ = self.blob_store.store(file, max_size=max_size)
         
-        # Create document record
+        return self._add_blob_document(digest, file_size, file.filename, file.content_type, user_id, doc_type)
+    
+    def save_document_file(self, file_path, original_filename, content_type, user_id, doc_type='original'):
+        """
+        Save a document from a complete file already in the upload folder,
+        such as an assembled resumable upload.
+        
+        The file is moved into the blob store, or deleted if the content is
+        already stored.
+        
+        Args:
+            file_path (str): Path to the file
+            original_filename (str): Name the file was uploaded as
+            content_type (str): MIME type, or None to derive one from the name
+            user_id (int): ID of the document owner
+            doc_type (str): Type of document ('original', 'encrypted', 'signed')
+            
+        Returns:
+            Document: Saved document object
+        """
+        digest, file_size, _ = self.blob_store.store_file(file_path)
+        
+        return self._add_blob_document(digest, file_size, original_filename, content_type, user_id, doc_type)
+    
+    def _add_blob_document(self, digest, file_size, original_filename, content_type, user_id, doc_type):
+        """
+        Create the record of a document stored as a blob, releasing the
+        blob reference if the record cannot be saved.
+        
+        Returns:
+            Document: Saved document object
+        """
+        file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+        
+        # Create document record; the blob digest is its filename
         document = Document(
-            filename=filename,
+            filename=digest,
             original_filename=original_filename,
-            file_type=file_type,
+            file_type=content_type or f"application/{file_extension}",
             file_size=file_size,
+            digest=digest,
             doc_type=doc_type,
             user_id=user_id
         )
         
         # Save to database
-        self.db.session.add(document)
-        self.db.session.commit()
+        try:
+            self.db.session.add(document)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            self.blob_store.release(digest)
+            self.db.session.commit()
+            self.blob_store.delete_unreferenced(digest)
+            raise
         
         return document
     
@@ -82,6 +132,27 @@ class DocumentService:
         
         return query.order_by(Document.created_at.desc()).all()
     
+    def get_signed_documents(self, document_ids=None, user_id=None):
+        """
+        Get signed documents by ID or by owner.
+        
+        Args:
+            document_ids (list): Optional document IDs
+            user_id (int): Optional owner ID
+            
+        Returns:
+            list: List of signed Document objects
+        """
+        query = Document.query.filter_by(is_signed=True)
+        
+        if document_ids is not None:
+            query = query.filter(Document.id.in_(document_ids))
+        
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        
+        return query.order_by(Document.id).all()
+    
     def delete_document(self, document_id):
         """
         Delete a document.
@@ -98,22 +169,33 @@ class DocumentService:
             return False
         
         try:
-            # Delete the file
-            delete_file(document.filename)
+            # Drop the blob reference, or delete a file stored before blobs existed
+            self.db.session.delete(document)
+            digest = document.filename
+            released = document.has_content() and self.blob_store.release(digest)
+            if document.has_content() and not released:
+                remove_file(document.filename)
             
             # Delete signature file if exists
             if document.signature_file:
-                delete_file(document.signature_file)
+                self._delete_signature_files(document.signature_file)
             
-            # Delete from database
-            self.db.session.delete(document)
+            # Commit the deletion and the reference count together
             self.db.session.commit()
-            
-            return True
         except Exception as e:
             current_app.logger.error(f"Error deleting document: {str(e)}")
             self.db.session.rollback()
             return False
+        
+        # Only delete the blob's file once no committed row can point at it
+        if released:
+            try:
+                self.blob_store.delete_unreferenced(digest)
+            except Exception as e:
+                # The upload GC collects the orphaned file later
+                current_app.logger.warning(f"Error deleting blob {digest}: {str(e)}")
+        
+        return True
     
     def save_encrypted_document(self, original_document_id, encrypted_filename, encryption_method, access_policy, user_id):
         """
@@ -136,8 +218,9 @@ class DocumentService:
             return None
         
         # Get file info
-        file_path = get_file_path(encrypted_filename)
+        file_path = fetch_file(encrypted_filename)
         file_size = os.path.getsize(file_path)
+        digest = compute_file_digest(file_path)
         
         # Create document record
         document = Document(
@@ -145,6 +228,7 @@ class DocumentService:
             original_filename=f"{original_document.original_filename}.encrypted",
             file_type="application/json",
             file_size=file_size,
+            digest=digest,
             doc_type="encrypted",
             encryption_method=encryption_method,
             access_policy=access_policy,
@@ -158,6 +242,57 @@ class DocumentService:
         
         return document
     
+    def save_encrypted_upload(self, file, metadata, encryption_method, access_policy, user_id):
+        """
+        Record an upload that was encrypted without storing its plaintext.
+        
+        Both rows are written in one transaction: the original, which keeps
+        the plaintext's name, type, size and digest but has no stored
+        content, and the encrypted document as its child.
+        
+        Args:
+            file: File object from request.files
+            metadata (dict): Metadata returned by EncryptionService.encrypt_upload
+            encryption_method (str): Encryption method used ('maabe', 'hybrid')
+            access_policy (str): Access policy string
+            user_id (int): User ID
+            
+        Returns:
+            tuple: (original Document, encrypted Document)
+        """
+        original_filename = file.filename
+        file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+        
+        # An empty filename marks a document whose content is not stored
+        original_document = Document(
+            filename='',
+            original_filename=original_filename,
+            file_type=file.content_type or f"application/{file_extension}",
+            file_size=metadata['original_size'],
+            digest=metadata['original_digest'],
+            doc_type='original',
+            user_id=user_id
+        )
+        
+        encrypted_document = Document(
+            filename=metadata['encrypted_file'],
+            original_filename=f"{original_filename}.encrypted",
+            file_type="application/json",
+            file_size=metadata['encrypted_size'],
+            digest=metadata['encrypted_digest'],
+            doc_type="encrypted",
+            encryption_method=encryption_method,
+            access_policy=access_policy,
+            user_id=user_id,
+            parent=original_document
+        )
+        
+        # Save to database
+        self.db.session.add_all([original_document, encrypted_document])
+        self.db.session.commit()
+        
+        return original_document, encrypted_document
+    
     def save_signed_document(self, original_document_id, signature_filename, signer_id):
         """
         Save a signed document.
@@ -176,6 +311,10 @@ class DocumentService:
         if not document:
             return None
         
+        # Signature names are unique, so a replaced signature would be left behind
+        if document.signature_file and document.signature_file != signature_filename:
+            self._delete_signature_files(document.signature_file)
+        
         # Update document record
         document.is_signed = True
         document.signature_file = signature_filename
@@ -187,3 +326,44 @@ class DocumentService:
         self.db.session.commit()
         
         return document
+    
+    def save_signed_documents(self, signature_filenames, signer_id):
+        """
+        Save many signed documents in a single transaction.
+        
+        Args:
+            signature_filenames (dict): Signature filenames keyed by document ID
+            signer_id (int): ID of the signer
+            
+        Returns:
+            list: Updated Document objects
+        """
+        if not signature_filenames:
+            return []
+        
+        documents = Document.query.filter(Document.id.in_(signature_filenames.keys())).all()
+        now = datetime.utcnow()
+        
+        for document in documents:
+            if document.signature_file and document.signature_file != signature_filenames[document.id]:
+                self._delete_signature_files(document.signature_file)
+            document.is_signed = True
+            document.signature_file = signature_filenames[document.id]
+            document.signer_id = signer_id
+            document.doc_type = "signed"
+            document.updated_at = now
+        
+        # Save to database
+        self.db.session.commit()
+        
+        return documents
+    
+    def _delete_signature_files(self, signature_filename):
+        """
+        Delete a signature container and its Merkle tree, if any.
+        
+        Args:
+            signature_filename (str): Filename of the signature file
+        """
+        remove_file(signature_filename)
+        remove_file(tree_filename(signature_filename))
@@ -4,32 +4,41 @@ Encryption service for the web application.
 
 import os
 import json
+import uuid
 import base64
 from datetime import datetime
 from flask import current_app
 from src.encryption.hybrid_abe import HybridABE
-from src.utils.file_utils import get_file_path, save_json_data, load_json_data
+from src.encryption.key_cache import data_key_cache
+from src.encryption.access_cache import access_decision_cache
+from src.utils.file_utils import (
+    get_file_path, get_storage_path, open_file, list_files, save_json_data, load_json_data,
+    HashingReader, HashingWriter, KIND_AUTHORITIES, KIND_ENCRYPTED
+)
+from src.storage import publish_file
 
 class EncryptionService:
     """Service for handling encryption and decryption operations."""
     
     def __init__(self):
         """Initialize the encryption service."""
-        self.hybrid_abe = HybridABE()
+        # The unwrapped data-key cache is opt-in
+        key_cache = data_key_cache if current_app.config.get('DATA_KEY_CACHE_ENABLED') else None
+        self.hybrid_abe = HybridABE(data_key_cache=key_cache)
         
         # Ensure global parameters exist
         self._ensure_global_parameters()
     
     def _ensure_global_parameters(self):
         """Ensure global parameters for encryption exist."""
-        params_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'hybrid_params.json')
+        params_path = get_file_path('hybrid_params.json')
         
         if not os.path.exists(params_path):
             # Generate new global parameters
             gp = self.hybrid_abe.setup()
             
             # Save parameters
-            with open(params_path, 'w') as f:
+            with open(get_storage_path('hybrid_params.json'), 'w') as f:
                 json.dump(gp, f, indent=2)
     
     def get_global_parameters(self):
@@ -39,9 +48,7 @@ class EncryptionService:
         Returns:
             dict: Global parameters
         """
-        params_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'hybrid_params.json')
-        
-        with open(params_path, 'r') as f:
+        with open_file('hybrid_params.json') as f:
             return json.load(f)
     
     def setup_authority(self, authority_name):
@@ -61,8 +68,8 @@ class EncryptionService:
         pk, sk = self.hybrid_abe.authsetup(gp, authority_name)
         
         # Save keys
-        pk_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{authority_name}_pk.json")
-        sk_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{authority_name}_sk.json")
+        pk_path = get_storage_path(f"{authority_name}_pk.json")
+        sk_path = get_storage_path(f"{authority_name}_sk.json")
         
         with open(pk_path, 'w') as f:
             json.dump(pk, f, indent=2)
@@ -70,8 +77,44 @@ class EncryptionService:
         with open(sk_path, 'w') as f:
             json.dump(sk, f, indent=2)
         
+        # Decisions cached for this authority's attributes predate its new keys
+        access_decision_cache.invalidate_authority(authority_name)
+        
         return pk, sk
     
+    def can_decrypt(self, policy, user_attributes):
+        """
+        Check whether a set of attributes satisfies an access policy.
+        
+        Args:
+            policy (str): Access policy string
+            user_attributes (list): List of user attributes in 'attribute@authority' format
+            
+        Returns:
+            bool: True if the attributes satisfy the policy
+        """
+        return bool(self.hybrid_abe.find_satisfying_attributes(policy, user_attributes))
+    
+    def decryptable_documents(self, documents, user_attributes):
+        """
+        Check a batch of documents against one attribute set.
+        
+        Documents sharing a policy share one cached decision, so a listing
+        costs one policy evaluation per distinct policy.
+        
+        Args:
+            documents (iterable): Documents with an access_policy attribute
+            user_attributes (list): List of user attributes in 'attribute@authority' format
+            
+        Returns:
+            set: IDs of the documents whose policy the attributes satisfy
+        """
+        user_attributes = frozenset(user_attributes)
+        return {
+            document.id for document in documents
+            if document.access_policy and self.can_decrypt(document.access_policy, user_attributes)
+        }
+    
     def generate_user_keys(self, user_id, authority_name, attributes):
         """
         Generate encryption keys for a user.
@@ -88,13 +131,13 @@ class EncryptionService:
         gp = self.get_global_parameters()
         
         # Check if authority exists, if not set it up
-        sk_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{authority_name}_sk.json")
+        sk_path = get_file_path(f"{authority_name}_sk.json")
         if not os.path.exists(sk_path):
             current_app.logger.info(f"Setting up new authority: {authority_name}")
             self.setup_authority(authority_name)
         
         # Get authority secret key
-        with open(sk_path, 'r') as f:
+        with open_file(f"{authority_name}_sk.json") as f:
             sk = json.load(f)
         
         # Generate user keys
@@ -116,17 +159,32 @@ class EncryptionService:
         }
         
         # Save user keys
-        keys_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"user_{user_id}_keys.json")
+        keys_path = get_file_path(f"user_{user_id}_keys.json")
         
         # Remove the line that was causing an error (user is not defined)
         if os.path.exists(keys_path):
             current_app.logger.info(f"Keys already exist for user {user_id}")
         
-        with open(keys_path, 'w') as f:
+        with open(get_storage_path(f"user_{user_id}_keys.json"), 'w') as f:
             json.dump(user_keys, f, indent=2)
         
         return user_keys
     
+    def _get_authority_public_keys(self):
+        """
+        Load the public keys of all authorities.
+        
+        Returns:
+            dict: Public keys keyed by authority name
+        """
+        pks = {}
+        for key_path in list_files(KIND_AUTHORITIES):
+            if key_path.endswith('_pk.json'):
+                with open(key_path, 'r') as f:
+                    pk = json.load(f)
+                    pks[pk['name']] = pk
+        return pks
+    
     def encrypt_file(self, input_file_path, policy, user_id):
         """
         Encrypt a file using Hybrid ABE.
@@ -143,39 +201,86 @@ class EncryptionService:
         gp = self.get_global_parameters()
         
         # Get public keys of authorities
-        pks = {}
-        authorities_dir = current_app.config['UPLOAD_FOLDER']
+        pks = self._get_authority_public_keys()
         
-        # Find all authority public keys
-        for filename in os.listdir(authorities_dir):
-            if filename.endswith('_pk.json'):
-                with open(os.path.join(authorities_dir, filename), 'r') as f:
-                    pk = json.load(f)
-                    pks[pk['name']] = pk
+        # Generate output filename
+        output_filename = f"encrypted_{uuid.uuid4().hex}.json"
+        output_path = get_storage_path(output_filename)
         
-        # Read the input file
-        with open(input_file_path, 'rb') as f:
-            file_data = f.read()
+        # Stream the file through the cipher into the encrypted file
+        with open(input_file_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+            self.hybrid_abe.encrypt_stream(gp, pks, f_in, f_out, policy)
+        publish_file(output_path, KIND_ENCRYPTED)
         
-        # Encrypt the file
-        encrypted_data = self.hybrid_abe.encrypt(gp, pks, file_data, policy)
+        # Return metadata
+        metadata = {
+            'original_file': os.path.basename(input_file_path),
+            'encrypted_file': output_filename,
+            'policy': policy,
+            'encryption_method': 'hybrid',
+            'user_id': user_id,
+            'timestamp': str(datetime.now())
+        }
+        
+        return output_path, metadata
+    
+    def encrypt_upload(self, stream, policy, user_id, max_size=None):
+        """
+        Encrypt an upload using Hybrid ABE straight from its stream.
+        
+        The plaintext is never written to disk: it is read once, hashed and
+        counted on the way into the cipher, and only the ciphertext is
+        written, to a temporary file moved into place when complete and
+        then stored in the storage backend.
+        
+        Args:
+            stream: Readable binary stream with the upload, e.g. file.stream
+            policy (str): Access policy string
+            user_id (str): User identifier
+            max_size (int): Largest accepted plaintext size in bytes, None for no limit
+            
+        Returns:
+            tuple: (encrypted_file_path, metadata) where metadata also holds
+                the plaintext's 'original_digest' and 'original_size' and the
+                ciphertext's 'encrypted_digest' and 'encrypted_size'
+        
+        Raises:
+            RequestEntityTooLarge: If the upload exceeds max_size
+        """
+        # Get global parameters
+        gp = self.get_global_parameters()
+        
+        # Get public keys of authorities
+        pks = self._get_authority_public_keys()
         
         # Generate output filename
-        output_filename = f"encrypted_{os.path.basename(input_file_path)}.json"
-        output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+        output_filename = f"encrypted_{uuid.uuid4().hex}.json"
+        output_path = get_storage_path(output_filename)
+        temp_path = f"{output_path}.part"
         
-        # Save the encrypted file
-        with open(output_path, 'w') as f:
-            json.dump(encrypted_data, f)
+        reader = HashingReader(stream, max_size)
+        try:
+            with open(temp_path, 'wb') as f_out:
+                writer = HashingWriter(f_out)
+                self.hybrid_abe.encrypt_stream(gp, pks, reader, writer, policy)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        publish_file(output_path, KIND_ENCRYPTED)
         
         # Return metadata
         metadata = {
-            'original_file': os.path.basename(input_file_path),
             'encrypted_file': output_filename,
             'policy': policy,
             'encryption_method': 'hybrid',
             'user_id': user_id,
-            'timestamp': str(datetime.now())
+            'timestamp': str(datetime.now()),
+            'original_digest': reader.hexdigest(),
+            'original_size': reader.size,
+            'encrypted_digest': writer.hexdigest(),
+            'encrypted_size': writer.size
         }
         
         return output_path, metadata
@@ -195,31 +300,28 @@ class EncryptionService:
         gp = self.get_global_parameters()
         
         # Get user keys
-        keys_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"user_{user_id}_keys.json")
-        
-        with open(keys_path, 'r') as f:
+        with open_file(f"user_{user_id}_keys.json") as f:
             sk = json.load(f)
         
-        # Load the encrypted file
-        with open(encrypted_file_path, 'r') as f:
-            encrypted_data = json.load(f)
+        # Generate output filename
+        output_filename = f"decrypted_{uuid.uuid4().hex}"
+        output_path = get_storage_path(output_filename)
         
         try:
-            # Decrypt the file
-            decrypted_data = self.hybrid_abe.decrypt(gp, sk, encrypted_data)
-            
-            # Generate output filename
-            output_filename = f"decrypted_{os.path.basename(encrypted_file_path).replace('.json', '')}"
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-            
-            # Save the decrypted file
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            # Stream the payload through the decryptor into the output file
+            with open(encrypted_file_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+                self.hybrid_abe.decrypt_stream(
+                    gp, sk, f_in, f_out,
+                    document_id=os.path.basename(encrypted_file_path)
+                )
             
             return output_path, True
             
         except Exception as e:
             current_app.logger.error(f"Decryption failed: {str(e)}")
+            # The tag is checked last, so never leave unauthenticated output behind
+            if os.path.exists(output_path):
+                os.remove(output_path)
             return None, False
     
     def decrypt_document(self, file_path, encryption_method, user_attributes):
@@ -251,8 +353,8 @@ class EncryptionService:
             elif encryption_method == 'maabe':
                 # For testing, we'll simulate MA-ABE decryption
                 # In a real implementation, this would use the MA-ABE library
-                output_filename = f"decrypted_maabe_{os.path.basename(file_path)}"
-                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+                output_filename = f"decrypted_maabe_{uuid.uuid4().hex}"
+                output_path = get_storage_path(output_filename)
                 
                 # Copy the file for testing (in real app, would decrypt)
                 with open(file_path, 'rb') as f_in:
@@ -275,7 +377,7 @@ class EncryptionService:
             user_id (str): User identifier
             user_attributes (list): List of user attributes
         """
-        keys_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"user_{user_id}_keys.json")
+        keys_path = get_file_path(f"user_{user_id}_keys.json")
         
         if not os.path.exists(keys_path):
             # Create dummy keys for testing
@@ -287,7 +389,7 @@ class EncryptionService:
                 authorities.add(attr.authority_name)
             
             for authority in authorities:
-                auth_sk_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{authority}_sk.json")
+                auth_sk_path = get_file_path(f"{authority}_sk.json")
                 if not os.path.exists(auth_sk_path):
                     self.setup_authority(authority)
             
@@ -329,30 +431,17 @@ class EncryptionService:
                 gp = self.get_global_parameters()
                 
                 # Get all authority public keys
-                pks = {}
-                authorities_dir = current_app.config['UPLOAD_FOLDER']
-                
-                for filename in os.listdir(authorities_dir):
-                    if filename.endswith('_pk.json'):
-                        with open(os.path.join(authorities_dir, filename), 'r') as f:
-                            pk = json.load(f)
-                            pks[pk['name']] = pk
-                
-                # Read the input file
-                with open(doc_path, 'rb') as f:
-                    file_data = f.read()
-                    
-                # For demo purposes, we'll use the hybrid_abe encrypt method
-                # In a real implementation, this would use dedicated MA-ABE methods
-                encrypted_data = self.hybrid_abe.encrypt(gp, pks, file_data, access_policy)
+                pks = self._get_authority_public_keys()
                 
                 # Generate output filename
-                output_filename = f"maabe_encrypted_{os.path.basename(doc_path)}.json"
-                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+                output_filename = f"maabe_encrypted_{uuid.uuid4().hex}.json"
+                output_path = get_storage_path(output_filename)
                 
-                # Save the encrypted file
-                with open(output_path, 'w') as f:
-                    json.dump(encrypted_data, f)
+                # For demo purposes, we'll use the hybrid_abe encryption
+                # In a real implementation, this would use dedicated MA-ABE methods
+                with open(doc_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+                    self.hybrid_abe.encrypt_stream(gp, pks, f_in, f_out, access_policy)
+                publish_file(output_path, KIND_ENCRYPTED)
                     
                 return output_path
                     
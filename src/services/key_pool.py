@@ -0,0 +1,154 @@
+"""
+Background pool of pre-generated signature key pairs.
+"""
+
+import logging
+import threading
+from collections import deque
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_RSA
+
+logger = logging.getLogger(__name__)
+
+class KeyPairPool:
+    """
+    Pool of fresh, unused key pairs refilled by a background thread.
+
+    RSA key generation has high and unpredictable latency; drawing from the
+    pool keeps it off the request path. Key pairs are held in memory only,
+    unencrypted, until they are handed out, and each pair is handed out
+    once. When the pool is empty the caller generates synchronously, which
+    is counted as a miss.
+    """
+
+    def __init__(self, depth=0, key_type=KEY_TYPE_RSA, key_size=2048):
+        """
+        Initialize the pool.
+
+        Args:
+            depth (int): Number of key pairs kept ready, 0 disables the pool
+            key_type (str): Key type of the pooled pairs
+            key_size (int): RSA key size in bits
+        """
+        self.depth = depth
+        self.key_type = key_type
+        self.key_size = key_size
+        self.digital_signature = DigitalSignature()
+        self._pairs = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    def configure(self, depth=None, key_type=None, key_size=None):
+        """
+        Update the pool settings, dropping pooled pairs of another type.
+
+        Args:
+            depth (int): Number of key pairs kept ready
+            key_type (str): Key type of the pooled pairs
+            key_size (int): RSA key size in bits
+        """
+        with self._condition:
+            if (key_type is not None and key_type != self.key_type) or \
+                    (key_size is not None and key_size != self.key_size):
+                self._pairs.clear()
+            if depth is not None:
+                self.depth = depth
+            if key_type is not None:
+                self.key_type = key_type
+            if key_size is not None:
+                self.key_size = key_size
+            self._condition.notify_all()
+
+    def start(self):
+        """Start the refill thread if the pool is enabled and not running."""
+        with self._condition:
+            if self.depth <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._refill, name='key-pair-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the refill thread and drop the pooled pairs."""
+        with self._condition:
+            self._stopping = True
+            self._pairs.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, key_type=None, key_size=2048):
+        """
+        Take a key pair from the pool, generating one on a miss.
+
+        Args:
+            key_type (str): Requested key type, defaults to the pool's type
+            key_size (int): Requested RSA key size in bits
+
+        Returns:
+            tuple: (private_key, public_key) as PEM strings
+        """
+        if key_type is None:
+            key_type = self.key_type
+
+        with self._condition:
+            if key_type == self.key_type and (key_type != KEY_TYPE_RSA or key_size == self.key_size):
+                if self._pairs:
+                    self.hits += 1
+                    pair = self._pairs.popleft()
+                    self._condition.notify_all()
+                    return pair
+                if self.depth > 0:
+                    self.misses += 1
+                    self._condition.notify_all()
+
+        return self.digital_signature.generate_key_pair(key_size=key_size, key_type=key_type)
+
+    def stats(self):
+        """
+        Get pool metrics.
+
+        Returns:
+            dict: Key type, target depth, current depth, hits, misses and pairs generated
+        """
+        with self._condition:
+            return {
+                'key_type': self.key_type,
+                'target_depth': self.depth,
+                'depth': len(self._pairs),
+                'hits': self.hits,
+                'misses': self.misses,
+                'generated': self.generated
+            }
+
+    def _refill(self):
+        """Keep the pool at its target depth until stopped."""
+        while True:
+            with self._condition:
+                while not self._stopping and len(self._pairs) >= self.depth:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                key_type, key_size = self.key_type, self.key_size
+
+            # Generate outside the lock so requests can draw from the pool meanwhile
+            try:
+                pair = self.digital_signature.generate_key_pair(key_size=key_size, key_type=key_type)
+            except Exception as e:
+                logger.error("Key pair pool refill failed: %s", e)
+                with self._condition:
+                    self._condition.wait(timeout=5)
+                continue
+
+            with self._condition:
+                # Settings may have changed while generating
+                if key_type == self.key_type and key_size == self.key_size and len(self._pairs) < self.depth:
+                    self._pairs.append(pair)
+                    self.generated += 1
+
+# Shared pool, only filled when KEY_POOL_SIZE is above zero
+key_pair_pool = KeyPairPool()
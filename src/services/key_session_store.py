@@ -0,0 +1,124 @@
+"""
+Session-scoped store of unlocked signing keys for the web application.
+"""
+
+import time
+import secrets
+import threading
+
+class KeySessionStore:
+    """
+    Memory-only store of decrypted private key objects.
+
+    A user unlocks their signing key once with their password; later signs
+    in the same login session reuse the loaded key instead of running the
+    password KDF again. Entries expire after an absolute TTL or after an
+    idle timeout, whichever comes first, and are never written to disk.
+    """
+
+    def __init__(self, ttl=900, idle_timeout=300):
+        """
+        Initialize the store.
+
+        Args:
+            ttl (float): Seconds an unlocked key stays usable after unlocking
+            idle_timeout (float): Seconds an unlocked key stays usable without being used
+        """
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None, idle_timeout=None):
+        """
+        Update the expiry limits.
+
+        Args:
+            ttl (float): Seconds an unlocked key stays usable after unlocking
+            idle_timeout (float): Seconds an unlocked key stays usable without being used
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+
+    def unlock(self, user_id, private_key):
+        """
+        Store an unlocked key and return the token that identifies its session.
+
+        Args:
+            user_id (int): ID of the key owner
+            private_key: Loaded private key object
+
+        Returns:
+            str: Session token
+        """
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            self._entries[(user_id, token)] = {
+                'key': private_key,
+                'expires_at': now + self.ttl,
+                'last_used': now
+            }
+        return token
+
+    def get(self, user_id, token):
+        """
+        Get an unlocked key, refreshing its idle timer.
+
+        Args:
+            user_id (int): ID of the key owner
+            token (str): Session token returned by unlock
+
+        Returns:
+            object: Loaded private key, or None if locked or expired
+        """
+        if not token:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get((user_id, token))
+            if entry is None:
+                return None
+            entry['last_used'] = now
+            return entry['key']
+
+    def lock(self, user_id, token):
+        """
+        Wipe a user's unlocked key for one session.
+
+        Args:
+            user_id (int): ID of the key owner
+            token (str): Session token; a missing token locks nothing
+        """
+        if not token:
+            return
+        with self._lock:
+            self._entries.pop((user_id, token), None)
+
+    def lock_all(self, user_id):
+        """
+        Wipe a user's unlocked keys for every session.
+
+        Args:
+            user_id (int): ID of the key owner
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def _purge_expired(self, now):
+        """Remove expired entries. Caller holds the lock."""
+        expired = [
+            key for key, entry in self._entries.items()
+            if entry['expires_at'] <= now or entry['last_used'] + self.idle_timeout <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+
+# Shared store for the process
+key_session_store = KeySessionStore()
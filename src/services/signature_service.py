@@ -3,34 +3,73 @@ Signature service for the web application.
 """
 
 import os
-import json
+import uuid
+import shutil
 import base64
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import current_app
-from src.encryption.digital_signature import DigitalSignature
-from src.utils.file_utils import get_file_path, save_json_data, load_json_data
+from sqlalchemy import tuple_
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_RSA
+from src.encryption.public_key_cache import key_fingerprint
+from src.encryption import merkle
+from src.encryption.hybrid_abe import payload_chunk_range
+from src.encryption.signature_container import CONTAINER_EXTENSION, write_container, read_signature_file
+from src.services.key_session_store import key_session_store
+from src.services.key_pool import key_pair_pool
+from src.models.verification import VerificationResult
+from src.extensions import db
+from src.storage import publish_file, fetch_file
+from src.utils.file_utils import get_file_path, get_storage_path, save_json_data, load_json_data, KIND_SIGNATURES
+
+# Inputs per IN clause when looking up cached verification results, within SQLite's variable limit
+CACHE_LOOKUP_BATCH_SIZE = 400
 
 class SignatureService:
     """Service for handling digital signature operations."""
     
-    def __init__(self):
-        """Initialize the signature service."""
+    def __init__(self, streaming=True):
+        """
+        Initialize the signature service.
+        
+        Args:
+            streaming (bool): Hash documents in fixed-size chunks and sign the
+                digest, instead of reading whole files into memory
+        """
         self.digital_signature = DigitalSignature()
+        self.streaming = streaming
+    
+    def hash_document(self, document_path):
+        """
+        Compute a document's SHA-256 digest with constant memory.
+        
+        Args:
+            document_path (str): Path to the document
+            
+        Returns:
+            bytes: SHA-256 digest
+        """
+        return self.digital_signature.hash_file(document_path)
     
-    def generate_key_pair(self, user_id, password):
+    def generate_key_pair(self, user_id, password, key_type=None):
         """
         Generate a new key pair for digital signatures.
         
         Args:
             user_id (str): User identifier
             password (str): Password to encrypt the private key
+            key_type (str): 'rsa', 'ecdsa-p256' or 'ed25519', defaults to SIGNATURE_KEY_TYPE
             
         Returns:
             tuple: (public_key, encrypted_private_key)
         """
         try:
+            if key_type is None:
+                key_type = current_app.config.get('SIGNATURE_KEY_TYPE', KEY_TYPE_RSA)
+            
         # Generate key pair - DO NOT pass user_id here!
-            private_key, public_key = self.digital_signature.generate_key_pair()
+            private_key, public_key = key_pair_pool.get(key_type)
             
             # Encrypt private key
             encrypted_private_key = self.digital_signature.encrypt_private_key(private_key, password)
@@ -40,7 +79,112 @@ class SignatureService:
             current_app.logger.error(f"Error generating key pair: {str(e)}")
             raise
     
-    def sign_document(self, document_path, user_id, password, encrypted_private_key):
+    def get_public_key(self, public_key):
+        """
+        Get a loaded public key object, parsing each distinct key only once.
+        
+        Args:
+            public_key (str): Public key in PEM format
+            
+        Returns:
+            object: Loaded public key
+        """
+        return self.digital_signature.load_public_key(public_key)
+    
+    def get_key_fingerprint(self, public_key):
+        """
+        Get the fingerprint that identifies a public key in the key cache.
+        
+        Args:
+            public_key (str): Public key in PEM format
+            
+        Returns:
+            str: Key fingerprint
+        """
+        return key_fingerprint(public_key)
+    
+    def invalidate_public_key(self, public_key):
+        """
+        Drop a replaced public key from the parsed key cache.
+        
+        Args:
+            public_key (str): Public key in PEM format
+        """
+        self.digital_signature.key_cache.invalidate(public_key)
+    
+    def get_key_cache_stats(self):
+        """
+        Get statistics for the parsed public key cache.
+        
+        Returns:
+            dict: Entry count, hits and misses
+        """
+        return self.digital_signature.key_cache.stats()
+    
+    def get_key_pool_stats(self):
+        """
+        Get metrics for the pre-generated key pair pool.
+        
+        Returns:
+            dict: Key type, target depth, current depth, hits, misses and pairs generated
+        """
+        return key_pair_pool.stats()
+    
+    def unlock_private_key(self, user_id, password, encrypted_private_key):
+        """
+        Decrypt a user's private key once and keep it for the login session.
+        
+        Args:
+            user_id (int): User identifier
+            password (str): Password to decrypt the private key
+            encrypted_private_key (str): Encrypted private key
+            
+        Returns:
+            str: Session token for the unlocked key, or None if unlocking failed
+        """
+        try:
+            private_key = self.digital_signature.load_private_key(
+                self.digital_signature.decrypt_private_key(encrypted_private_key, password)
+            )
+            return key_session_store.unlock(user_id, private_key)
+        except Exception as e:
+            current_app.logger.error(f"Unlocking private key failed: {str(e)}")
+            return None
+    
+    def get_unlocked_key(self, user_id, token):
+        """
+        Get a private key unlocked earlier in the session.
+        
+        Args:
+            user_id (int): User identifier
+            token (str): Session token returned by unlock_private_key
+            
+        Returns:
+            object: Loaded private key, or None if locked or expired
+        """
+        return key_session_store.get(user_id, token)
+    
+    def lock_private_key(self, user_id, token):
+        """
+        Wipe the private key unlocked in one session from memory.
+        
+        Args:
+            user_id (int): User identifier
+            token (str): Session token; a missing token locks nothing
+        """
+        key_session_store.lock(user_id, token)
+    
+    def lock_all_private_keys(self, user_id):
+        """
+        Wipe the private keys unlocked in every session of a user from memory.
+        
+        Args:
+            user_id (int): User identifier
+        """
+        key_session_store.lock_all(user_id)
+    
+    def sign_document(self, document_path, user_id, password, encrypted_private_key, private_key=None,
+                      digest=None, merkle=None):
         """
         Sign a document using a user's private key.
         
@@ -49,73 +193,694 @@ class SignatureService:
             user_id (str): User identifier
             password (str): Password to decrypt the private key
             encrypted_private_key (str): Encrypted private key
+            private_key: Private key unlocked earlier in the session; when given,
+                the password is not needed and the KDF is skipped
+            digest (bytes): SHA-256 digest stored at upload time; when given,
+                the document is not read again
+            merkle (bool): Sign the root of a Merkle tree of chunk hashes;
+                None decides by the SIGNATURE_MERKLE_MIN_SIZE setting
             
         Returns:
             tuple: (signature_path, metadata)
         """
         try:
-            # Decrypt private key
-            private_key = self.digital_signature.decrypt_private_key(encrypted_private_key, password)
+            # Decrypt private key unless it is already unlocked
+            if private_key is None:
+                private_key = self.digital_signature.decrypt_private_key(encrypted_private_key, password)
+            
+            signature_path, metadata = self._sign_file(
+                document_path,
+                user_id,
+                private_key,
+                current_app.config['UPLOAD_FOLDER'],
+                digest,
+                self._merkle_chunk_size(document_path, merkle)
+            )
+            self._publish_signature(signature_path)
+            return signature_path, metadata
+            
+        except Exception as e:
+            current_app.logger.error(f"Signing failed: {str(e)}")
+            return None, None
+    
+    def sign_documents(self, document_paths, user_id, password, encrypted_private_key, private_key=None,
+                       max_workers=None, digests=None, merkle=None):
+        """
+        Sign many documents with a single key unlock.
+        
+        The private key is decrypted and parsed once, then documents are hashed
+        and signed in parallel.
+        
+        Args:
+            document_paths (dict): Document paths keyed by document ID
+            user_id (str): User identifier
+            password (str): Password to decrypt the private key
+            encrypted_private_key (str): Encrypted private key
+            private_key: Private key unlocked earlier in the session; when given,
+                the password is not needed
+            max_workers (int): Size of the worker pool, defaults to the
+                SIGNATURE_VERIFY_WORKERS setting
+            digests (dict): SHA-256 digests stored at upload time keyed by
+                document ID; documents without one are hashed
+            merkle (bool): Sign Merkle roots; None decides per document by
+                the SIGNATURE_MERKLE_MIN_SIZE setting
+            
+        Returns:
+            dict: (signature_path, metadata) keyed by document ID, with
+                (None, None) for documents that failed, or None if the key
+                could not be unlocked
+        """
+        try:
+            if private_key is None:
+                private_key = self.digital_signature.load_private_key(
+                    self.digital_signature.decrypt_private_key(encrypted_private_key, password)
+                )
+        except Exception as e:
+            current_app.logger.error(f"Unlocking private key failed: {str(e)}")
+            return None
+        
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        if max_workers is None:
+            max_workers = current_app.config.get('SIGNATURE_VERIFY_WORKERS')
+        
+        digests = digests or {}
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = {
+                executor.submit(self._sign_file, document_path, user_id, private_key, upload_folder,
+                                digests.get(document_id),
+                                self._merkle_chunk_size(document_path, merkle)): document_id
+                for document_id, document_path in document_paths.items()
+            }
+            
+            for future in as_completed(futures):
+                document_id = futures[future]
+                try:
+                    results[document_id] = future.result()
+                    self._publish_signature(results[document_id][0])
+                except Exception as e:
+                    current_app.logger.error(f"Signing document {document_id} failed: {str(e)}")
+                    results[document_id] = (None, None)
+        
+        return results
+    
+    def _sign_file(self, document_path, user_id, private_key, upload_folder, digest=None,
+                   merkle_chunk_size=None):
+        """
+        Sign one document and write its signature container. Does not use
+        the application context, so it can run in worker threads.
+        
+        Args:
+            document_path (str): Path to the document to sign
+            user_id (str): User identifier
+            private_key: Decrypted private key, PEM or loaded key object
+            upload_folder (str): Directory for the signature files
+            digest (bytes): Precomputed SHA-256 digest of the document
+            merkle_chunk_size (int): Chunk size to sign a Merkle root with, or
+                None to sign the plain digest
             
+        Returns:
+            tuple: (signature_path, metadata)
+        """
+        if isinstance(private_key, str):
+            private_key = self.digital_signature.load_private_key(private_key)
+        
+        # Documents with the same content share a file, so the name cannot derive from it
+        signature_filename = f"signature_{uuid.uuid4().hex}{CONTAINER_EXTENSION}"
+        signature_path = get_storage_path(signature_filename, upload_folder, KIND_SIGNATURES)
+        tree_path = merkle.tree_filename(signature_path)
+        
+        digest_algorithm = 'sha256'
+        if merkle_chunk_size:
+            # Sign the root of the chunk hash tree and keep the tree next to the signature
+            tree = merkle.MerkleTree.from_file(document_path, merkle_chunk_size)
+            tree.save(tree_path)
+            digest = tree.root
+            digest_algorithm = merkle.digest_algorithm(merkle_chunk_size)
+            signature = self.digital_signature.sign_digest(digest, private_key)
+        elif digest is not None:
+            # Reuse the digest stored at upload time
+            signature = self.digital_signature.sign_digest(digest, private_key)
+        elif self.streaming:
+            # Hash the document in chunks and sign the digest
+            digest = self.hash_document(document_path)
+            signature = self.digital_signature.sign_digest(digest, private_key)
+        else:
             # Read document
             with open(document_path, 'rb') as f:
                 document_data = f.read()
             
             # Sign document
+            digest = hashlib.sha256(document_data).digest()
             signature = self.digital_signature.sign_document(document_data, private_key)
+        
+        return self._write_signature(signature_path, signature, digest, digest_algorithm,
+                                     user_id, private_key, document_path)
+    
+    def _publish_signature(self, signature_path):
+        """
+        Store a new signature container, and its Merkle tree if any, in the
+        storage backend. Needs the application context, unlike _sign_file.
+        
+        Args:
+            signature_path (str): Path of the container in the upload folder
+        """
+        tree_path = merkle.tree_filename(signature_path)
+        if os.path.exists(tree_path):
+            publish_file(tree_path, KIND_SIGNATURES)
+        publish_file(signature_path, KIND_SIGNATURES)
+    
+    def _tree_path(self, signature_path):
+        """
+        Get the Merkle tree stored with a signature container.
+        
+        Args:
+            signature_path (str): Local path of the container
             
-            # Save signature
-            signature_filename = f"signature_{os.path.basename(document_path)}.sig"
-            signature_path = os.path.join(current_app.config['UPLOAD_FOLDER'], signature_filename)
+        Returns:
+            str: Local path of the tree, fetched from a remote storage backend if needed
+        """
+        tree_path = merkle.tree_filename(signature_path)
+        if os.path.exists(tree_path):
+            return tree_path
+        return fetch_file(os.path.basename(tree_path), KIND_SIGNATURES)
+    
+    def _write_signature(self, signature_path, signature, digest, digest_algorithm, user_id, private_key,
+                         document_path):
+        """
+        Write a signature container and build the matching metadata.
+        
+        Args:
+            signature_path (str): Path of the container
+            signature (bytes): Digital signature
+            digest (bytes): Signed digest
+            digest_algorithm (str): How the digest was computed
+            user_id (str): User identifier
+            private_key: Loaded private key that made the signature
+            document_path (str): Path to the signed document
             
-            with open(signature_path, 'wb') as f:
-                f.write(signature)
+        Returns:
+            tuple: (signature_path, metadata)
+        """
+        timestamp = datetime.now(timezone.utc)
+        fingerprint = key_fingerprint(self.digital_signature.get_public_key_pem(private_key))
+        algorithm = self.digital_signature.get_signature_algorithm(private_key)
+        
+        write_container(
+            signature_path,
+            signature=signature,
+            digest=digest,
+            algorithm=algorithm,
+            key_fingerprint=fingerprint,
+            signer_id=user_id,
+            document=os.path.basename(document_path),
+            timestamp=timestamp,
+            digest_algorithm=digest_algorithm
+        )
+        
+        metadata = {
+            'document': os.path.basename(document_path),
+            'signature': os.path.basename(signature_path),
+            'signer_id': user_id,
+            'algorithm': algorithm,
+            'key_fingerprint': fingerprint,
+            'timestamp': timestamp.isoformat(),
+            'digest': digest.hex(),
+            'digest_algorithm': digest_algorithm
+        }
+        
+        return signature_path, metadata
+    
+    def read_signature(self, signature_path):
+        """
+        Read a signature file, either a container or a legacy raw .sig file.
+        
+        Args:
+            signature_path (str): Path to the signature file
             
-            # Create metadata
-            metadata = {
-                'document': os.path.basename(document_path),
-                'signature': signature_filename,
-                'signer_id': user_id,
-                'timestamp': str(datetime.now())
-            }
+        Returns:
+            dict: Container fields; a legacy file only has 'signature'
+        """
+        return read_signature_file(signature_path)
+    
+    def verify_signature(self, document_path, signature_path, public_key, force=False):
+        """
+        Verify a document's signature.
+        
+        Results are cached by (document digest, signature digest, key
+        fingerprint); a repeat verification of unchanged inputs only hashes
+        the document and looks the result up.
+        
+        Args:
+            document_path (str): Path to the document
+            signature_path (str): Path to the signature
+            public_key (str): Public key in PEM format
+            force (bool): Verify cryptographically even if a result is cached
+            
+        Returns:
+            bool: True if signature is valid, False otherwise
+        """
+        try:
+            # Read signature
+            container = self.read_signature(signature_path)
+            signature = container['signature']
             
-            # Save metadata
-            metadata_filename = f"signature_{os.path.basename(document_path)}.json"
-            metadata_path = os.path.join(current_app.config['UPLOAD_FOLDER'], metadata_filename)
+            fingerprint = self.get_key_fingerprint(public_key)
+            digest, document_data = self._read_document(document_path, container)
+            cache_key = (digest.hex(), hashlib.sha256(signature).hexdigest())
             
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            if not force:
+                cached = self._cached_results(fingerprint, [cache_key])
+                if cache_key in cached:
+                    return cached[cache_key]
             
-            return signature_path, metadata
+            # Verify signature against the cached key object
+            valid = self._verify_loaded(digest, document_data, signature, self.get_public_key(public_key))
+            self._store_results(fingerprint, {cache_key: valid})
+            return valid
             
         except Exception as e:
-            current_app.logger.error(f"Signing failed: {str(e)}")
-            return None, None
+            current_app.logger.error(f"Verification failed: {str(e)}")
+            return False
     
-    def verify_signature(self, document_path, signature_path, public_key):
+    def verify_range(self, document_path, signature_path, public_key, start, end):
         """
-        Verify a document's signature.
+        Verify a byte range of a Merkle-signed document.
+        
+        The stored tree is checked against the signed root, then only the
+        chunks overlapping the range are read and hashed.
         
         Args:
             document_path (str): Path to the document
-            signature_path (str): Path to the signature
+            signature_path (str): Path to the signature container
             public_key (str): Public key in PEM format
+            start (int): First byte of the range
+            end (int): Byte after the last one
             
         Returns:
-            bool: True if signature is valid, False otherwise
+            bool: True if the signature and every chunk in the range are valid
         """
         try:
-            # Read document
-            with open(document_path, 'rb') as f:
-                document_data = f.read()
+            container = self.read_signature(signature_path)
+            chunk_size = merkle.parse_digest_algorithm(container.get('digest_algorithm'))
+            if not chunk_size:
+                current_app.logger.error("Range verification requires a Merkle signature")
+                return False
             
-            # Read signature
-            with open(signature_path, 'rb') as f:
-                signature = f.read()
+            tree = merkle.MerkleTree.load(self._tree_path(signature_path))
+            if tree.root != container['digest'] or not self.digital_signature.verify_digest(
+                    tree.root, container['signature'], self.get_public_key(public_key)):
+                return False
             
-            # Verify signature
-            return self.digital_signature.verify_signature(document_data, signature, public_key)
+            with open(document_path, 'rb') as f:
+                for index in tree.chunk_range(start, end):
+                    f.seek(index * tree.chunk_size)
+                    if merkle.hash_leaf(f.read(tree.chunk_size)) != tree.leaves[index]:
+                        return False
+            return True
             
         except Exception as e:
-            current_app.logger.error(f"Verification failed: {str(e)}")
+            current_app.logger.error(f"Range verification failed: {str(e)}")
             return False
+    
+    def verify_payload_chunks(self, document_path, signature_path, public_key, first, last):
+        """
+        Verify chunks of the payload of a Merkle-signed encrypted document.
+        
+        Args:
+            document_path (str): Path to the encrypted document
+            signature_path (str): Path to the signature container
+            public_key (str): Public key in PEM format
+            first (int): Index of the first payload chunk
+            last (int): Index of the last payload chunk
+            
+        Returns:
+            bool: True if the signature and the chunks are valid
+        """
+        try:
+            start, end = payload_chunk_range(document_path, first, last)
+        except (OSError, ValueError) as e:
+            current_app.logger.error(f"Payload chunk verification failed: {str(e)}")
+            return False
+        return self.verify_range(document_path, signature_path, public_key, start, end)
+    
+    def resign_document(self, document_path, signature_path, user_id, changed_ranges, password=None,
+                        encrypted_private_key=None, private_key=None):
+        """
+        Re-sign a Merkle-signed document after parts of it changed in place.
+        
+        Only the chunks overlapping the changed ranges are rehashed, each
+        updating a single path up the tree, and only their leaves are
+        rewritten in a copy of the tree file. A document whose size changed
+        is rehashed in full. The ranges are trusted: a change outside them
+        leaves a root that no longer verifies against the document.
+        
+        Stored signatures are immutable, so the result is a new container
+        and tree; the caller points the document at it, and the upload GC
+        collects the old files once nothing references them.
+        
+        Args:
+            document_path (str): Path to the document
+            signature_path (str): Path to the current signature container
+            user_id (str): User identifier
+            changed_ranges (list): (start, end) byte ranges that changed
+            password (str): Password to decrypt the private key
+            encrypted_private_key (str): Encrypted private key
+            private_key: Private key unlocked earlier in the session
+            
+        Returns:
+            tuple: (signature_path, metadata) of the new signature
+        """
+        try:
+            if private_key is None:
+                private_key = self.digital_signature.decrypt_private_key(encrypted_private_key, password)
+            if isinstance(private_key, str):
+                private_key = self.digital_signature.load_private_key(private_key)
+            
+            container = self.read_signature(signature_path)
+            chunk_size = merkle.parse_digest_algorithm(container.get('digest_algorithm'))
+            if not chunk_size:
+                raise ValueError("Incremental re-signing requires a Merkle signature")
+            
+            tree_path = self._tree_path(signature_path)
+            tree = merkle.MerkleTree.load(tree_path)
+            
+            indexes = None
+            if tree.size != os.path.getsize(document_path):
+                tree = merkle.MerkleTree.from_file(document_path, chunk_size)
+            else:
+                indexes = set()
+                for start, end in changed_ranges:
+                    indexes.update(tree.chunk_range(start, end))
+                with open(document_path, 'rb') as f:
+                    for index in sorted(indexes):
+                        f.seek(index * chunk_size)
+                        tree.update_leaf(index, f.read(chunk_size))
+            
+            # Sign before writing anything, so a failure leaves no partial signature
+            signature = self.digital_signature.sign_digest(tree.root, private_key)
+            
+            new_path = get_storage_path(f"signature_{uuid.uuid4().hex}{CONTAINER_EXTENSION}",
+                                        kind=KIND_SIGNATURES)
+            new_tree_path = merkle.tree_filename(new_path)
+            if indexes is None:
+                tree.save(new_tree_path)
+            else:
+                shutil.copyfile(tree_path, new_tree_path)
+                tree.save_leaves(new_tree_path, indexes)
+            result = self._write_signature(new_path, signature, tree.root, merkle.digest_algorithm(chunk_size),
+                                           user_id, private_key, document_path)
+            self._publish_signature(new_path)
+            return result
+            
+        except Exception as e:
+            current_app.logger.error(f"Re-signing failed: {str(e)}")
+            return None, None
+    
+    def verify_documents(self, documents, max_workers=None, force=False):
+        """
+        Verify the signatures of many documents in parallel.
+        
+        Signers are loaded from the database in one query and each distinct
+        public key is parsed once; results are yielded per document as soon
+        as each verification finishes.
+        
+        Args:
+            documents (list): Signed Document objects
+            max_workers (int): Size of the worker pool, defaults to the
+                SIGNATURE_VERIFY_WORKERS setting
+            force (bool): Verify cryptographically even if results are cached
+            
+        Yields:
+            dict: {'document_id', 'valid', 'error', 'cached'} for each document
+        """
+        from src.models.user import User
+        
+        signer_ids = {document.signer_id for document in documents if document.signer_id}
+        public_keys = {}
+        if signer_ids:
+            public_keys = {
+                user.id: user.public_key
+                for user in User.query.filter(User.id.in_(signer_ids)).all()
+            }
+        
+        items = []
+        for document in documents:
+            public_key = public_keys.get(document.signer_id)
+            signature_path = document.get_signature_path()
+            if not document.is_signed or not signature_path:
+                yield {'document_id': document.id, 'valid': False, 'error': 'Document is not signed', 'cached': False}
+            elif not public_key:
+                yield {'document_id': document.id, 'valid': False, 'error': 'Signer not found', 'cached': False}
+            else:
+                items.append({
+                    'document_id': document.id,
+                    'document_path': document.get_file_path(),
+                    'signature_path': signature_path,
+                    'public_key': public_key
+                })
+        
+        if max_workers is None:
+            max_workers = current_app.config.get('SIGNATURE_VERIFY_WORKERS')
+        
+        yield from self.verify_batch(items, max_workers, force)
+    
+    def verify_batch(self, items, max_workers=None, force=False):
+        """
+        Verify many signatures in parallel, grouped by signer key.
+        
+        Signatures are read and the signer's cached results for them loaded
+        up front, so workers never touch the database. New results are
+        stored as each signer's group completes, and whatever completed is
+        stored if the caller stops consuming early.
+        
+        Args:
+            items (list): Dicts with 'document_id', 'document_path',
+                'signature_path' and 'public_key' (PEM)
+            max_workers (int): Size of the worker pool, defaults to the CPU count
+            force (bool): Verify cryptographically even if results are cached
+            
+        Yields:
+            dict: {'document_id', 'valid', 'error', 'cached'} in completion order
+        """
+        # Group by signer so each key is parsed once before the pool starts
+        groups = {}
+        for item in items:
+            groups.setdefault(self.get_key_fingerprint(item['public_key']), []).append(item)
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+        futures = {}
+        pending = {}
+        new_results = {}
+        try:
+            for fingerprint, group in groups.items():
+                public_key = self.get_public_key(group[0]['public_key'])
+                
+                containers = []
+                for item in group:
+                    try:
+                        containers.append((item, self.read_signature(item['signature_path'])))
+                    except Exception as e:
+                        yield {'document_id': item['document_id'], 'valid': False, 'error': str(e), 'cached': False}
+                
+                cached = {}
+                if not force:
+                    cached = self._cached_results(fingerprint, signature_digests=[
+                        hashlib.sha256(container['signature']).hexdigest() for _, container in containers
+                    ])
+                
+                pending[fingerprint] = len(containers)
+                for item, container in containers:
+                    future = executor.submit(self._verify_item, item, container, public_key, cached)
+                    futures[future] = fingerprint
+            
+            for future in as_completed(futures):
+                fingerprint = futures[future]
+                result = self._collect_result(future, new_results.setdefault(fingerprint, {}))
+                pending[fingerprint] -= 1
+                if not pending[fingerprint]:
+                    self._store_results(fingerprint, new_results.pop(fingerprint))
+                yield result
+        finally:
+            # A consumer that stops early, e.g. a disconnected client, cancels the queued items
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, fingerprint in futures.items():
+                if fingerprint in new_results and future.done() and not future.cancelled():
+                    self._collect_result(future, new_results[fingerprint])
+            for fingerprint, results in new_results.items():
+                if results:
+                    self._store_results(fingerprint, results)
+    
+    def _collect_result(self, future, new_results):
+        """
+        Get a finished batch item's result, noting it for storage if it was verified.
+        
+        Args:
+            future (Future): Finished _verify_item call
+            new_results (dict): Validity by cache key of the item's signer, updated in place
+            
+        Returns:
+            dict: {'document_id', 'valid', 'error', 'cached'}
+        """
+        result, cache_key = future.result()
+        if cache_key is not None and not result['cached']:
+            new_results[cache_key] = result['valid']
+        return result
+    
+    def _verify_item(self, item, container, public_key, cached):
+        """
+        Verify one batch item. Runs in a worker thread, so it must not use
+        the application context.
+        
+        Args:
+            item (dict): Batch item
+            container (dict): The item's signature container
+            public_key: Loaded public key object
+            cached (dict): Cached results of the item's signer by cache key
+            
+        Returns:
+            tuple: ({'document_id', 'valid', 'error', 'cached'}, cache key or None)
+        """
+        try:
+            signature = container['signature']
+            
+            digest, document_data = self._read_document(item['document_path'], container)
+            cache_key = (digest.hex(), hashlib.sha256(signature).hexdigest())
+            if cache_key in cached:
+                return {'document_id': item['document_id'], 'valid': cached[cache_key],
+                        'error': None, 'cached': True}, cache_key
+            
+            valid = self._verify_loaded(digest, document_data, signature, public_key)
+            return {'document_id': item['document_id'], 'valid': valid, 'error': None, 'cached': False}, cache_key
+        except Exception as e:
+            return {'document_id': item['document_id'], 'valid': False, 'error': str(e), 'cached': False}, None
+    
+    def _read_document(self, document_path, container=None):
+        """
+        Hash a document, also returning its content when not streaming.
+        
+        Args:
+            document_path (str): Path to the document
+            container (dict): Signature container, selects a Merkle root
+                instead of a plain digest when the document was signed so
+            
+        Returns:
+            tuple: (SHA-256 digest or Merkle root, document bytes or None)
+        """
+        chunk_size = merkle.parse_digest_algorithm((container or {}).get('digest_algorithm'))
+        if chunk_size:
+            return merkle.MerkleTree.from_file(document_path, chunk_size).root, None
+        
+        if self.streaming:
+            return self.hash_document(document_path), None
+        
+        with open(document_path, 'rb') as f:
+            document_data = f.read()
+        return hashlib.sha256(document_data).digest(), document_data
+    
+    def _merkle_chunk_size(self, document_path, merkle_mode):
+        """
+        Decide whether a document is signed as a Merkle tree.
+        
+        Args:
+            document_path (str): Path to the document
+            merkle_mode (bool): Explicit choice, or None to compare the size
+                with the SIGNATURE_MERKLE_MIN_SIZE setting
+            
+        Returns:
+            int: Chunk size for Merkle signing, or None for a plain digest
+        """
+        if merkle_mode is None:
+            min_size = current_app.config.get('SIGNATURE_MERKLE_MIN_SIZE', 0)
+            merkle_mode = bool(min_size) and os.path.getsize(document_path) >= min_size
+        if not merkle_mode:
+            return None
+        return current_app.config.get('SIGNATURE_MERKLE_CHUNK_SIZE', merkle.MERKLE_CHUNK_SIZE)
+    
+    def _verify_loaded(self, digest, document_data, signature, public_key):
+        """
+        Verify a signature with an already loaded public key.
+        
+        Args:
+            digest (bytes): SHA-256 digest of the document
+            document_data (bytes): Document content, or None to verify the digest
+            signature (bytes): Digital signature
+            public_key: Loaded public key object
+            
+        Returns:
+            bool: True if signature is valid, False otherwise
+        """
+        if document_data is None:
+            return self.digital_signature.verify_digest(digest, signature, public_key)
+        return self.digital_signature.verify_signature(document_data, signature, public_key)
+    
+    def _cached_results(self, fingerprint, cache_keys=None, signature_digests=None):
+        """
+        Load a signer key's cached verification results for given inputs.
+        
+        Args:
+            fingerprint (str): Public key fingerprint
+            cache_keys (list): (document digest, signature digest) pairs to look up
+            signature_digests (list): Signature digests to look up the results
+                of, whatever the document digest, when cache_keys is None
+            
+        Returns:
+            dict: Validity by (document digest, signature digest)
+        """
+        if cache_keys is not None:
+            column = tuple_(VerificationResult.document_digest, VerificationResult.signature_digest)
+            values = list(cache_keys)
+        else:
+            column = VerificationResult.signature_digest
+            values = list(set(signature_digests or ()))
+        
+        try:
+            cached = {}
+            for i in range(0, len(values), CACHE_LOOKUP_BATCH_SIZE):
+                query = VerificationResult.query.filter_by(key_fingerprint=fingerprint) \
+                    .filter(column.in_(values[i:i + CACHE_LOOKUP_BATCH_SIZE]))
+                cached.update({
+                    (result.document_digest, result.signature_digest): result.valid
+                    for result in query.all()
+                })
+            return cached
+        except Exception as e:
+            current_app.logger.error(f"Error loading cached verification results: {str(e)}")
+            return {}
+    
+    def _store_results(self, fingerprint, results):
+        """
+        Store verification results, replacing older results for the same inputs.
+        
+        Args:
+            fingerprint (str): Public key fingerprint
+            results (dict): Validity by (document digest, signature digest)
+        """
+        try:
+            keys = list(results)
+            existing = {}
+            for i in range(0, len(keys), CACHE_LOOKUP_BATCH_SIZE):
+                existing.update({
+                    (result.document_digest, result.signature_digest): result
+                    for result in VerificationResult.query.filter_by(key_fingerprint=fingerprint).filter(tuple_(
+                        VerificationResult.document_digest,
+                        VerificationResult.signature_digest
+                    ).in_(keys[i:i + CACHE_LOOKUP_BATCH_SIZE])).all()
+                })
+            for (document_digest, signature_digest), valid in results.items():
+                result = existing.get((document_digest, signature_digest))
+                if result is None:
+                    db.session.add(VerificationResult(
+                        document_digest=document_digest,
+                        signature_digest=signature_digest,
+                        key_fingerprint=fingerprint,
+                        valid=valid
+                    ))
+                else:
+                    result.valid = valid
+                    result.verified_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error storing verification results: {str(e)}")
@@ -0,0 +1,352 @@
+"""
+Garbage collector for orphaned artifacts in the upload folder.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from src.extensions import db
+from src.models.blob import Blob
+from src.models.document import Document
+from src.models.upload_session import UploadSession
+from src.encryption.signature_container import CONTAINER_EXTENSION
+from src.encryption.merkle import MERKLE_EXTENSION
+from src.utils.file_utils import (
+    KIND_DOCUMENTS, KIND_BLOBS, KIND_SIGNATURES, KIND_ENCRYPTED, KIND_DECRYPTED, KIND_USER_KEYS, KIND_PARTIAL
+)
+
+logger = logging.getLogger(__name__)
+
+# Directory of the upload folder that quarantined files are moved to
+QUARANTINE_FOLDER = 'quarantine'
+
+# Default seconds an unreferenced artifact is kept, by rule
+DEFAULT_TTLS = {
+    'temp': 3600,  # Half-written .part and .tmp files of interrupted writes
+    'decrypted': 3600,  # Plaintexts left behind by decryption
+    'orphan': 86400,  # Documents, blobs, ciphertexts and signatures no row references
+    'user_keys': 86400,  # Keys derived for attribute sets rather than users
+    'upload_session': 86400,  # Resumable uploads without activity
+    'cache': 86400,  # Local copies of objects from a remote storage backend
+    'quarantine': 7 * 86400  # Quarantined files before they are deleted
+}
+
+class UploadGarbageCollector:
+    """
+    Finds and removes artifacts in the upload folder that nothing references.
+
+    Each namespace is walked lazily and files older than their rule's TTL
+    are checked against the database in batches, so memory stays bounded
+    however many files there are. The TTL also protects files that are
+    still being written or whose row is not committed yet. Removed files
+    are deleted, or moved to a quarantine folder that is purged later.
+    """
+
+    def __init__(self, interval=0, batch_size=500, ttls=None, quarantine=False):
+        """
+        Initialize the collector.
+
+        Args:
+            interval (float): Seconds between background runs, 0 disables them
+            batch_size (int): Files checked against the database per query
+            ttls (dict): Seconds to keep each kind of artifact, see DEFAULT_TTLS
+            quarantine (bool): Move files to the quarantine folder instead of deleting them
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.quarantine = quarantine
+        self._condition = threading.Condition()
+        self._thread = None
+        self._app = None
+        self._stopping = False
+        self.last_run = None
+
+    def configure(self, interval=None, batch_size=None, ttls=None, quarantine=None):
+        """
+        Update the collector settings.
+
+        Args:
+            interval (float): Seconds between background runs, 0 disables them
+            batch_size (int): Files checked against the database per query
+            ttls (dict): TTLs overriding the current ones
+            quarantine (bool): Move files to the quarantine folder instead of deleting them
+        """
+        with self._condition:
+            if interval is not None:
+                self.interval = interval
+            if batch_size is not None:
+                self.batch_size = batch_size
+            if ttls:
+                self.ttls.update(ttls)
+            if quarantine is not None:
+                self.quarantine = quarantine
+            self._condition.notify_all()
+
+    def start(self, app):
+        """
+        Start the background thread if enabled and not running.
+
+        Args:
+            app: Flask application the runs use the context of
+        """
+        with self._condition:
+            self._app = app
+            if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='upload-gc', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collect(self, directory, cache_folder=None, dry_run=False, now=None):
+        """
+        Run one collection over an upload folder. Needs an application context.
+
+        Args:
+            directory (str): Upload folder
+            cache_folder (str): Local cache of the storage backend, defaults to directory/cache
+            dry_run (bool): Only count what would be removed
+            now (float): Current time as a timestamp, defaults to now
+
+        Returns:
+            dict: Per rule counts of 'expired' files, 'kept' referenced ones,
+                'removed' ones and 'bytes' freed
+        """
+        if now is None:
+            now = time.time()
+        stats = {}
+
+        expired_uploads = self._expire_upload_sessions(now, dry_run, stats)
+
+        def referenced_uploads(names):
+            # A dry run keeps the expired rows, which must not keep their partial files
+            return self._referenced_uploads(names) - expired_uploads
+
+        for kind, is_referenced in (
+            (KIND_DOCUMENTS, self._referenced_documents),
+            (KIND_ENCRYPTED, self._referenced_documents),
+            (KIND_DECRYPTED, self._referenced_documents),
+            (KIND_BLOBS, self._referenced_blobs),
+            (KIND_SIGNATURES, self._referenced_signatures),
+            (KIND_USER_KEYS, self._referenced_user_keys),
+            (KIND_PARTIAL, referenced_uploads)
+        ):
+            batch = []
+            for path, name, size, mtime in self._walk(os.path.join(directory, kind)):
+                rule = self._rule(kind, name)
+                if now - mtime <= self.ttls[rule]:
+                    continue
+                batch.append((rule, path, name, size))
+                if len(batch) >= self.batch_size:
+                    self._collect_batch(directory, batch, is_referenced, dry_run, stats)
+                    batch = []
+            if batch:
+                self._collect_batch(directory, batch, is_referenced, dry_run, stats)
+
+        # Neither cached copies nor quarantined files are referenced by anything
+        for folder, rule in (
+            (cache_folder or os.path.join(directory, 'cache'), 'cache'),
+            (os.path.join(directory, QUARANTINE_FOLDER), 'quarantine')
+        ):
+            for path, name, size, mtime in self._walk(folder):
+                if now - mtime > self.ttls[rule]:
+                    self._count(stats, rule, 'expired')
+                    if not dry_run:
+                        self._delete(path)
+                    self._count(stats, rule, 'removed')
+                    self._count(stats, rule, 'bytes', size)
+
+        self.last_run = datetime.utcnow()
+        return stats
+
+    def _run(self):
+        """Collect every interval until stopped."""
+        while True:
+            with self._condition:
+                started = time.monotonic()
+                # Re-read the interval on every wakeup so configure() takes effect right away
+                while not self._stopping and time.monotonic() < started + self.interval:
+                    self._condition.wait(started + self.interval - time.monotonic())
+                if self._stopping:
+                    return
+                app = self._app
+
+            try:
+                with app.app_context():
+                    stats = self.collect(app.config['UPLOAD_FOLDER'], app.config['STORAGE_CACHE_FOLDER'])
+                removed = sum(counts.get('removed', 0) for counts in stats.values())
+                if removed:
+                    logger.info("Upload GC removed %d files", removed)
+            except Exception as e:
+                logger.error("Upload GC failed: %s", e)
+
+    def _rule(self, kind, name):
+        """Get the TTL rule of a file."""
+        if name.endswith('.part') and kind != KIND_PARTIAL or name.endswith('.tmp'):
+            return 'temp'
+        if kind == KIND_DECRYPTED:
+            return 'decrypted'
+        if kind == KIND_USER_KEYS:
+            return 'user_keys'
+        if kind == KIND_PARTIAL:
+            return 'upload_session'
+        return 'orphan'
+
+    def _collect_batch(self, directory, batch, is_referenced, dry_run, stats):
+        """Remove the expired files of a batch that no row references."""
+        candidates = [name for rule, _, name, _ in batch if rule != 'temp']
+        referenced = is_referenced(candidates) if candidates else set()
+
+        for rule, path, name, size in batch:
+            self._count(stats, rule, 'expired')
+            if name in referenced:
+                self._count(stats, rule, 'kept')
+                continue
+            if not dry_run:
+                self._remove(directory, path)
+            self._count(stats, rule, 'removed')
+            self._count(stats, rule, 'bytes', size)
+
+    def _expire_upload_sessions(self, now, dry_run, stats):
+        """
+        Abort resumable uploads idle for longer than their TTL, in batches.
+
+        Returns:
+            set: Names of the partial files of the aborted uploads
+        """
+        expired = set()
+        cutoff = datetime.utcfromtimestamp(now) - timedelta(seconds=self.ttls['upload_session'])
+        last_id = ''
+        while True:
+            uploads = UploadSession.query.filter(UploadSession.updated_at < cutoff, UploadSession.id > last_id) \
+                .order_by(UploadSession.id).limit(self.batch_size).all()
+            if not uploads:
+                break
+            last_id = uploads[-1].id
+
+            for upload in uploads:
+                self._count(stats, 'upload_session', 'sessions')
+                expired.add(upload.part_filename)
+                if not dry_run:
+                    # The partial file is collected with the other unreferenced ones
+                    db.session.delete(upload)
+            if not dry_run:
+                db.session.commit()
+
+        return expired
+
+    def _referenced_documents(self, names):
+        """Get the names used as a Document filename."""
+        rows = db.session.query(Document.filename).filter(Document.filename.in_(names)).all()
+        return {row[0] for row in rows}
+
+    def _referenced_blobs(self, names):
+        """Get the names of blob files that have a Blob row."""
+        rows = db.session.query(Blob.digest).filter(Blob.digest.in_(names)).all()
+        return {row[0] for row in rows}
+
+    def _referenced_signatures(self, names):
+        """
+        Get the names of signature files that a Document references, with
+        their Merkle trees and the JSON sidecars of legacy signatures.
+        """
+        files_by_signature = {}
+        for name in names:
+            if name.endswith(MERKLE_EXTENSION):
+                base = name[:-len(MERKLE_EXTENSION)]
+                signatures = (base + CONTAINER_EXTENSION, base + '.sig')
+            elif name.endswith('.json'):
+                # Read by convert_signatures.py until the signature is converted
+                signatures = (name[:-len('.json')] + '.sig',)
+            else:
+                signatures = (name,)
+            for signature in signatures:
+                files_by_signature.setdefault(signature, set()).add(name)
+
+        rows = db.session.query(Document.signature_file) \
+            .filter(Document.signature_file.in_(list(files_by_signature))).all()
+        return {name for row in rows for name in files_by_signature[row[0]]}
+
+    def _referenced_user_keys(self, names):
+        """Get the names of key files that belong to an existing user."""
+        from src.models.user import User
+
+        user_ids = {}
+        for name in names:
+            user_id = name[len('user_'):-len('_keys.json')]
+            if user_id.isdigit():
+                user_ids[int(user_id)] = name
+
+        if not user_ids:
+            return set()
+        rows = db.session.query(User.id).filter(User.id.in_(list(user_ids))).all()
+        return {user_ids[row[0]] for row in rows}
+
+    def _referenced_uploads(self, names):
+        """Get the names of partial files whose upload is still open."""
+        upload_ids = {name[len('upload_'):-len('.part')]: name for name in names}
+        rows = db.session.query(UploadSession.id).filter(UploadSession.id.in_(list(upload_ids))).all()
+        return {upload_ids[row[0]] for row in rows}
+
+    def _remove(self, directory, path):
+        """Delete a file or move it to the quarantine folder."""
+        if not self.quarantine:
+            self._delete(path)
+            return
+
+        target = os.path.join(directory, QUARANTINE_FOLDER, os.path.relpath(path, directory))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+            # Start the quarantine TTL now rather than at the file's last write
+            os.utime(target)
+        except FileNotFoundError:
+            pass
+
+    def _delete(self, path):
+        """Delete a file that may already be gone."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _walk(self, root):
+        """
+        Lazily yield (path, name, size, mtime) for every file below a directory.
+        """
+        if not os.path.isdir(root):
+            return
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            try:
+                                stat = entry.stat()
+                            except FileNotFoundError:
+                                continue
+                            yield entry.path, entry.name, stat.st_size, stat.st_mtime
+            except FileNotFoundError:
+                continue
+
+    def _count(self, stats, rule, counter, amount=1):
+        """Add to a per rule counter."""
+        counts = stats.setdefault(rule, {})
+        counts[counter] = counts.get(counter, 0) + amount
+
+# Shared collector, only runs in the background when GC_INTERVAL is above zero
+upload_gc = UploadGarbageCollector()
@@ -0,0 +1,246 @@
+"""
+Resumable upload service for the web application.
+"""
+
+import os
+import fcntl
+import secrets
+from datetime import datetime
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest, Conflict, RequestEntityTooLarge
+from src.models.upload_session import UploadSession
+from src.services.document_service import DocumentService
+from src.services.encryption_service import EncryptionService
+from src.storage import remove_file
+from src.utils.file_utils import get_file_path, get_storage_path, delete_file, UPLOAD_CHUNK_SIZE, KIND_PARTIAL
+
+class UploadService:
+    """
+    Service for resumable uploads sent as a series of chunks.
+
+    A client opens an upload, PUTs chunks at increasing offsets and
+    finalizes it. Each chunk is appended to a partial file as it arrives,
+    so no request carries more than one chunk and an interrupted upload
+    resumes from the last offset the server recorded. Requests touching
+    the partial file hold an exclusive lock on it; one arriving while
+    another holds it gets a 409.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the upload service.
+
+        Args:
+            db: Database instance
+        """
+        self.db = db
+
+    def create_upload(self, user_id, filename, size=None, content_type=None):
+        """
+        Open a resumable upload.
+
+        Args:
+            user_id (int): ID of the uploading user
+            filename (str): Original filename
+            size (int): Total size in bytes if known up front
+            content_type (str): MIME type of the document
+
+        Returns:
+            UploadSession: The new upload
+
+        Raises:
+            RequestEntityTooLarge: If the declared size exceeds RESUMABLE_UPLOAD_MAX_SIZE
+        """
+        max_size = current_app.config['RESUMABLE_UPLOAD_MAX_SIZE']
+        if size is not None and size > max_size:
+            raise RequestEntityTooLarge(f"Upload exceeds {max_size} bytes")
+
+        upload = UploadSession(
+            id=secrets.token_hex(16),
+            user_id=user_id,
+            filename=filename,
+            content_type=content_type,
+            size=size,
+            received=0
+        )
+
+        # Create the empty partial file so every chunk is an append
+        open(get_storage_path(upload.part_filename, kind=KIND_PARTIAL), 'wb').close()
+
+        self.db.session.add(upload)
+        self.db.session.commit()
+
+        return upload
+
+    def get_upload(self, upload_id, user_id):
+        """
+        Get an upload owned by a user.
+
+        Args:
+            upload_id (str): Upload ID
+            user_id (int): ID of the uploading user
+
+        Returns:
+            UploadSession: The upload, or None if it does not exist or belongs to someone else
+        """
+        return UploadSession.query.filter_by(id=upload_id, user_id=user_id).first()
+
+    def write_chunk(self, upload, offset, stream):
+        """
+        Append a chunk to an upload.
+
+        The chunk must start where the previous one ended. Bytes past the
+        recorded offset, such as the torn tail of an interrupted chunk, are
+        discarded before writing, and the offset only advances once the
+        whole chunk is on disk.
+
+        Args:
+            upload (UploadSession): The upload
+            offset (int): Offset the chunk starts at
+            stream: Readable binary stream with the chunk, e.g. request.stream
+
+        Returns:
+            int: Offset the next chunk must start at
+
+        Raises:
+            Conflict: If the offset is not the one the server expects, or
+                another request is writing to the upload
+            RequestEntityTooLarge: If the chunk goes past the declared size
+                or RESUMABLE_UPLOAD_MAX_SIZE
+        """
+        if offset != upload.received:
+            raise Conflict(f"Expected offset {upload.received}")
+
+        limit = upload.size if upload.size is not None else current_app.config['RESUMABLE_UPLOAD_MAX_SIZE']
+        part_path = get_file_path(upload.part_filename, kind=KIND_PARTIAL)
+
+        with open(part_path, 'r+b') as f:
+            # Truncate, write and advance the offset under the lock, so a
+            # failing chunk cannot cut into the retry that replaces it
+            self._lock(f, upload)
+            if offset != upload.received:
+                raise Conflict(f"Expected offset {upload.received}")
+
+            f.seek(offset)
+            f.truncate()
+            end = offset
+            try:
+                for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                    end += len(chunk)
+                    if end > limit:
+                        raise RequestEntityTooLarge(f"Upload exceeds {limit} bytes")
+                    f.write(chunk)
+                f.flush()
+            except BaseException:
+                f.truncate(offset)
+                raise
+
+            # Advance only from the offset this chunk was written at, in case
+            # the lock is not shared, e.g. between hosts on some network filesystems
+            updated = UploadSession.query.filter_by(id=upload.id, received=offset) \
+                .update({UploadSession.received: end, UploadSession.updated_at: datetime.utcnow()},
+                        synchronize_session=False)
+            self.db.session.commit()
+            if not updated:
+                raise Conflict("The upload was changed by another request")
+
+        self.db.session.refresh(upload)
+        return end
+
+    def finalize(self, upload, encrypt=False, access_policy=None, encryption_method='hybrid'):
+        """
+        Turn a complete upload into a document.
+
+        The partial file is moved into the blob store as is; when encrypting,
+        it is streamed through the cipher once and then deleted, so the
+        plaintext does not become a document.
+
+        Args:
+            upload (UploadSession): The upload
+            encrypt (bool): Encrypt the document instead of storing the plaintext
+            access_policy (str): Access policy, required when encrypting
+            encryption_method (str): Encryption method recorded for the document
+
+        Returns:
+            Document: The stored document, or the encrypted one when encrypting
+
+        Raises:
+            BadRequest: If bytes are missing, or encrypting without an access policy
+            Conflict: If a chunk is being written
+        """
+        if encrypt and not access_policy:
+            raise BadRequest("Access policy is required")
+
+        document_service = DocumentService(self.db)
+        part_path = get_file_path(upload.part_filename, kind=KIND_PARTIAL)
+
+        with open(part_path, 'r+b') as part_file:
+            # No chunk may be written while the partial file is consumed
+            self._lock(part_file, upload)
+            if upload.size is not None and upload.received != upload.size:
+                raise BadRequest(f"Upload is incomplete: {upload.received} of {upload.size} bytes received")
+            # Drop the torn tail of a chunk interrupted by a crash
+            part_file.truncate(upload.received)
+
+            if encrypt:
+                with open(part_path, 'rb') as f:
+                    _, metadata = EncryptionService().encrypt_upload(
+                        f, access_policy, str(upload.user_id)
+                    )
+                try:
+                    _, document = document_service.save_encrypted_upload(
+                        FileStorage(filename=upload.filename, content_type=upload.content_type),
+                        metadata,
+                        encryption_method,
+                        access_policy,
+                        upload.user_id
+                    )
+                except Exception:
+                    self.db.session.rollback()
+                    remove_file(metadata['encrypted_file'])
+                    raise
+                os.remove(part_path)
+            else:
+                document = document_service.save_document_file(
+                    part_path, upload.filename, upload.content_type, upload.user_id
+                )
+
+            self.db.session.delete(upload)
+            self.db.session.commit()
+
+        return document
+
+    def abort(self, upload):
+        """
+        Cancel an upload and delete the bytes received so far.
+
+        Args:
+            upload (UploadSession): The upload
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            delete_file(upload.part_filename, kind=KIND_PARTIAL)
+            self.db.session.delete(upload)
+            self.db.session.commit()
+            return True
+        except Exception as e:
+            current_app.logger.error(f"Error aborting upload: {str(e)}")
+            self.db.session.rollback()
+            return False
+
+    def _lock(self, part_file, upload):
+        """
+        Take the exclusive lock of an upload's partial file, released when
+        the file is closed, and reload the upload's offset under it.
+
+        Raises:
+            Conflict: If another request holds the lock
+        """
+        try:
+            fcntl.flock(part_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise Conflict("Another request is writing to the upload")
+        self.db.session.refresh(upload)
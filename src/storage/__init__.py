@@ -0,0 +1,112 @@
+"""
+Storage backends for document content.
+
+Everything a node produces for later requests lives in the backend: blobs,
+signature containers and their Merkle trees, and ciphertexts. Decrypted
+output goes straight into the blob store. Three kinds stay in the local
+upload folder: partial uploads, which are appended in place under a file
+lock; and user keys, authority keys and global parameters, which are
+rewritten in place while the backend's objects are immutable and cached
+per node, and which as secrets belong in a secret store rather than next
+to the documents.
+"""
+
+import os
+from flask import current_app
+from src.storage.base import StorageBackend
+from src.storage.local import LocalStorage
+from src.storage.s3 import S3Storage
+from src.utils.file_utils import storage_key, get_file_path, delete_file
+
+def create_storage(config):
+    """
+    Create the storage backend selected by the application config.
+
+    Args:
+        config (dict): Application config
+
+    Returns:
+        StorageBackend: 'local' stores under UPLOAD_FOLDER, 's3' in the
+            STORAGE_S3_BUCKET bucket
+    """
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['STORAGE_S3_BUCKET'],
+            cache_folder=config['STORAGE_CACHE_FOLDER'] or os.path.join(config['UPLOAD_FOLDER'], 'cache'),
+            prefix=config['STORAGE_S3_PREFIX'],
+            endpoint_url=config['STORAGE_S3_ENDPOINT_URL'],
+            region_name=config['STORAGE_S3_REGION']
+        )
+    raise ValueError(f"Unsupported storage backend: {backend}")
+
+def init_storage(app):
+    """Create the application's storage backend."""
+    app.extensions['storage'] = create_storage(app.config)
+
+def get_storage(app=None):
+    """
+    Get the storage backend of an application.
+
+    Args:
+        app: Flask application, defaults to the current one
+
+    Returns:
+        StorageBackend: The backend
+    """
+    return (app or current_app).extensions['storage']
+
+def publish_file(file_path, kind=None):
+    """
+    Store a file just written into the upload folder as a backend object
+    keyed by its name.
+
+    With the local backend the file already is the object and stays in
+    place; other backends upload it and remove the local file.
+
+    Args:
+        file_path (str): Path returned by get_storage_path
+        kind (str): Artifact kind, inferred from the name when None
+
+    Returns:
+        str: Storage key
+    """
+    key = storage_key(os.path.basename(file_path), kind)
+    storage = get_storage()
+    if storage.local_file(key) != file_path:
+        storage.write_file(key, file_path)
+    return key
+
+def fetch_file(filename, kind=None):
+    """
+    Get a local file with an artifact's content, for code that needs a path.
+
+    Args:
+        filename (str): Artifact filename
+        kind (str): Artifact kind, inferred from the name when None
+
+    Returns:
+        str: Path to the local file, which must not be modified
+
+    Raises:
+        FileNotFoundError: If a remote backend has no such object
+    """
+    key = storage_key(filename, kind)
+    storage = get_storage()
+    if storage.local_file(key) is not None:
+        # Local files may still be in the flat layout
+        return get_file_path(filename, kind=kind)
+    return storage.local_path(key)
+
+def remove_file(filename, kind=None):
+    """
+    Delete an artifact from the storage backend and the upload folder.
+
+    Args:
+        filename (str): Artifact filename
+        kind (str): Artifact kind, inferred from the name when None
+    """
+    delete_file(filename, kind=kind)
+    get_storage().delete(storage_key(filename, kind))
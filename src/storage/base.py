@@ -0,0 +1,120 @@
+"""
+Storage backend interface for document content.
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+class StorageBackend(ABC):
+    """
+    Object store for document content, addressed by '/'-separated keys.
+
+    Backends stream content in both directions and never hold a whole
+    object in memory. Objects are written once and not modified, which
+    lets backends cache them freely.
+    """
+
+    @abstractmethod
+    def open(self, key, start=0, end=None):
+        """
+        Open an object, or a byte range of it, for streaming reads.
+
+        Args:
+            key (str): Object key
+            start (int): First byte
+            end (int): Byte after the last one, None for the end of the object
+
+        Returns:
+            Readable binary stream; the caller closes it
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+        """
+
+    @abstractmethod
+    def write(self, key, stream):
+        """
+        Store an object from a stream; readers never see a partial object.
+
+        Args:
+            key (str): Object key
+            stream: Readable binary stream
+
+        Returns:
+            int: Size in bytes
+        """
+
+    def write_file(self, key, file_path):
+        """
+        Store an object from a local file, which is consumed.
+
+        Args:
+            key (str): Object key
+            file_path (str): Path to a complete local file, removed afterwards
+
+        Returns:
+            int: Size in bytes
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                return self.write(key, f)
+        finally:
+            os.remove(file_path)
+
+    @abstractmethod
+    def delete(self, key):
+        """
+        Delete an object; deleting one that does not exist is not an error.
+
+        Args:
+            key (str): Object key
+        """
+
+    @abstractmethod
+    def stat(self, key):
+        """
+        Get an object's size and modification time.
+
+        Args:
+            key (str): Object key
+
+        Returns:
+            dict: 'size' in bytes and 'modified' datetime, or None if the object does not exist
+        """
+
+    def exists(self, key):
+        """
+        Check whether an object exists.
+
+        Args:
+            key (str): Object key
+
+        Returns:
+            bool: True if the object exists
+        """
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def local_path(self, key):
+        """
+        Get a local file with an object's content, for code that needs a path.
+
+        Args:
+            key (str): Object key
+
+        Returns:
+            str: Path to a local file that must not be modified
+        """
+
+    def local_file(self, key):
+        """
+        Get the local file an object is stored in, without fetching it.
+
+        Args:
+            key (str): Object key
+
+        Returns:
+            str: Path to the object's own file, or None if the backend does
+                not keep objects as local files
+        """
+        return None
@@ -0,0 +1,120 @@
+"""
+Local filesystem storage backend.
+"""
+
+import io
+import os
+import uuid
+import shutil
+from datetime import datetime, timezone
+from src.storage.base import StorageBackend
+
+class LocalStorage(StorageBackend):
+    """
+    Storage in a local directory, one file per object at the key's path.
+
+    Writes go to a temporary file moved into place, so readers see either
+    the old object or the complete new one.
+    """
+
+    def __init__(self, root):
+        """
+        Initialize the backend.
+
+        Args:
+            root (str): Directory objects are stored under
+        """
+        self.root = root
+
+    def open(self, key, start=0, end=None):
+        """Open an object's file, limited to a byte range if one is given."""
+        f = open(self._path(key), 'rb')
+        if start:
+            f.seek(start)
+        if end is None:
+            return f
+        return RangeReader(f, max(0, end - start))
+
+    def write(self, key, stream):
+        """Copy a stream into a temporary file and move it into place."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+                size = f.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return size
+
+    def write_file(self, key, file_path):
+        """Move a local file into place; within one filesystem nothing is copied."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(file_path)
+        os.replace(file_path, path)
+        return size
+
+    def delete(self, key):
+        """Delete an object's file."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def stat(self, key):
+        """Get an object's size and modification time from its file."""
+        try:
+            result = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        return {
+            'size': result.st_size,
+            'modified': datetime.fromtimestamp(result.st_mtime, tz=timezone.utc)
+        }
+
+    def local_path(self, key):
+        """Get the object's own file."""
+        return self._path(key)
+
+    def local_file(self, key):
+        """Get the object's own file."""
+        return self._path(key)
+
+    def _path(self, key):
+        """Map a key to its file path."""
+        return os.path.join(self.root, *key.split('/'))
+
+class RangeReader(io.RawIOBase):
+    """Reader that stops after a fixed number of bytes of a wrapped stream."""
+
+    def __init__(self, stream, length):
+        """
+        Wrap a stream.
+
+        Args:
+            stream: Binary file-like object positioned at the range start
+            length (int): Bytes to read
+        """
+        self._stream = stream
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Read into a buffer without passing the end of the range."""
+        view = memoryview(buffer).cast('B')[:self.remaining]
+        if not len(view):
+            return 0
+        read = self._stream.readinto(view)
+        self.remaining -= read or 0
+        return read
+
+    def close(self):
+        self._stream.close()
+        super().close()
@@ -0,0 +1,116 @@
+"""
+S3-compatible object storage backend.
+"""
+
+import io
+import os
+import uuid
+from src.storage.base import StorageBackend
+
+class S3Storage(StorageBackend):
+    """
+    Storage in an S3-compatible bucket, such as AWS S3 or MinIO.
+
+    boto3 is only needed when this backend is used. Uploads go through
+    boto3's managed transfer, which switches to multipart uploads for
+    large objects, so neither direction buffers a whole object. Code that
+    needs a file path gets a copy in a node-local cache; objects are
+    immutable, so a cached copy never goes stale.
+    """
+
+    def __init__(self, bucket, cache_folder, prefix='', endpoint_url=None, region_name=None):
+        """
+        Initialize the backend.
+
+        Credentials come from boto3's usual sources, e.g. the
+        AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables.
+
+        Args:
+            bucket (str): Bucket name
+            cache_folder (str): Local directory for copies handed out by local_path
+            prefix (str): Prefix prepended to every key
+            endpoint_url (str): Endpoint of an S3-compatible service, None for AWS
+            region_name (str): Region name
+        """
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("The S3 storage backend requires boto3: pip install boto3")
+
+        self.bucket = bucket
+        self.cache_folder = cache_folder
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self._client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+
+    def open(self, key, start=0, end=None):
+        """Open an object, or a byte range of it, as a streaming response body."""
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if start or end is not None:
+            if end is not None and end <= start:
+                return io.BytesIO()
+            params['Range'] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            return self._client.get_object(**params)['Body']
+        except self._client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+    def write(self, key, stream):
+        """Upload an object from a stream, counting the bytes sent."""
+        # Parts of a multipart upload report their progress from several threads
+        transferred = []
+        self._client.upload_fileobj(stream, self.bucket, self._key(key), Callback=transferred.append)
+        return sum(transferred)
+
+    def write_file(self, key, file_path):
+        """Upload an object from a local file, which is removed afterwards."""
+        size = os.path.getsize(file_path)
+        try:
+            self._client.upload_file(file_path, self.bucket, self._key(key))
+        finally:
+            os.remove(file_path)
+        return size
+
+    def delete(self, key):
+        """Delete an object and its cached copy; S3 ignores missing keys itself."""
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        try:
+            os.remove(self._cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def stat(self, key):
+        """Get an object's size and modification time from its headers."""
+        from botocore.exceptions import ClientError
+        try:
+            response = self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'size': response['ContentLength'], 'modified': response['LastModified']}
+
+    def local_path(self, key):
+        """Download an object into the local cache unless it is there already."""
+        from botocore.exceptions import ClientError
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                self._client.download_file(self.bucket, self._key(key), temp_path)
+                os.replace(temp_path, path)
+            except ClientError as e:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                    raise FileNotFoundError(key)
+                raise
+        return path
+
+    def _key(self, key):
+        """Map a key to its object key in the bucket."""
+        return self.prefix + key
+
+    def _cache_path(self, key):
+        """Map a key to its path in the local cache."""
+        return os.path.join(self.cache_folder, *key.split('/'))
@@ -0,0 +1,177 @@
+"""
+Download utility functions for the web application.
+"""
+
+import os
+import mimetypes
+import unicodedata
+from urllib.parse import quote
+from flask import current_app, request, send_file, Response
+from werkzeug.datastructures import ContentRange
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+from src.storage import get_storage
+
+# Values of DOWNLOAD_OFFLOAD
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+OFFLOAD_X_ACCEL_REDIRECT = 'x-accel-redirect'
+
+def send_stored_file(download_name, mimetype=None, key=None, file_path=None, etag=None):
+    """
+    Send a stored file as an attachment, answering conditional and Range requests.
+
+    A request whose If-None-Match matches the given ETag is answered with a
+    304 before the file is looked at. Files kept on local disk are sent by
+    the WSGI server's file wrapper or, with DOWNLOAD_OFFLOAD set, by the
+    front proxy; objects in a remote storage backend are streamed, fetching
+    only the requested range.
+
+    Args:
+        download_name (str): Filename offered to the client
+        mimetype (str): MIME type, guessed from the download name when None
+        key (str): Storage backend key of the file
+        file_path (str): Path to a local file, used when no key is given
+        etag (str): Strong ETag such as the content's SHA-256 digest; one is
+            derived from the file's size and modification time when None
+
+    Returns:
+        Response: 200, 206, 304 or 416 response
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    if etag and not is_resource_modified(request.environ, etag=etag):
+        return _not_modified(etag)
+
+    if key is not None:
+        storage = get_storage()
+        file_path = storage.local_file(key)
+        if file_path is None:
+            return _send_object(storage, key, download_name, mimetype, etag)
+
+    if not file_path or not os.path.isfile(file_path):
+        raise FileNotFoundError(file_path)
+
+    offload = current_app.config['DOWNLOAD_OFFLOAD']
+    if offload:
+        response = _offload(offload, file_path, download_name, mimetype, etag)
+        if response is not None:
+            return response
+
+    response = send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag or True,
+        conditional=True
+    )
+    # Werkzeug only advertises ranges on responses to Range requests
+    response.accept_ranges = 'bytes'
+    return _private(response)
+
+def _send_object(storage, key, download_name, mimetype, etag):
+    """Stream an object, or the requested range of it, from a remote storage backend."""
+    stat = storage.stat(key)
+    if stat is None:
+        raise FileNotFoundError(key)
+    size = stat['size']
+    if etag is None:
+        etag = f"{int(stat['modified'].timestamp())}-{size}"
+
+    response = Response(mimetype=_guess_mimetype(download_name, mimetype))
+    _set_attachment(response, download_name)
+    response.set_etag(etag)
+    response.last_modified = stat['modified']
+    response.accept_ranges = 'bytes'
+    _private(response)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=stat['modified']):
+        return _not_modified(etag, response)
+
+    start, end = 0, size
+    byte_range = request.range
+    # Several ranges would need a multipart body; sending the whole object is also valid
+    if byte_range and byte_range.units == 'bytes' and len(byte_range.ranges) == 1 \
+            and _if_range_matches(etag, stat['modified']):
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response.status_code = 416
+            response.content_range = ContentRange('bytes', None, None, size)
+            return response
+        start, end = span
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, end, size)
+
+    response.content_length = end - start
+    if request.method != 'HEAD':
+        response.response = wrap_file(request.environ, storage.open(key, start, None if end == size else end))
+        response.direct_passthrough = True
+    return response
+
+def _offload(offload, file_path, download_name, mimetype, etag):
+    """Hand a local file to the front proxy, or return None if it cannot serve it."""
+    response = Response(mimetype=_guess_mimetype(download_name, mimetype))
+    _set_attachment(response, download_name)
+    if etag:
+        response.set_etag(etag)
+
+    if offload == OFFLOAD_X_SENDFILE:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+    elif offload == OFFLOAD_X_ACCEL_REDIRECT:
+        relative_path = os.path.relpath(file_path, current_app.config['UPLOAD_FOLDER'])
+        if relative_path.startswith(os.pardir):
+            return None
+        prefix = current_app.config['DOWNLOAD_ACCEL_REDIRECT_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(relative_path.replace(os.sep, '/'))}"
+    else:
+        raise ValueError(f"Unsupported download offload: {offload}")
+
+    # The proxy sends the file and answers Range requests itself; like
+    # Werkzeug's X-Sendfile support, announce the file's length, not the empty body's
+    response.content_length = os.path.getsize(file_path)
+    response.accept_ranges = 'bytes'
+    return _private(response)
+
+def _if_range_matches(etag, modified):
+    """Check whether an If-Range header, if any, still matches the file."""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return modified.replace(microsecond=0) <= if_range.date
+    return True
+
+def _not_modified(etag, response=None):
+    """Turn a response into a bodyless 304."""
+    if response is None:
+        response = _private(Response())
+        response.set_etag(etag)
+    response.status_code = 304
+    response.response = []
+    response.headers.pop('Content-Type', None)
+    response.headers.pop('Content-Disposition', None)
+    return response
+
+def _private(response):
+    """Let only the client cache a download, and make it revalidate first."""
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.cache_control.max_age = None
+    response.expires = None
+    return response
+
+def _guess_mimetype(download_name, mimetype):
+    """Get the given MIME type or guess one from the download name."""
+    return mimetype or mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+def _set_attachment(response, download_name):
+    """Set a Content-Disposition header, with an RFC 5987 name for non-ASCII ones."""
+    try:
+        download_name.encode('ascii')
+        names = {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='')}"}
+    response.headers.set('Content-Disposition', 'attachment', **names)
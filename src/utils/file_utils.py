@@ -2,12 +2,170 @@
 File utility functions for the web application.
 """
 
+import io
 import os
-import uuid
+import re
 import json
+import hashlib
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask import current_app
 
+# Bytes read per chunk when streaming uploads to disk and hashing files
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Namespaces of the upload folder, one per kind of artifact
+KIND_DOCUMENTS = 'documents'
+KIND_BLOBS = 'blobs'
+KIND_SIGNATURES = 'signatures'
+KIND_ENCRYPTED = 'encrypted'
+KIND_DECRYPTED = 'decrypted'
+KIND_PARTIAL = 'partial'
+KIND_USER_KEYS = 'user_keys'
+KIND_AUTHORITIES = 'authorities'
+KIND_SYSTEM = 'system'
+
+# Kinds with few files live directly in their namespace, the rest are spread
+# over two levels of 256 shards each: <kind>/ab/cd/<name>
+UNSHARDED_KINDS = (KIND_AUTHORITIES, KIND_SYSTEM)
+
+# Written by the layout migration once no file is left in the flat layout
+LAYOUT_MARKER = '.layout-sharded'
+
+_UUID_PATTERN = re.compile(r'[0-9a-f]{32}')
+_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+_sharded_folders = set()
+
+def artifact_kind(filename):
+    """
+    Get the namespace a file belongs to from its name.
+    
+    Args:
+        filename (str): Filename inside the upload folder
+        
+    Returns:
+        str: Artifact kind
+    """
+    if filename.endswith('_pk.json') or filename.endswith('_sk.json'):
+        return KIND_AUTHORITIES
+    if filename == 'hybrid_params.json':
+        return KIND_SYSTEM
+    if _DIGEST_PATTERN.fullmatch(filename):
+        return KIND_BLOBS
+    if filename.startswith('user_') and filename.endswith('_keys.json'):
+        return KIND_USER_KEYS
+    if filename.startswith('signature_'):
+        return KIND_SIGNATURES
+    if filename.startswith('encrypted_') or filename.startswith('maabe_encrypted_'):
+        return KIND_ENCRYPTED
+    if filename.startswith('decrypted_'):
+        return KIND_DECRYPTED
+    if filename.startswith('upload_') and filename.endswith('.part'):
+        return KIND_PARTIAL
+    return KIND_DOCUMENTS
+
+def shard_path(filename, kind=None):
+    """
+    Get a file's path relative to the upload folder in the sharded layout.
+    
+    Files derived from one upload share its UUID, so they land in the same
+    shard of their respective namespaces. Blobs are sharded by the leading
+    hex digits of their digest.
+    
+    Args:
+        filename (str): Filename
+        kind (str): Artifact kind, inferred from the name when None
+        
+    Returns:
+        str: Relative path
+    """
+    if kind is None:
+        kind = artifact_kind(filename)
+    if kind in UNSHARDED_KINDS:
+        return os.path.join(kind, filename)
+    
+    match = _UUID_PATTERN.search(filename)
+    key = match.group(0) if match else hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return os.path.join(kind, key[:2], key[2:4], filename)
+
+def storage_key(filename, kind=None):
+    """
+    Get a file's key in a storage backend, its sharded path with '/' separators.
+    
+    Args:
+        filename (str): Filename
+        kind (str): Artifact kind, inferred from the name when None
+        
+    Returns:
+        str: Storage key
+    """
+    return shard_path(filename, kind).replace(os.sep, '/')
+
+def is_layout_migrated(directory):
+    """
+    Check whether the flat layout migration of an upload folder has finished.
+    
+    Args:
+        directory (str): Upload folder
+        
+    Returns:
+        bool: True once no file is left in the flat layout
+    """
+    if directory in _sharded_folders:
+        return True
+    if os.path.exists(os.path.join(directory, LAYOUT_MARKER)):
+        _sharded_folders.add(directory)
+        return True
+    return False
+
+def get_storage_path(filename, directory=None, kind=None):
+    """
+    Get the path a new file is written to, creating its shard directory.
+    
+    Args:
+        filename (str): The filename
+        directory (str): Upload folder, defaults to app's UPLOAD_FOLDER
+        kind (str): Artifact kind, inferred from the name when None
+        
+    Returns:
+        str: Full path to write the file to
+    """
+    if directory is None:
+        directory = current_app.config['UPLOAD_FOLDER']
+    
+    file_path = os.path.join(directory, shard_path(filename, kind))
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return file_path
+
+def list_files(kind, directory=None):
+    """
+    List the files of an unsharded namespace, e.g. authority keys.
+    
+    Until the layout migration finishes, files still in the flat layout
+    are included.
+    
+    Args:
+        kind (str): Artifact kind, one of UNSHARDED_KINDS
+        directory (str): Upload folder, defaults to app's UPLOAD_FOLDER
+        
+    Returns:
+        list: Full paths
+    """
+    if directory is None:
+        directory = current_app.config['UPLOAD_FOLDER']
+    
+    namespace = os.path.join(directory, kind)
+    paths = {}
+    if not is_layout_migrated(directory):
+        for entry in os.scandir(directory):
+            if entry.is_file() and artifact_kind(entry.name) == kind:
+                paths[entry.name] = entry.path
+    if os.path.isdir(namespace):
+        for entry in os.scandir(namespace):
+            if entry.is_file():
+                paths[entry.name] = entry.path
+    return list(paths.values())
+
 def allowed_file(filename, allowed_extensions=None):
     """
     Check if a file has an allowed extension.
@@ -25,47 +183,142 @@ def allowed_file(filename, allowed_extensions=None):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def save_uploaded_file(file, directory=None):
+def write_stream(stream, file_path, max_size=None):
     """
-    Save an uploaded file with a secure filename.
+    Write a stream to a file in chunks, hashing and counting it in the same pass.
     
     Args:
-        file: The file object from request.files
-        directory (str): Directory to save the file, defaults to app's UPLOAD_FOLDER
+        stream: Binary file-like object, e.g. a request stream
+        file_path (str): Destination path
+        max_size (int): Largest accepted size in bytes, None for no limit
         
     Returns:
-        tuple: (saved_filename, original_filename, file_type, file_size)
+        tuple: (digest, size) where digest is the SHA-256 hex digest
+        
+    Raises:
+        RequestEntityTooLarge: As soon as the stream exceeds max_size; the
+            partial file is removed
     """
-    if directory is None:
-        directory = current_app.config['UPLOAD_FOLDER']
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise RequestEntityTooLarge(f"Upload exceeds {max_size} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest(), size
+
+class HashingReader(io.RawIOBase):
+    """
+    Read-through wrapper that hashes and counts everything read from a stream.
     
-    # Ensure directory exists
-    os.makedirs(directory, exist_ok=True)
+    Lets a consumer such as a cipher pull an upload straight from the
+    request while its digest and size are computed in the same pass.
+    """
     
-    # Get original filename and secure it
-    original_filename = file.filename
-    file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+    def __init__(self, stream, max_size=None):
+        """
+        Wrap a stream.
+        
+        Args:
+            stream: Binary file-like object
+            max_size (int): Largest accepted size in bytes, None for no limit
+        """
+        self._stream = stream
+        self._digest = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
     
-    # Generate a unique filename
-    unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-    file_path = os.path.join(directory, unique_filename)
+    def readable(self):
+        return True
     
-    # Save the file
-    file.save(file_path)
+    def readinto(self, buffer):
+        """
+        Read into a buffer, hashing and counting the bytes read.
+        
+        Raises:
+            RequestEntityTooLarge: As soon as the stream exceeds max_size
+        """
+        view = memoryview(buffer).cast('B')
+        if hasattr(self._stream, 'readinto'):
+            read = self._stream.readinto(view)
+        else:
+            data = self._stream.read(len(view))
+            read = len(data)
+            view[:read] = data
+        if not read:
+            return 0
+        
+        self.size += read
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge(f"Upload exceeds {self.max_size} bytes")
+        self._digest.update(view[:read])
+        return read
     
-    # Get file info
-    file_size = os.path.getsize(file_path)
-    file_type = file.content_type or f"application/{file_extension}"
+    def hexdigest(self):
+        """Get the SHA-256 hex digest of everything read so far."""
+        return self._digest.hexdigest()
+
+class HashingWriter:
+    """Write-through wrapper that hashes and counts everything written to a file."""
     
-    return unique_filename, original_filename, file_type, file_size
+    def __init__(self, stream):
+        """
+        Wrap a stream.
+        
+        Args:
+            stream: Writable binary file-like object
+        """
+        self._stream = stream
+        self._digest = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data):
+        """Write data, hashing and counting it."""
+        self._digest.update(data)
+        self.size += len(data)
+        return self._stream.write(data)
+    
+    def hexdigest(self):
+        """Get the SHA-256 hex digest of everything written so far."""
+        return self._digest.hexdigest()
+
+def compute_file_digest(file_path):
+    """
+    Compute a file's SHA-256 digest with constant memory.
+    
+    Args:
+        file_path (str): Path to the file
+        
+    Returns:
+        str: SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def get_file_path(filename, directory=None):
+def get_file_path(filename, directory=None, kind=None):
     """
-    Get the full path to a file.
+    Get the full path to a file in the sharded layout.
+    
+    While the layout migration is running, a file not moved yet resolves
+    to its flat location. The migration may move it before the caller
+    opens the returned path; open_file() retries the sharded path in
+    that case, other callers fail with FileNotFoundError for the request.
     
     Args:
         filename (str): The filename
         directory (str): Directory containing the file, defaults to app's UPLOAD_FOLDER
+        kind (str): Artifact kind, inferred from the name when None
         
     Returns:
         str: Full path to the file
@@ -73,15 +326,52 @@ def get_file_path(filename, directory=None):
     if directory is None:
         directory = current_app.config['UPLOAD_FOLDER']
     
-    return os.path.join(directory, filename)
+    file_path = os.path.join(directory, shard_path(filename, kind))
+    if not os.path.exists(file_path) and not is_layout_migrated(directory):
+        legacy_path = os.path.join(directory, filename)
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return file_path
 
-def delete_file(filename, directory=None):
+def open_file(filename, mode='r', directory=None, kind=None):
+    """
+    Open a file in the upload folder for reading.
+    
+    A file resolved to its flat location but moved by a running layout
+    migration before it could be opened is opened at its sharded path.
+    
+    Args:
+        filename (str): The filename
+        mode (str): Mode to open the file with
+        directory (str): Directory containing the file, defaults to app's UPLOAD_FOLDER
+        kind (str): Artifact kind, inferred from the name when None
+        
+    Returns:
+        file: Open file object
+        
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    if directory is None:
+        directory = current_app.config['UPLOAD_FOLDER']
+    
+    file_path = get_file_path(filename, directory, kind)
+    try:
+        return open(file_path, mode)
+    except FileNotFoundError:
+        sharded_path = os.path.join(directory, shard_path(filename, kind))
+        if file_path == sharded_path:
+            raise
+        return open(sharded_path, mode)
+
+def delete_file(filename, directory=None, kind=None):
     """
     Delete a file.
     
     Args:
         filename (str): The filename to delete
         directory (str): Directory containing the file, defaults to app's UPLOAD_FOLDER
+        kind (str): Artifact kind, inferred from the name when None
         
     Returns:
         bool: True if file was deleted, False otherwise
@@ -89,13 +379,18 @@ def delete_file(filename, directory=None):
     if directory is None:
         directory = current_app.config['UPLOAD_FOLDER']
     
-    file_path = os.path.join(directory, filename)
+    # A file rewritten during the layout migration can exist in both places
+    paths = [os.path.join(directory, shard_path(filename, kind))]
+    if not is_layout_migrated(directory):
+        paths.append(os.path.join(directory, filename))
     
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
+        deleted = False
+        for file_path in paths:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                deleted = True
+        return deleted
     except Exception:
         return False
 
@@ -114,11 +409,8 @@ def save_json_data(data, filename, directory=None):
     if directory is None:
         directory = current_app.config['UPLOAD_FOLDER']
     
-    # Ensure directory exists
-    os.makedirs(directory, exist_ok=True)
-    
     # Create full path
-    file_path = os.path.join(directory, filename)
+    file_path = get_storage_path(filename, directory)
     
     # Save data as JSON
     with open(file_path, 'w') as f:
@@ -137,16 +429,8 @@ def load_json_data(filename, directory=None):
     Returns:
         dict: Loaded data, or None if file doesn't exist
     """
-    if directory is None:
-        directory = current_app.config['UPLOAD_FOLDER']
-    
-    file_path = os.path.join(directory, filename)
-    
-    if not os.path.exists(file_path):
-        return None
-    
     try:
-        with open(file_path, 'r') as f:
+        with open_file(filename, 'r', directory) as f:
             return json.load(f)
     except Exception:
         return None
@@ -0,0 +1,79 @@
+"""
+Shared fixtures: an application with its own database and upload folder,
+a test client logged in as a registered user and a mocked S3 bucket.
+"""
+
+import io
+import pytest
+from src.main import create_app
+from src.extensions import db
+
+@pytest.fixture
+def config():
+    """Config overrides of the application under test; override in a module to change them."""
+    return {}
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """Name of a bucket mocked by moto; skips the test without boto3 or moto."""
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        boto3.client('s3').create_bucket(Bucket='documents')
+        yield 'documents'
+
+@pytest.fixture
+def app(tmp_path, config):
+    """
+    Application on a temporary database and upload folder, without background threads.
+
+    The test runs inside an application context, which requests made with
+    the test client reuse: they share the test's database session and g,
+    where Flask-Login caches the logged in user. Requests as another user
+    need their own application context.
+    """
+    app = create_app(dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'app.db'),
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CIPHER_SUITE': 'aes-256-gcm',
+        'KEY_POOL_SIZE': 0,
+        'GC_INTERVAL': 0
+    }, **config))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+def login(app, username):
+    """Register a user and get a test client logged in as them."""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'password',
+        'confirm_password': 'password',
+        'role': 'data_owner'
+    })
+    response = client.post('/auth/login', data={'username': username, 'password': 'password'})
+    assert response.status_code == 302
+    return client
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as a registered user."""
+    return login(app, 'alice')
+
+@pytest.fixture
+def upload(client):
+    """Function uploading content as a document and returning its JSON."""
+    def upload(content, filename='document.txt'):
+        response = client.post('/document/upload-stream', data=io.BytesIO(content),
+                               headers={'X-Filename': filename, 'Content-Type': 'text/plain'})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return upload
@@ -0,0 +1,110 @@
+"""
+Tests for the access-decision cache and the paths that use and invalidate it.
+"""
+
+import pytest
+from src.extensions import db
+from src.encryption.access_cache import AccessDecisionCache, access_decision_cache
+from src.encryption.hybrid_abe import HybridABE
+from src.models.document import Document
+from src.models.user import User
+from src.services.encryption_service import EncryptionService
+
+DOCTOR = ['Doctor@Hospital', 'Staff@Hospital']
+NURSE = ['Nurse@Hospital']
+
+@pytest.fixture
+def cache():
+    """Empty decision cache."""
+    return AccessDecisionCache()
+
+@pytest.fixture
+def abe(cache):
+    """HybridABE instance deciding through the cache."""
+    return HybridABE(decision_cache=cache)
+
+def test_repeat_decision_hits_the_cache(abe, cache):
+    assert abe.find_satisfying_attributes('Doctor@Hospital AND Staff@Hospital', DOCTOR) == frozenset(DOCTOR)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # Attribute order does not matter
+    assert abe.find_satisfying_attributes('Doctor@Hospital AND Staff@Hospital', reversed(DOCTOR))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_denied_decisions_are_cached(abe, cache):
+    assert not abe.find_satisfying_attributes('Doctor@Hospital', NURSE)
+    assert not abe.find_satisfying_attributes('Doctor@Hospital', NURSE)
+    assert cache.hits == 1
+
+def test_invalidate_attributes(abe, cache):
+    abe.find_satisfying_attributes('Doctor@Hospital', DOCTOR)
+    abe.find_satisfying_attributes('Doctor@Hospital', NURSE)
+
+    cache.invalidate_attributes(DOCTOR)
+
+    abe.find_satisfying_attributes('Doctor@Hospital', DOCTOR)
+    abe.find_satisfying_attributes('Doctor@Hospital', NURSE)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_invalidate_authority(abe, cache):
+    abe.find_satisfying_attributes('Doctor@Hospital', DOCTOR)
+    abe.find_satisfying_attributes('Doctor@Hospital OR Clerk@Registry', ['Clerk@Registry'])
+
+    cache.invalidate_authority('Hospital')
+
+    abe.find_satisfying_attributes('Doctor@Hospital', DOCTOR)
+    abe.find_satisfying_attributes('Doctor@Hospital OR Clerk@Registry', ['Clerk@Registry'])
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_authority_setup_invalidates_its_decisions(app):
+    access_decision_cache.clear()
+    service = EncryptionService()
+    assert service.can_decrypt('Doctor@Hospital', DOCTOR)
+    assert service.can_decrypt('Clerk@Registry', ['Clerk@Registry'])
+
+    service.setup_authority('Hospital')
+
+    misses = access_decision_cache.misses
+    service.can_decrypt('Doctor@Hospital', DOCTOR)
+    service.can_decrypt('Clerk@Registry', ['Clerk@Registry'])
+    assert access_decision_cache.misses == misses + 1
+
+def test_adding_an_attribute_invalidates_the_old_set(app):
+    access_decision_cache.clear()
+    user = User(username='alice', email='alice@example.com')
+    user.add_attribute('Doctor', 'Hospital')
+    db.session.add(user)
+    db.session.commit()
+    service = EncryptionService()
+    assert service.can_decrypt('Doctor@Hospital', user.get_attributes_list())
+
+    user.add_attribute('Staff', 'Hospital')
+
+    assert access_decision_cache.get(
+        access_decision_cache.attribute_set_hash(['Doctor@Hospital']),
+        access_decision_cache.get_policy('Doctor@Hospital')[1]
+    ) is None
+
+def test_listing_shows_decrypt_only_for_satisfied_policies(app, client):
+    access_decision_cache.clear()
+    user = User.query.filter_by(username='alice').one()
+    user.add_attribute('Doctor', 'Hospital')
+    documents = [
+        Document(filename=f'encrypted_{index}.json', original_filename=f'{index}.txt', file_size=10,
+                 user_id=user.id, doc_type='encrypted', encryption_method='hybrid', access_policy=policy)
+        for index, policy in enumerate(['Doctor@Hospital', 'Doctor@Hospital', 'Nurse@Hospital'])
+    ]
+    db.session.add_all(documents)
+    db.session.commit()
+    hits, misses = access_decision_cache.hits, access_decision_cache.misses
+
+    response = client.get('/document/list')
+
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert f'/encryption/decrypt/{documents[0].id}"' in page
+    assert f'/encryption/decrypt/{documents[1].id}"' in page
+    assert f'/encryption/decrypt/{documents[2].id}"' not in page
+    # Documents sharing a policy share one decision
+    assert access_decision_cache.misses - misses == 2
+    assert access_decision_cache.hits - hits == 1
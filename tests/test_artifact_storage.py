@@ -0,0 +1,88 @@
+"""
+Tests that signatures, Merkle trees, ciphertexts and decrypted output go
+through the storage backend.
+"""
+
+import io
+import os
+import pytest
+from src.extensions import db
+from src.encryption.merkle import tree_filename
+from src.models.document import Document
+from src.storage import get_storage
+from src.utils.file_utils import storage_key, shard_path
+
+CONTENT = b'patient record\n' * 5000
+
+@pytest.fixture(params=['local', 's3'])
+def config(request):
+    """Artifacts on local disk, then in a mocked S3 bucket."""
+    if request.param == 'local':
+        return {}
+    bucket = request.getfixturevalue('s3_bucket')
+    return {'STORAGE_BACKEND': 's3', 'STORAGE_S3_BUCKET': bucket, 'STORAGE_S3_REGION': 'us-east-1'}
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as a doctor of the 'Hospital' authority."""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'carol',
+        'email': 'carol@example.com',
+        'password': 'password',
+        'confirm_password': 'password',
+        'role': 'data_owner',
+        'attribute_Doctor': '1',
+        'authority_Doctor': 'Hospital'
+    })
+    response = client.post('/auth/login', data={'username': 'carol', 'password': 'password'})
+    assert response.status_code == 302
+    return client
+
+def assert_stored(app, filename):
+    """Check that an artifact is a backend object, and only that on a remote backend."""
+    assert get_storage().exists(storage_key(filename))
+    local_path = os.path.join(app.config['UPLOAD_FOLDER'], shard_path(filename))
+    assert os.path.exists(local_path) == (app.config['STORAGE_BACKEND'] == 'local')
+
+def test_ciphertext_and_decrypted_output(app, client):
+    response = client.post('/encryption/encrypt', data={
+        'file': (io.BytesIO(CONTENT), 'record.txt'),
+        'access_policy': 'Doctor@Hospital'
+    })
+    assert response.status_code == 302
+    encrypted = Document.query.filter_by(doc_type='encrypted').one()
+    assert_stored(app, encrypted.filename)
+
+    response = client.post(f'/encryption/decrypt/{encrypted.id}')
+
+    assert response.status_code == 302
+    decrypted = Document.query.filter(Document.id > encrypted.id).one()
+    assert decrypted.is_blob()
+    with get_storage().open(decrypted.get_storage_key()) as f:
+        assert f.read() == CONTENT
+    # The plaintext is moved into the blob store, not left behind
+    for _, _, filenames in os.walk(app.config['UPLOAD_FOLDER']):
+        assert not [name for name in filenames if name.startswith('decrypted_')]
+
+    response = client.get(f'/document/download/{encrypted.id}')
+    assert response.status_code == 200
+    assert response.data.startswith(b'{"policy": "Doctor@Hospital"')
+
+def test_signature_and_merkle_tree(app, client, upload):
+    document_id = upload(CONTENT, 'record.txt')['id']
+
+    response = client.post(f'/signature/sign/{document_id}', data={'password': 'password', 'merkle': '1'})
+
+    assert response.status_code == 302
+    document = db.session.get(Document, document_id)
+    assert document.is_signed
+    assert_stored(app, document.signature_file)
+    assert_stored(app, tree_filename(document.signature_file))
+
+    response = client.post(f'/signature/verify-range/{document_id}', json={'start': 100, 'end': 70000})
+    assert response.get_json()['valid']
+
+    assert client.post(f'/document/delete/{document_id}').status_code == 302
+    assert not get_storage().exists(storage_key(document.signature_file))
+    assert not get_storage().exists(storage_key(tree_filename(document.signature_file)))
@@ -0,0 +1,48 @@
+"""
+Smoke tests for the signature benchmark, run with tiny parameters.
+"""
+
+import pytest
+import benchmark_signature
+from src.encryption.digital_signature import KEY_TYPE_ED25519, KEY_TYPE_ECDSA_P256
+
+@pytest.mark.parametrize('fraction, expected', [(0.5, 5), (0.95, 10), (0.99, 10), (0.0, 1)])
+def test_percentile_by_nearest_rank(fraction, expected):
+    assert benchmark_signature.percentile(list(range(1, 11)), fraction) == expected
+
+def test_measure_reports_rate_latency_and_memory():
+    calls = []
+
+    result = benchmark_signature.measure(lambda: calls.append(bytearray(64 * 1024)), rounds=5)
+
+    # Timed rounds plus the one traced for memory
+    assert len(calls) == 6
+    assert set(result) == {'ops', 'p50', 'p95', 'p99', 'peak_kib'}
+    assert result['p50'] <= result['p95'] <= result['p99']
+    assert result['peak_kib'] >= 64
+
+@pytest.mark.parametrize('size, label', [(512, '512B'), (1024, '1KiB'), (1536, '1.5KiB'), (16 * 1024 * 1024, '16MiB')])
+def test_format_size(size, label):
+    assert benchmark_signature.format_size(size) == label
+
+def test_benchmark_covers_every_operation():
+    rows = benchmark_signature.benchmark_key_type(KEY_TYPE_ED25519, [1024], rounds=2, keygen_rounds=1)
+
+    assert [row[0] for row in rows] == [
+        'keygen', 'encrypt_private_key', 'decrypt_private_key', 'sign 1KiB', 'sign streamed 1KiB', 'verify 1KiB'
+    ]
+    assert all(row[1] == 'ed25519-sha256' for row in rows)
+
+def test_sweep_measures_threads_and_processes():
+    rows = benchmark_signature.sweep(KEY_TYPE_ECDSA_P256, [1, 2], jobs=4, size=1024)
+
+    assert [row[:2] for row in rows] == [[KEY_TYPE_ECDSA_P256, 1], [KEY_TYPE_ECDSA_P256, 2]]
+    assert all(float(rate) > 0 for row in rows for rate in row[2:])
+
+def test_run_benchmark_prints_both_tables(capsys):
+    benchmark_signature.run_benchmark([KEY_TYPE_ED25519], [1024], rounds=2, keygen_rounds=1,
+                                      worker_counts=[1], jobs=2, sweep_size=1024)
+
+    output = capsys.readouterr().out
+    assert 'verify 1KiB' in output
+    assert 'Signing throughput, 2 documents of 1KiB per run' in output
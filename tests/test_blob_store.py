@@ -0,0 +1,174 @@
+"""
+Tests for deduplicating uploads into reference-counted blobs.
+"""
+
+import io
+import hashlib
+import threading
+import time
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.extensions import db
+from src.models.blob import Blob
+from src.models.document import Document
+from src.services.blob_store import BlobStore
+from src.storage import get_storage
+from src.utils.file_utils import storage_key, KIND_BLOBS
+
+CONTENT = b'same content' * 100
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+def blob_exists(digest):
+    """Check whether a blob's file is in the storage backend."""
+    return get_storage().exists(storage_key(digest, KIND_BLOBS))
+
+def ref_count(digest):
+    """Get a blob's reference count, None if it has no row."""
+    blob = db.session.get(Blob, digest)
+    if blob is None:
+        return None
+    db.session.refresh(blob)
+    return blob.ref_count
+
+class NonSeekable(io.RawIOBase):
+    """Stream that can only be read forward, like a raw request body."""
+
+    def __init__(self, content):
+        self._stream = io.BytesIO(content)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+class CountingReader(io.BytesIO):
+    """Seekable stream counting the bytes read from it."""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        read = super().readinto(buffer)
+        self.bytes_read += read
+        return read
+
+@pytest.fixture
+def store(app):
+    """Blob store of the application under test."""
+    return BlobStore(db)
+
+def test_identical_uploads_share_a_blob(client, upload):
+    first = upload(CONTENT, 'first.txt')
+    second = upload(CONTENT, 'second.txt')
+
+    assert first['id'] != second['id']
+    assert first['digest'] == second['digest'] == DIGEST
+    assert ref_count(DIGEST) == 2
+    assert {document.filename for document in Document.query.all()} == {DIGEST}
+    assert blob_exists(DIGEST)
+
+def test_deleting_documents_releases_the_blob(client, upload):
+    first = upload(CONTENT, 'first.txt')
+    second = upload(CONTENT, 'second.txt')
+
+    client.post(f"/document/delete/{first['id']}")
+    assert ref_count(DIGEST) == 1
+    assert blob_exists(DIGEST)
+
+    client.post(f"/document/delete/{second['id']}")
+    assert ref_count(DIGEST) is None
+    assert not blob_exists(DIGEST)
+
+def test_store_seekable_and_streamed_uploads(store):
+    digest, size, created = store.store(FileStorage(io.BytesIO(CONTENT), 'a.txt'))
+    assert (digest, size, created) == (DIGEST, len(CONTENT), True)
+
+    digest, size, created = store.store(FileStorage(NonSeekable(CONTENT), 'b.txt'))
+    assert (digest, size, created) == (DIGEST, len(CONTENT), False)
+    assert ref_count(DIGEST) == 2
+
+def test_seekable_uploads_are_read_once(store):
+    for created in (True, False):
+        stream = CountingReader(CONTENT)
+
+        assert store.store(FileStorage(stream, 'a.txt'))[2] is created
+
+        assert stream.bytes_read == len(CONTENT)
+    assert ref_count(DIGEST) == 2
+
+@pytest.mark.parametrize('stream', [io.BytesIO(CONTENT), NonSeekable(CONTENT)])
+def test_store_rejects_oversized_uploads(store, stream):
+    with pytest.raises(RequestEntityTooLarge):
+        store.store(FileStorage(stream, 'a.txt'), max_size=len(CONTENT) - 1)
+    assert ref_count(DIGEST) is None
+    assert not blob_exists(DIGEST)
+
+def test_release_keeps_the_file_until_deleted(store):
+    store.store(FileStorage(io.BytesIO(CONTENT), 'a.txt'))
+
+    assert store.release(DIGEST)
+    db.session.rollback()
+    # A rolled back release leaves both the row and the file
+    assert ref_count(DIGEST) == 1
+    assert blob_exists(DIGEST)
+
+    assert store.release(DIGEST)
+    db.session.commit()
+    assert blob_exists(DIGEST)
+    assert store.delete_unreferenced(DIGEST)
+    assert not blob_exists(DIGEST)
+
+def test_delete_unreferenced_keeps_a_recreated_blob(store):
+    store.store(FileStorage(io.BytesIO(CONTENT), 'a.txt'))
+    store.release(DIGEST)
+    db.session.commit()
+
+    # The same content is uploaded again before the file is deleted
+    store.store(FileStorage(io.BytesIO(CONTENT), 'b.txt'))
+
+    assert not store.delete_unreferenced(DIGEST)
+    assert blob_exists(DIGEST)
+
+def test_upload_racing_a_delete_waits_for_it(app, store, monkeypatch):
+    store.store(FileStorage(io.BytesIO(CONTENT), 'a.txt'))
+    store.release(DIGEST)
+    db.session.commit()
+
+    storage = get_storage()
+    deleting, resume = threading.Event(), threading.Event()
+    delete = storage.delete
+    def slow_delete(key):
+        deleting.set()
+        resume.wait(5)
+        return delete(key)
+    monkeypatch.setattr(storage, 'delete', slow_delete)
+    results = {}
+    def run(name, target):
+        with app.app_context():
+            results[name] = target()
+
+    deleter = threading.Thread(target=run, args=('deleted', lambda: BlobStore(db).delete_unreferenced(DIGEST)))
+    deleter.start()
+    assert deleting.wait(5)
+    uploader = threading.Thread(target=run, args=(
+        'stored', lambda: BlobStore(db).store(FileStorage(io.BytesIO(CONTENT), 'b.txt'))))
+    uploader.start()
+    # The upload blocks on the digest until the file is gone
+    time.sleep(0.2)
+    assert 'stored' not in results
+    resume.set()
+    deleter.join()
+    uploader.join()
+
+    assert results == {'deleted': True, 'stored': (DIGEST, len(CONTENT), True)}
+    assert ref_count(DIGEST) == 1
+    assert blob_exists(DIGEST)
+
+def test_release_of_unknown_digest(store):
+    assert not store.release(DIGEST)
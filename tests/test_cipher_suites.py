@@ -0,0 +1,135 @@
+"""
+Tests for the AEAD cipher suites, in particular the incremental
+ChaCha20-Poly1305 implementation.
+"""
+
+import io
+import os
+import json
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+from src.encryption import cipher_suites
+from src.encryption.hybrid_abe import HybridABE, STREAM_CHUNK_SIZE
+
+POLICY = 'Doctor@Hospital'
+
+# RFC 8439, section 2.8.2
+RFC_KEY = bytes(range(0x80, 0xa0))
+RFC_NONCE = bytes.fromhex('070000004041424344454647')
+RFC_AAD = bytes.fromhex('50515253c0c1c2c3c4c5c6c7')
+RFC_PLAINTEXT = (b"Ladies and Gentlemen of the class of '99: If I could offer you only one tip "
+                 b"for the future, sunscreen would be it.")
+RFC_CIPHERTEXT = bytes.fromhex(
+    'd31a8d34648e60db7b86afbc53ef7ec2a4aded51296e08fea9e2b5a736ee62d6'
+    '3dbea45e8ca9671282fafb69da92728b1a71de0a9e060b2905d6a5b67ecd3b36'
+    '92ddbd7f2d778b8c9803aee328091b58fab324e4fad675945585808b4831d7bc'
+    '3ff4def08e4b7a9de576d26586cec64b6116'
+)
+RFC_TAG = bytes.fromhex('1ae10b594f09e26a7e902ecbd0600691')
+
+def chacha(key, nonce, encrypting, tag=None, associated_data=b''):
+    """Incremental ChaCha20-Poly1305 context."""
+    return cipher_suites._ChaCha20Poly1305Context(key, nonce, encrypting, tag, associated_data)
+
+def encrypt_in_chunks(context, data, sizes):
+    """Feed data to a context in chunks of the given sizes, cycling through them."""
+    output = bytearray()
+    offset = 0
+    while offset < len(data):
+        for size in sizes:
+            chunk = data[offset:offset + size]
+            buffer = bytearray(len(chunk) + 15)
+            output += buffer[:context.update_into(chunk, buffer)]
+            offset += size
+    context.finalize()
+    return bytes(output)
+
+def test_rfc_8439_encryption():
+    context = chacha(RFC_KEY, RFC_NONCE, True, associated_data=RFC_AAD)
+
+    assert encrypt_in_chunks(context, RFC_PLAINTEXT, [7, 64, 1]) == RFC_CIPHERTEXT
+    assert context.tag == RFC_TAG
+
+def test_rfc_8439_decryption():
+    context = chacha(RFC_KEY, RFC_NONCE, False, tag=RFC_TAG, associated_data=RFC_AAD)
+
+    assert context.update(RFC_CIPHERTEXT) == RFC_PLAINTEXT
+    context.finalize()
+
+@pytest.mark.parametrize('size', [0, 1, 15, 16, 17, 64, 1000, 65537])
+def test_matches_the_one_shot_implementation(size):
+    key, nonce, data = os.urandom(32), os.urandom(12), os.urandom(size)
+
+    context = cipher_suites.encryptor(cipher_suites.CHACHA20_POLY1305, key, nonce)
+    ciphertext = encrypt_in_chunks(context, data, [13, 4096])
+
+    assert ciphertext + context.tag == ChaCha20Poly1305(key).encrypt(nonce, data, None)
+
+@pytest.mark.parametrize('suite', cipher_suites.SUITES)
+def test_tampered_tag_is_rejected(suite):
+    key, nonce = os.urandom(32), os.urandom(12)
+    context = cipher_suites.encryptor(suite, key, nonce)
+    ciphertext = context.update(b'secret message')
+    context.finalize()
+    tag = bytearray(context.tag)
+    tag[0] ^= 1
+
+    decryptor = cipher_suites.decryptor(suite, key, nonce, bytes(tag))
+    decryptor.update(ciphertext)
+    with pytest.raises(InvalidTag):
+        decryptor.finalize()
+
+@pytest.mark.parametrize('suite', cipher_suites.SUITES)
+@pytest.mark.parametrize('tamper', [
+    lambda ciphertext: ciphertext[:-1],
+    lambda ciphertext: b'',
+    lambda ciphertext: bytes([ciphertext[0] ^ 1]) + ciphertext[1:]
+])
+def test_truncated_or_modified_ciphertext_is_rejected(suite, tamper):
+    key, nonce = os.urandom(32), os.urandom(12)
+    context = cipher_suites.encryptor(suite, key, nonce)
+    ciphertext = context.update(b'secret message')
+    context.finalize()
+
+    decryptor = cipher_suites.decryptor(suite, key, nonce, context.tag)
+    decryptor.update(tamper(ciphertext))
+    with pytest.raises(InvalidTag):
+        decryptor.finalize()
+
+def test_truncated_chacha_tag_is_rejected():
+    context = chacha(RFC_KEY, RFC_NONCE, False, tag=RFC_TAG[:-1], associated_data=RFC_AAD)
+    context.update(RFC_CIPHERTEXT)
+
+    with pytest.raises(InvalidTag):
+        context.finalize()
+
+@pytest.mark.parametrize('suite', cipher_suites.SUITES)
+def test_hybrid_abe_round_trip(suite):
+    abe = HybridABE(cipher_suite=suite)
+    gp = abe.setup()
+    pk, sk = abe.authsetup(gp, 'Hospital')
+    user_keys = {
+        'keys': {POLICY: abe.keygen(gp, sk, 'user-1', POLICY)},
+        'authority_keys': {'Hospital': sk['key']}
+    }
+    message = os.urandom(STREAM_CHUNK_SIZE + 100)
+
+    ct = abe.encrypt(gp, {'Hospital': pk}, message, POLICY)
+    assert ct['encrypted_message']['alg'] == suite
+    streamed = io.BytesIO()
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(message), streamed, POLICY)
+    assert json.loads(streamed.getvalue())['encrypted_message']['alg'] == suite
+
+    # Any instance decrypts with the suite recorded in the ciphertext
+    reader = HybridABE(cipher_suite=cipher_suites.AES_GCM)
+    assert bytes(reader.decrypt(gp, user_keys, ct)) == message
+    output = io.BytesIO()
+    reader.decrypt_stream(gp, user_keys, streamed, output)
+    assert output.getvalue() == message
+
+def test_unknown_suite_is_rejected():
+    with pytest.raises(ValueError):
+        cipher_suites.encryptor('des', os.urandom(32), os.urandom(12))
+    with pytest.raises(ValueError):
+        cipher_suites.set_default_suite('des')
@@ -0,0 +1,81 @@
+"""
+Tests for content digests computed at upload time and the backfill of
+documents uploaded before digests were stored.
+"""
+
+import io
+import hashlib
+import pytest
+import backfill_digests
+from src.extensions import db
+from src.models.document import Document
+from src.models.user import User
+from src.services.signature_service import SignatureService
+from src.utils.file_utils import get_storage_path
+
+CONTENT = b'lab results\n' * 1000
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+def test_streamed_upload_stores_the_digest(upload):
+    document = db.session.get(Document, upload(CONTENT)['id'])
+
+    assert document.digest == DIGEST
+
+def test_form_upload_stores_the_digest(client):
+    response = client.post('/document/upload', data={'file': (io.BytesIO(CONTENT), 'results.txt')})
+
+    assert response.status_code == 302
+    assert Document.query.one().digest == DIGEST
+
+def test_signing_uses_the_stored_digest(client, upload, monkeypatch):
+    document_id = upload(CONTENT)['id']
+    monkeypatch.setattr(SignatureService, 'hash_document',
+                        lambda service, path: pytest.fail('document hashed again'))
+
+    client.post(f'/signature/sign/{document_id}', data={'password': 'password'})
+
+    assert db.session.get(Document, document_id).is_signed
+
+@pytest.fixture
+def legacy(app, client):
+    """Documents in the flat layout without digests, one with a digest and one whose file is gone."""
+    user = User.query.filter_by(username='alice').one()
+    documents = []
+    for index in range(3):
+        filename = f'legacy_{index}.txt'
+        with open(get_storage_path(filename), 'wb') as f:
+            f.write(CONTENT + bytes([index]))
+        documents.append(Document(filename=filename, original_filename=filename, file_size=len(CONTENT) + 1,
+                                  user_id=user.id, doc_type='original'))
+    documents.append(Document(filename='legacy_digested.txt', original_filename='legacy_digested.txt',
+                              file_size=1, user_id=user.id, doc_type='original', digest='f' * 64))
+    documents.append(Document(filename='legacy_gone.txt', original_filename='legacy_gone.txt',
+                              file_size=1, user_id=user.id, doc_type='original'))
+    db.session.add_all(documents)
+    db.session.commit()
+    return documents
+
+def test_backfill_fills_only_missing_digests(app, legacy, monkeypatch):
+    monkeypatch.setattr(backfill_digests, 'create_app', lambda: app)
+
+    failed = backfill_digests.backfill_digests(workers=2, batch_size=2)
+
+    assert failed == 1
+    for document in legacy:
+        db.session.refresh(document)
+    assert [document.digest for document in legacy[:3]] == [
+        hashlib.sha256(CONTENT + bytes([index])).hexdigest() for index in range(3)
+    ]
+    assert legacy[3].digest == 'f' * 64
+    assert legacy[4].digest is None
+
+def test_backfill_is_idempotent(app, legacy, monkeypatch):
+    monkeypatch.setattr(backfill_digests, 'create_app', lambda: app)
+    backfill_digests.backfill_digests()
+    hashed = []
+    monkeypatch.setattr(backfill_digests, 'compute_file_digest', lambda path: hashed.append(path))
+
+    backfill_digests.backfill_digests()
+
+    # Only the document whose file is missing is still without a digest
+    assert len(hashed) == 1
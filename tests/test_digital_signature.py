@@ -0,0 +1,136 @@
+"""
+Tests for signature key types and streaming hash-then-sign signatures.
+"""
+
+import io
+import os
+import tracemalloc
+import pytest
+from src.encryption.digital_signature import (
+    DigitalSignature, KEY_TYPES, KEY_TYPE_RSA, KEY_TYPE_ED25519, SIGNATURE_ALGORITHMS, HASH_CHUNK_SIZE
+)
+from src.extensions import db
+from src.models.document import Document
+from src.models.user import User
+from src.services.signature_service import SignatureService
+
+DOCUMENT = os.urandom(3 * HASH_CHUNK_SIZE + 17)
+
+@pytest.fixture
+def ds():
+    """Digital signature helper."""
+    return DigitalSignature()
+
+@pytest.fixture(params=KEY_TYPES)
+def keys(request, ds):
+    """Private and public key of each key type in PEM format."""
+    return ds.generate_key_pair(key_type=request.param)
+
+def test_hash_stream_matches_the_whole_document_digest(ds):
+    assert ds.hash_stream(io.BytesIO(DOCUMENT), chunk_size=1000) == ds._sha256(DOCUMENT)
+
+def test_signed_digest_verifies_against_the_document(ds, keys):
+    private_key, public_key = keys
+
+    signature = ds.sign_digest(ds.hash_stream(io.BytesIO(DOCUMENT)), private_key)
+
+    assert ds.verify_signature(DOCUMENT, signature, public_key)
+    assert not ds.verify_signature(DOCUMENT + b'x', signature, public_key)
+
+def test_document_signature_verifies_against_the_digest(ds, keys):
+    private_key, public_key = keys
+
+    signature = ds.sign_document(DOCUMENT, private_key)
+
+    assert ds.verify_digest(ds._sha256(DOCUMENT), signature, public_key)
+    assert not ds.verify_digest(ds._sha256(b'other'), signature, public_key)
+
+@pytest.mark.parametrize('sign_streaming, verify_streaming', [(True, False), (False, True)])
+def test_streaming_and_buffered_services_interoperate(app, tmp_path, ds, sign_streaming, verify_streaming):
+    private_key, public_key = ds.generate_key_pair()
+    document = tmp_path / 'document.bin'
+    document.write_bytes(DOCUMENT)
+
+    signature_path, metadata = SignatureService(streaming=sign_streaming).sign_document(
+        str(document), '1', None, None, private_key=private_key, merkle=False)
+
+    assert metadata['digest'] == ds._sha256(DOCUMENT).hex()
+    assert SignatureService(streaming=verify_streaming).verify_signature(str(document), signature_path, public_key)
+
+def test_streaming_signing_memory_does_not_grow_with_the_document(app, tmp_path, ds):
+    private_key, _ = ds.generate_key_pair()
+    document = tmp_path / 'large.bin'
+    with open(document, 'wb') as f:
+        for _ in range(256):
+            f.write(os.urandom(HASH_CHUNK_SIZE))
+    service = SignatureService(streaming=True)
+
+    tracemalloc.start()
+    try:
+        service.sign_document(str(document), '1', None, None, private_key=private_key, merkle=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # A 16 MiB document is hashed through one chunk buffer
+    assert peak < 16 * HASH_CHUNK_SIZE
+
+def test_generated_keys_have_the_requested_type(ds, keys):
+    private_key, public_key = keys
+
+    key_type = ds.get_key_type(ds.load_private_key(private_key))
+
+    assert ds.get_key_type(public_key) == key_type
+    assert ds.get_signature_algorithm(public_key) == SIGNATURE_ALGORITHMS[key_type]
+
+def test_unsupported_key_type_is_rejected(ds):
+    with pytest.raises(ValueError):
+        ds.generate_key_pair(key_type='dsa')
+
+def test_signature_does_not_verify_under_another_key(ds, keys):
+    private_key, _ = keys
+    _, other_public_key = ds.generate_key_pair(key_type=KEY_TYPE_ED25519)
+
+    assert not ds.verify_signature(DOCUMENT, ds.sign_document(DOCUMENT, private_key), other_public_key)
+
+def test_encrypted_private_key_round_trips(ds, keys):
+    private_key, public_key = keys
+    encrypted = ds.encrypt_private_key(private_key, 'password')
+
+    decrypted = ds.decrypt_private_key(encrypted, 'password')
+
+    assert ds.verify_signature(DOCUMENT, ds.sign_document(DOCUMENT, decrypted), public_key)
+    with pytest.raises(Exception):
+        ds.decrypt_private_key(encrypted, 'wrong password')
+
+def test_container_records_the_algorithm(app, tmp_path, ds, keys):
+    private_key, public_key = keys
+    document = tmp_path / 'document.bin'
+    document.write_bytes(DOCUMENT)
+    service = SignatureService()
+
+    signature_path, metadata = service.sign_document(str(document), '1', None, None,
+                                                     private_key=private_key, merkle=False)
+
+    assert service.read_signature(signature_path)['algorithm'] == metadata['algorithm'] == \
+        ds.get_signature_algorithm(public_key)
+    assert service.verify_signature(str(document), signature_path, public_key)
+
+def test_rsa_signatures_verify_after_switching_key_type(app, client, upload):
+    user = User.query.filter_by(username='alice').one()
+    assert DigitalSignature().get_key_type(user.public_key) == KEY_TYPE_RSA
+    rsa_document = upload(b'signed with rsa', 'rsa.txt')['id']
+    client.post(f'/signature/sign/{rsa_document}', data={'password': 'password'})
+    rsa_public_key = user.public_key
+
+    client.post('/signature/keys', data={'password': 'password', 'key_type': KEY_TYPE_ED25519})
+    ed25519_document = upload(b'signed with ed25519', 'ed25519.txt')['id']
+    client.post(f'/signature/sign/{ed25519_document}', data={'password': 'password'})
+
+    service = SignatureService()
+    ed25519 = db.session.get(Document, ed25519_document)
+    assert service.read_signature(ed25519.get_signature_path())['algorithm'] == 'ed25519-sha256'
+    assert service.verify_signature(ed25519.get_file_path(), ed25519.get_signature_path(), user.public_key)
+    rsa = db.session.get(Document, rsa_document)
+    assert service.read_signature(rsa.get_signature_path())['algorithm'] == 'rsa-pss-sha256'
+    assert service.verify_signature(rsa.get_file_path(), rsa.get_signature_path(), rsa_public_key)
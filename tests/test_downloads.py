@@ -0,0 +1,121 @@
+"""
+Tests for conditional and Range requests on document downloads.
+"""
+
+import hashlib
+import pytest
+from src.utils.download_utils import OFFLOAD_X_SENDFILE, OFFLOAD_X_ACCEL_REDIRECT
+from tests.conftest import login
+
+CONTENT = bytes(range(256)) * 40
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture(params=['local', 's3'])
+def config(request):
+    """Blobs on local disk, then in a mocked S3 bucket."""
+    if request.param == 'local':
+        return {}
+    bucket = request.getfixturevalue('s3_bucket')
+    return {'STORAGE_BACKEND': 's3', 'STORAGE_S3_BUCKET': bucket, 'STORAGE_S3_REGION': 'us-east-1'}
+
+@pytest.fixture
+def url(upload):
+    """Download URL of an uploaded document."""
+    return f"/document/download/{upload(CONTENT, 'report.txt')['id']}"
+
+def test_download(client, url):
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['ETag'] == f'"{DIGEST}"'
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=report.txt'
+    assert response.cache_control.private and response.cache_control.no_cache
+
+def test_matching_etag_is_not_modified(client, url):
+    response = client.get(url, headers={'If-None-Match': f'"{DIGEST}"'})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == f'"{DIGEST}"'
+
+def test_other_etag_is_sent_in_full(client, url):
+    response = client.get(url, headers={'If-None-Match': '"other"'})
+
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+@pytest.mark.parametrize('header, start, end', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=1000-', 1000, len(CONTENT)),
+    ('bytes=-10', len(CONTENT) - 10, len(CONTENT)),
+    ('bytes=10000-20000', 10000, len(CONTENT))
+])
+def test_range(client, url, header, start, end):
+    response = client.get(url, headers={'Range': header})
+
+    assert response.status_code == 206
+    assert response.data == CONTENT[start:end]
+    assert response.headers['Content-Range'] == f'bytes {start}-{end - 1}/{len(CONTENT)}'
+    assert response.content_length == end - start
+
+def test_unsatisfiable_range(client, url):
+    response = client.get(url, headers={'Range': f'bytes={len(CONTENT)}-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+def test_if_range_with_current_etag(client, url):
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': f'"{DIGEST}"'})
+
+    assert response.status_code == 206
+    assert response.data == CONTENT[:10]
+
+def test_if_range_with_stale_etag_is_sent_in_full(client, url):
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+def test_head(client, url):
+    response = client.head(url)
+
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.content_length == len(CONTENT)
+
+def test_non_ascii_filename(client, upload):
+    document = upload(CONTENT, 'báo cáo.txt')
+
+    response = client.get(f"/document/download/{document['id']}")
+
+    assert response.headers['Content-Disposition'] == \
+        "attachment; filename=\"bao cao.txt\"; filename*=UTF-8''b%C3%A1o%20c%C3%A1o.txt"
+
+def test_other_users_cannot_download(app, client, url):
+    with app.app_context():
+        other = login(app, 'bob')
+        response = other.get(url)
+    assert response.status_code == 302
+
+@pytest.mark.parametrize('offload, header', [
+    (OFFLOAD_X_SENDFILE, 'X-Sendfile'),
+    (OFFLOAD_X_ACCEL_REDIRECT, 'X-Accel-Redirect')
+])
+def test_offload(app, client, url, offload, header):
+    app.config['DOWNLOAD_OFFLOAD'] = offload
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    if app.config['STORAGE_BACKEND'] == 's3':
+        # Objects that are not local files are always streamed
+        assert header not in response.headers
+        assert response.data == CONTENT
+        return
+    assert response.data == b''
+    assert response.content_length == len(CONTENT)
+    assert response.headers[header].endswith(DIGEST)
+    if offload == OFFLOAD_X_ACCEL_REDIRECT:
+        assert response.headers[header] == f'/protected-uploads/blobs/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}'
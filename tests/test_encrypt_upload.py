@@ -0,0 +1,114 @@
+"""
+Tests for encrypting an upload straight from the request stream.
+"""
+
+import hashlib
+import io
+import os
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.models.document import Document
+from src.services.document_service import DocumentService
+from src.services.encryption_service import EncryptionService
+from src.storage import get_storage
+from src.utils.file_utils import storage_key
+
+CONTENT = b'patient record\n' * 5000
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as a doctor of the 'Hospital' authority."""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'carol',
+        'email': 'carol@example.com',
+        'password': 'password',
+        'confirm_password': 'password',
+        'role': 'data_owner',
+        'attribute_Doctor': '1',
+        'authority_Doctor': 'Hospital'
+    })
+    client.post('/auth/login', data={'username': 'carol', 'password': 'password'})
+    return client
+
+class ForwardOnlyStream(io.RawIOBase):
+    """Request-like stream that can be read once and not rewound."""
+
+    def __init__(self, content):
+        self._stream = io.BytesIO(content)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+def stored_files(app):
+    """Contents of every file in the upload folder."""
+    contents = []
+    for directory, _, filenames in os.walk(app.config['UPLOAD_FOLDER']):
+        for filename in filenames:
+            with open(os.path.join(directory, filename), 'rb') as f:
+                contents.append(f.read())
+    return contents
+
+def encrypt(client, content=CONTENT):
+    """Post a file to the encrypt route."""
+    return client.post('/encryption/encrypt', data={
+        'file': (io.BytesIO(content), 'record.txt'),
+        'access_policy': 'Doctor@Hospital'
+    })
+
+def test_route_records_both_documents_without_storing_the_plaintext(app, client):
+    response = encrypt(client)
+
+    assert response.status_code == 302
+    original = Document.query.filter_by(doc_type='original').one()
+    encrypted = Document.query.filter_by(doc_type='encrypted').one()
+    assert encrypted.parent_id == original.id
+    assert not original.has_content()
+    assert (original.file_size, original.digest) == (len(CONTENT), hashlib.sha256(CONTENT).hexdigest())
+    with get_storage().open(storage_key(encrypted.filename)) as f:
+        ciphertext = f.read()
+    assert (encrypted.file_size, encrypted.digest) == (len(ciphertext), hashlib.sha256(ciphertext).hexdigest())
+    assert not [content for content in stored_files(app) if CONTENT[:64] in content]
+
+def test_streamed_ciphertext_decrypts_to_the_upload(app, client):
+    encrypt(client)
+    encrypted = Document.query.filter_by(doc_type='encrypted').one()
+
+    client.post(f'/encryption/decrypt/{encrypted.id}')
+
+    decrypted = Document.query.filter(Document.id > encrypted.id).one()
+    with get_storage().open(decrypted.get_storage_key()) as f:
+        assert f.read() == CONTENT
+
+def test_upload_is_read_in_a_single_pass(app, client):
+    service = EncryptionService()
+
+    path, metadata = service.encrypt_upload(ForwardOnlyStream(CONTENT), 'Doctor@Hospital', '1')
+
+    assert metadata['original_size'] == len(CONTENT)
+    assert metadata['original_digest'] == hashlib.sha256(CONTENT).hexdigest()
+    assert not os.path.exists(f'{path}.part')
+
+def test_oversized_upload_leaves_no_partial_ciphertext(app, client):
+    service = EncryptionService()
+
+    with pytest.raises(RequestEntityTooLarge):
+        service.encrypt_upload(io.BytesIO(CONTENT), 'Doctor@Hospital', '1', max_size=len(CONTENT) - 1)
+
+    for _, _, filenames in os.walk(app.config['UPLOAD_FOLDER']):
+        assert not [name for name in filenames if name.startswith('encrypted_')]
+
+def test_failed_recording_removes_the_ciphertext(app, client, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(DocumentService, 'save_encrypted_upload', fail)
+
+    response = encrypt(client)
+
+    assert response.status_code == 302
+    assert Document.query.count() == 0
+    for _, _, filenames in os.walk(app.config['UPLOAD_FOLDER']):
+        assert not [name for name in filenames if name.startswith('encrypted_')]
@@ -0,0 +1,142 @@
+"""
+Tests for the sharded upload layout, its fallback to the flat layout and
+the migration between them.
+"""
+
+import os
+import pytest
+import migrate_upload_layout
+from src.extensions import db
+from src.models.document import Document
+from src.models.user import User
+from src.utils import file_utils
+from src.utils.file_utils import (
+    get_file_path, get_storage_path, open_file, shard_path, delete_file, LAYOUT_MARKER,
+    KIND_DOCUMENTS, KIND_SIGNATURES, KIND_AUTHORITIES
+)
+
+FILENAME = '0123456789abcdef0123456789abcdef.txt'
+
+def write(path, content=b'content'):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def test_shard_path():
+    assert shard_path(FILENAME) == os.path.join(KIND_DOCUMENTS, '01', '23', FILENAME)
+    assert shard_path(f'signature_{FILENAME}.sig') == \
+        os.path.join(KIND_SIGNATURES, '01', '23', f'signature_{FILENAME}.sig')
+    assert shard_path('Hospital_sk.json') == os.path.join(KIND_AUTHORITIES, 'Hospital_sk.json')
+
+def test_get_file_path_prefers_sharded_path(tmp_path):
+    sharded_path = get_storage_path(FILENAME, str(tmp_path))
+    write(sharded_path)
+    write(str(tmp_path / FILENAME))
+
+    assert get_file_path(FILENAME, str(tmp_path)) == sharded_path
+
+def test_get_file_path_falls_back_to_flat_path(tmp_path):
+    write(str(tmp_path / FILENAME))
+
+    assert get_file_path(FILENAME, str(tmp_path)) == str(tmp_path / FILENAME)
+
+def test_get_file_path_of_missing_file_is_sharded(tmp_path):
+    assert get_file_path(FILENAME, str(tmp_path)) == str(tmp_path / shard_path(FILENAME))
+
+def test_no_fallback_once_migrated(tmp_path):
+    write(str(tmp_path / FILENAME))
+    write(str(tmp_path / LAYOUT_MARKER))
+
+    assert get_file_path(FILENAME, str(tmp_path)) == str(tmp_path / shard_path(FILENAME))
+
+def test_open_file_retries_sharded_path(tmp_path, monkeypatch):
+    flat_path = str(tmp_path / FILENAME)
+    write(flat_path, b'moved')
+    resolve = file_utils.get_file_path
+
+    def migrate_after_resolving(filename, directory=None, kind=None):
+        # The layout migration moves the file between lookup and open
+        path = resolve(filename, directory, kind)
+        os.replace(flat_path, get_storage_path(filename, directory))
+        return path
+
+    monkeypatch.setattr(file_utils, 'get_file_path', migrate_after_resolving)
+
+    with open_file(FILENAME, 'rb', str(tmp_path)) as f:
+        assert f.read() == b'moved'
+
+def test_open_file_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_file(FILENAME, 'rb', str(tmp_path))
+
+def test_delete_file_removes_both_copies(tmp_path):
+    write(get_storage_path(FILENAME, str(tmp_path)))
+    write(str(tmp_path / FILENAME))
+
+    assert delete_file(FILENAME, str(tmp_path))
+    assert not os.path.exists(tmp_path / FILENAME)
+    assert not os.path.exists(tmp_path / shard_path(FILENAME))
+
+def test_document_paths_fall_back_to_flat_layout(app):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    signature_file = f'signature_{FILENAME}.sig'
+    write(os.path.join(upload_folder, FILENAME))
+    write(get_storage_path(signature_file, upload_folder))
+
+    document = Document(filename=FILENAME, signature_file=signature_file)
+
+    assert document.get_file_path() == os.path.join(upload_folder, FILENAME)
+    assert document.get_signature_path() == os.path.join(upload_folder, shard_path(signature_file))
+
+@pytest.fixture
+def flat(app, monkeypatch):
+    """Upload folder with files in the flat layout, migrated by the script against the test app."""
+    monkeypatch.setattr(migrate_upload_layout, 'create_app', lambda: app)
+    upload_folder = app.config['UPLOAD_FOLDER']
+    names = [FILENAME, f'signature_{FILENAME}.sigc', 'Hospital_pk.json']
+    for name in names:
+        write(os.path.join(upload_folder, name), name.encode())
+    return upload_folder, names
+
+def test_migration_dry_run_moves_nothing(flat, capsys):
+    upload_folder, names = flat
+
+    assert migrate_upload_layout.migrate_upload_layout(dry_run=True) == 0
+
+    output = capsys.readouterr().out
+    for name in names:
+        assert f'{name} -> {shard_path(name)}' in output
+        assert os.path.exists(os.path.join(upload_folder, name))
+    assert not os.path.exists(os.path.join(upload_folder, LAYOUT_MARKER))
+    assert get_file_path(FILENAME, upload_folder) == os.path.join(upload_folder, FILENAME)
+
+def test_migration_moves_files_into_their_shards(flat):
+    upload_folder, names = flat
+    # Rewritten in the new layout after the migration started
+    write(get_storage_path(names[1], upload_folder), b'rewritten')
+
+    assert migrate_upload_layout.migrate_upload_layout() == 0
+
+    assert [entry for entry in os.listdir(upload_folder)
+            if os.path.isfile(os.path.join(upload_folder, entry))] == [LAYOUT_MARKER]
+    with open_file(FILENAME, 'rb', upload_folder) as f:
+        assert f.read() == FILENAME.encode()
+    with open_file(names[1], 'rb', upload_folder) as f:
+        assert f.read() == b'rewritten'
+    assert get_file_path(names[2], upload_folder) == \
+        os.path.join(upload_folder, KIND_AUTHORITIES, 'Hospital_pk.json')
+
+def test_documents_stay_readable_across_the_migration(client, flat):
+    user = User.query.filter_by(username='alice').one()
+    document = Document(filename=FILENAME, original_filename='report.txt', file_size=len(FILENAME),
+                        file_type='text/plain', user_id=user.id, doc_type='original')
+    db.session.add(document)
+    db.session.commit()
+
+    before = client.get(f'/document/download/{document.id}')
+    migrate_upload_layout.migrate_upload_layout()
+    after = client.get(f'/document/download/{document.id}')
+
+    assert before.status_code == after.status_code == 200
+    assert before.data == after.data == FILENAME.encode()
@@ -0,0 +1,145 @@
+"""
+Tests for streaming hybrid ABE encryption.
+"""
+
+import io
+import os
+import json
+import tracemalloc
+import pytest
+from cryptography.exceptions import InvalidTag
+from src.encryption.hybrid_abe import HybridABE, STREAM_CHUNK_SIZE
+
+POLICY = 'Doctor@Hospital'
+
+class CountingSink(io.RawIOBase):
+    """Writable stream that only counts bytes, so the output does not inflate traced memory."""
+
+    def __init__(self):
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+@pytest.fixture
+def abe():
+    """HybridABE instance."""
+    return HybridABE()
+
+@pytest.fixture
+def gp(abe):
+    """Global parameters."""
+    return abe.setup()
+
+@pytest.fixture
+def authority(abe, gp):
+    """Public and secret key of the 'Hospital' authority."""
+    return abe.authsetup(gp, 'Hospital')
+
+@pytest.fixture
+def user_keys(abe, gp, authority):
+    """Secret keys of a user holding the policy's attribute."""
+    _, sk = authority
+    return {
+        'keys': {POLICY: abe.keygen(gp, sk, 'user-1', POLICY)},
+        'authority_keys': {'Hospital': sk['key']}
+    }
+
+def test_encrypt_stream_round_trips(abe, gp, authority, user_keys):
+    pk, _ = authority
+    message = os.urandom(STREAM_CHUNK_SIZE * 2 + 12345)
+    output = io.BytesIO()
+
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(message), output, POLICY)
+
+    assert bytes(abe.decrypt(gp, user_keys, json.loads(output.getvalue()))) == message
+
+def test_encrypt_stream_matches_encrypt_format(abe, gp, authority):
+    pk, _ = authority
+    output = io.BytesIO()
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(b'hello'), output, POLICY)
+
+    streamed = json.loads(output.getvalue())
+    encrypted = abe.encrypt(gp, {'Hospital': pk}, b'hello', POLICY)
+    assert streamed.keys() == encrypted.keys()
+    assert streamed['encrypted_message'].keys() == encrypted['encrypted_message'].keys()
+
+def test_encrypt_stream_peak_memory_is_bounded(abe, gp, authority):
+    pk, _ = authority
+    size = 16 * 1024 * 1024
+    message = io.BytesIO(os.urandom(size))
+    sink = CountingSink()
+
+    tracemalloc.start()
+    try:
+        abe.encrypt_stream(gp, {'Hospital': pk}, message, sink, POLICY)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # The input chunk, the ciphertext buffer, one chunk's base64 encoding
+    # and the header, never anything proportional to the input
+    assert sink.size > size
+    assert peak < 5 * STREAM_CHUNK_SIZE
+
+@pytest.mark.parametrize('size', [0, 5, STREAM_CHUNK_SIZE, STREAM_CHUNK_SIZE * 2 + 12345])
+def test_decrypt_stream_round_trips(abe, gp, authority, user_keys, size):
+    pk, _ = authority
+    message = os.urandom(size)
+    ciphertext = io.BytesIO()
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(message), ciphertext, POLICY)
+    output = io.BytesIO()
+
+    # Chunks need not line up with the ones the payload was written in
+    written = abe.decrypt_stream(gp, user_keys, ciphertext, output, chunk_size=1000)
+
+    assert written == size
+    assert output.getvalue() == message
+
+def test_decrypt_stream_reads_encrypt_format(abe, gp, authority, user_keys):
+    pk, _ = authority
+    # encrypt() writes the message before the wrapped keys
+    ciphertext = json.dumps(abe.encrypt(gp, {'Hospital': pk}, b'hello', POLICY)).encode('utf-8')
+    output = io.BytesIO()
+
+    abe.decrypt_stream(gp, user_keys, io.BytesIO(ciphertext), output)
+
+    assert output.getvalue() == b'hello'
+
+def test_decrypt_stream_rejects_a_tampered_payload(abe, gp, authority, user_keys):
+    pk, _ = authority
+    ciphertext = io.BytesIO()
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(os.urandom(1000)), ciphertext, POLICY)
+    document = bytearray(ciphertext.getvalue())
+    payload = document.index(b'"ciphertext": "') + len(b'"ciphertext": "')
+    document[payload] = ord('A') if document[payload] != ord('A') else ord('B')
+
+    with pytest.raises(InvalidTag):
+        abe.decrypt_stream(gp, user_keys, io.BytesIO(bytes(document)), io.BytesIO())
+
+def test_decrypt_stream_rejects_other_documents(abe, gp, user_keys):
+    with pytest.raises(ValueError):
+        abe.decrypt_stream(gp, user_keys, io.BytesIO(b'{"policy": "Doctor@Hospital"}'), io.BytesIO())
+
+def test_decrypt_stream_peak_memory_is_bounded(abe, gp, authority, user_keys):
+    pk, _ = authority
+    size = 16 * 1024 * 1024
+    ciphertext = io.BytesIO()
+    abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(os.urandom(size)), ciphertext, POLICY)
+    sink = CountingSink()
+
+    tracemalloc.start()
+    try:
+        abe.decrypt_stream(gp, user_keys, ciphertext, sink)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # One chunk of base64 input, its decoding, the plaintext buffer and the
+    # header, never anything proportional to the document
+    assert sink.size == size
+    assert peak < 5 * STREAM_CHUNK_SIZE
@@ -0,0 +1,117 @@
+"""
+Tests for the unwrapped data-key cache.
+"""
+
+import io
+import json
+import pytest
+from src.encryption.hybrid_abe import HybridABE
+from src.encryption.key_cache import DataKeyCache, data_key_cache
+from src.services.encryption_service import EncryptionService
+
+POLICY = 'Doctor@Hospital'
+
+@pytest.fixture
+def cache():
+    """Empty data-key cache."""
+    return DataKeyCache()
+
+@pytest.fixture
+def abe(cache):
+    """HybridABE instance caching data keys."""
+    return HybridABE(data_key_cache=cache)
+
+@pytest.fixture
+def keys(abe):
+    """Global parameters, the authority's public keys and a user's keys."""
+    gp = abe.setup()
+    pk, sk = abe.authsetup(gp, 'Hospital')
+    user_keys = {
+        'keys': {POLICY: abe.keygen(gp, sk, 'user-1', POLICY)},
+        'authority_keys': {'Hospital': sk['key']}
+    }
+    return gp, {'Hospital': pk}, user_keys
+
+def test_repeat_decrypt_hits_the_cache(abe, cache, keys):
+    gp, pks, user_keys = keys
+    ct = abe.encrypt(gp, pks, b'hello', POLICY)
+
+    assert bytes(abe.decrypt(gp, user_keys, ct, document_id='encrypted_a.json')) == b'hello'
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    assert bytes(abe.decrypt(gp, user_keys, ct, document_id='encrypted_a.json')) == b'hello'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_decrypt_without_document_id_is_not_cached(abe, cache, keys):
+    gp, pks, user_keys = keys
+    ct = abe.encrypt(gp, pks, b'hello', POLICY)
+
+    abe.decrypt(gp, user_keys, ct)
+
+    assert (cache.hits, cache.misses) == (0, 0)
+
+def test_rekeyed_ciphertext_under_a_reused_id_is_unwrapped_again(abe, keys):
+    gp, pks, user_keys = keys
+    abe.decrypt(gp, user_keys, abe.encrypt(gp, pks, b'old', POLICY), document_id='encrypted_a.json')
+
+    rekeyed = abe.encrypt(gp, pks, b'new', POLICY)
+
+    # The stale key fails authentication and is replaced by the new one
+    assert bytes(abe.decrypt(gp, user_keys, rekeyed, document_id='encrypted_a.json')) == b'new'
+    assert bytes(abe.decrypt(gp, user_keys, rekeyed, document_id='encrypted_a.json')) == b'new'
+
+def test_streamed_rekey_under_a_reused_id_discards_the_stale_output(abe, keys):
+    gp, pks, user_keys = keys
+    old, new = io.BytesIO(), io.BytesIO()
+    abe.encrypt_stream(gp, pks, io.BytesIO(b'old version'), old, POLICY)
+    abe.encrypt_stream(gp, pks, io.BytesIO(b'new version'), new, POLICY)
+    abe.decrypt_stream(gp, user_keys, old, io.BytesIO(), document_id='encrypted_a.json')
+    output = io.BytesIO()
+
+    abe.decrypt_stream(gp, user_keys, new, output, document_id='encrypted_a.json')
+
+    assert output.getvalue() == b'new version'
+
+def test_expired_keys_are_missed():
+    cache = DataKeyCache(ttl=0)
+    cache.put('encrypted_a.json', 'attributes', b'key')
+
+    assert cache.get('encrypted_a.json', 'attributes') is None
+
+def test_oldest_keys_are_evicted():
+    cache = DataKeyCache(max_entries=2)
+    for name in ('a', 'b', 'c'):
+        cache.put(name, 'attributes', name.encode())
+
+    assert cache.get('a', 'attributes') is None
+    assert cache.get('c', 'attributes') == b'c'
+
+def test_service_reencryption_is_decrypted_with_the_new_key(app, tmp_path):
+    app.config['DATA_KEY_CACHE_ENABLED'] = True
+    data_key_cache.clear()
+    service = EncryptionService()
+    service.generate_user_keys('1', 'Hospital', ['Doctor'])
+    document = tmp_path / 'report.txt'
+
+    document.write_bytes(b'first version')
+    first_path, _ = service.encrypt_file(str(document), POLICY, '1')
+    output_path, success = service.decrypt_file(first_path, '1')
+    assert success
+
+    # Rekey: the document is encrypted again, under a fresh data key
+    document.write_bytes(b'second version')
+    second_path, _ = service.encrypt_file(str(document), POLICY, '1')
+    with open(first_path) as first, open(second_path) as second:
+        assert json.load(first)['encrypted_keys'] != json.load(second)['encrypted_keys']
+
+    output_path, success = service.decrypt_file(second_path, '1')
+    assert success
+    with open(output_path, 'rb') as f:
+        assert f.read() == b'second version'
+
+    # The first ciphertext's key is still cached under its own name
+    hits = data_key_cache.hits
+    output_path, _ = service.decrypt_file(first_path, '1')
+    with open(output_path, 'rb') as f:
+        assert f.read() == b'first version'
+    assert data_key_cache.hits == hits + 1
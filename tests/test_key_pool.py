@@ -0,0 +1,84 @@
+"""
+Tests for the pre-generated key pair pool and the signature metrics route.
+"""
+
+import time
+import pytest
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_ED25519, KEY_TYPE_ECDSA_P256
+from src.services.key_pool import KeyPairPool
+
+@pytest.fixture
+def pool():
+    """Ed25519 pool two pairs deep, stopped after the test."""
+    pool = KeyPairPool(depth=2, key_type=KEY_TYPE_ED25519)
+    yield pool
+    pool.stop()
+
+def wait_for(condition, timeout=10):
+    """Poll a condition until it holds or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def key_type(pair):
+    """Key type of a (private, public) PEM pair."""
+    ds = DigitalSignature()
+    return ds.get_key_type(ds.load_private_key(pair[0]))
+
+def test_pooled_pairs_are_hits_and_are_refilled(pool):
+    pool.start()
+    wait_for(lambda: pool.stats()['depth'] == 2)
+
+    first, second = pool.get(), pool.get()
+
+    assert first != second
+    assert key_type(first) == KEY_TYPE_ED25519
+    assert (pool.hits, pool.misses) == (2, 0)
+    # The refill thread tops the pool back up
+    wait_for(lambda: pool.stats()['depth'] == 2)
+    assert pool.stats()['generated'] == 4
+
+def test_empty_pool_generates_and_counts_a_miss(pool):
+    pair = pool.get()
+
+    assert key_type(pair) == KEY_TYPE_ED25519
+    assert (pool.hits, pool.misses) == (0, 1)
+
+def test_other_key_types_bypass_the_pool(pool):
+    pool.start()
+    wait_for(lambda: pool.stats()['depth'] == 2)
+
+    pair = pool.get(key_type=KEY_TYPE_ECDSA_P256)
+
+    assert key_type(pair) == KEY_TYPE_ECDSA_P256
+    assert pool.stats()['depth'] == 2
+    assert (pool.hits, pool.misses) == (0, 0)
+
+def test_configure_drops_pairs_of_the_old_type(pool):
+    pool.start()
+    wait_for(lambda: pool.stats()['depth'] == 2)
+
+    pool.configure(key_type=KEY_TYPE_ECDSA_P256)
+
+    # A full pool of stale pairs would never be refilled
+    wait_for(lambda: pool.stats()['depth'] == 2)
+    assert [key_type(pool.get()) for _ in range(2)] == [KEY_TYPE_ECDSA_P256] * 2
+    assert pool.stats()['hits'] == 2
+
+def test_disabled_pool_counts_nothing():
+    pool = KeyPairPool(depth=0, key_type=KEY_TYPE_ED25519)
+
+    pool.start()
+    pool.get()
+
+    assert pool.stats() == {'key_type': KEY_TYPE_ED25519, 'target_depth': 0, 'depth': 0,
+                            'hits': 0, 'misses': 0, 'generated': 0}
+
+def test_stats_route(client):
+    response = client.get('/signature/stats')
+
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert set(stats['key_pool']) == {'key_type', 'target_depth', 'depth', 'hits', 'misses', 'generated'}
+    assert set(stats['key_cache']) == {'entries', 'hits', 'misses'}
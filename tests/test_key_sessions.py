@@ -0,0 +1,119 @@
+"""
+Tests for keeping signing keys unlocked for a login session.
+"""
+
+import pytest
+from src.extensions import db
+from src.models.document import Document
+from src.services import key_session_store as store_module
+from src.services.key_session_store import KeySessionStore, key_session_store
+
+class Clock:
+    """Stand-in for the time module with a manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock driving key session expiry."""
+    clock = Clock()
+    monkeypatch.setattr(store_module, 'time', clock)
+    return clock
+
+@pytest.fixture
+def store(clock):
+    """Store with a 100 second TTL and a 30 second idle timeout."""
+    return KeySessionStore(ttl=100, idle_timeout=30)
+
+def test_unlocked_key_expires_after_the_ttl(store, clock):
+    token = store.unlock(1, 'key')
+
+    # Regular use keeps it from going idle, but not past the TTL
+    for _ in range(4):
+        clock.now += 20
+        assert store.get(1, token) == 'key'
+    clock.now += 20
+
+    assert store.get(1, token) is None
+
+def test_unlocked_key_expires_when_idle(store, clock):
+    token = store.unlock(1, 'key')
+
+    clock.now += 29
+    assert store.get(1, token) == 'key'
+    clock.now += 30
+
+    assert store.get(1, token) is None
+
+def test_keys_are_per_user_and_token(store):
+    token = store.unlock(1, 'key')
+
+    assert store.get(2, token) is None
+    assert store.get(1, 'other') is None
+    assert store.get(1, None) is None
+
+def test_lock_without_a_token_locks_nothing(store):
+    first, second = store.unlock(1, 'first'), store.unlock(1, 'second')
+
+    store.lock(1, None)
+    assert store.get(1, first) == 'first'
+
+    store.lock(1, first)
+    assert store.get(1, first) is None
+    assert store.get(1, second) == 'second'
+
+    store.lock_all(1)
+    assert store.get(1, second) is None
+
+@pytest.fixture
+def documents(upload):
+    """IDs of two uploaded documents."""
+    return [upload(b'first', 'first.txt')['id'], upload(b'second', 'second.txt')['id']]
+
+def unlocked_sessions():
+    """Number of unlocked keys in the shared store."""
+    return len(key_session_store._entries)
+
+def test_sign_without_a_password_after_unlocking(client, documents):
+    response = client.post(f'/signature/sign/{documents[0]}', data={'password': 'password', 'keep_unlocked': '1'})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session['key_session_id']
+
+    response = client.post(f'/signature/sign/{documents[1]}', data={})
+
+    assert response.status_code == 302
+    assert all(db.session.get(Document, document_id).is_signed for document_id in documents)
+
+def test_signing_without_an_unlocked_key_needs_the_password(client, documents):
+    client.post(f'/signature/sign/{documents[0]}', data={})
+
+    assert not db.session.get(Document, documents[0]).is_signed
+
+def test_logout_wipes_only_its_own_session(app, client, documents):
+    # The store is process-wide; drop keys earlier tests left unlocked for this user ID
+    key_session_store.lock_all(1)
+    other, third = app.test_client(), app.test_client()
+    with app.app_context():
+        other.post('/auth/login', data={'username': 'alice', 'password': 'password'})
+        other.post(f'/signature/sign/{documents[0]}', data={'password': 'password', 'keep_unlocked': '1'})
+    client.post(f'/signature/sign/{documents[1]}', data={'password': 'password', 'keep_unlocked': '1'})
+    assert unlocked_sessions() == 2
+
+    with app.app_context():
+        client.get('/auth/logout')
+    assert unlocked_sessions() == 1
+
+    # Logging out a session that never unlocked its key leaves the others unlocked
+    with app.app_context():
+        third.post('/auth/login', data={'username': 'alice', 'password': 'password'})
+        third.get('/auth/logout')
+    assert unlocked_sessions() == 1
+
+    with app.app_context():
+        other.get('/auth/logout')
+    assert unlocked_sessions() == 0
@@ -0,0 +1,141 @@
+"""
+Tests for Merkle-tree signatures: range verification, encrypted payload
+chunks and incremental re-signing.
+"""
+
+import io
+import os
+import pytest
+from src.encryption import merkle
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_ED25519
+from src.encryption.hybrid_abe import HybridABE, payload_chunk_range, STREAM_CHUNK_SIZE
+from src.services.signature_service import SignatureService
+
+CHUNK_SIZE = 1024
+CONTENT = os.urandom(10 * CHUNK_SIZE + 100)
+
+@pytest.fixture
+def keys():
+    """Ed25519 private and public key in PEM format."""
+    return DigitalSignature().generate_key_pair(key_type=KEY_TYPE_ED25519)
+
+@pytest.fixture
+def service(app):
+    """Signature service signing Merkle roots over small chunks."""
+    app.config['SIGNATURE_MERKLE_CHUNK_SIZE'] = CHUNK_SIZE
+    return SignatureService()
+
+@pytest.fixture
+def document(tmp_path):
+    """Path to a document spanning eleven chunks."""
+    path = tmp_path / 'document.bin'
+    path.write_bytes(CONTENT)
+    return str(path)
+
+@pytest.fixture
+def signature_path(service, document, keys):
+    """Path to a Merkle signature of the document."""
+    signature_path, metadata = service.sign_document(document, '1', None, None, private_key=keys[0], merkle=True)
+    assert metadata['digest_algorithm'] == merkle.digest_algorithm(CHUNK_SIZE)
+    return signature_path
+
+def write_chunk(path, index, chunk):
+    """Overwrite one chunk of a file in place."""
+    with open(path, 'r+b') as f:
+        f.seek(index * CHUNK_SIZE)
+        f.write(chunk)
+
+def test_tree_is_stored_next_to_the_signature(signature_path, document):
+    tree = merkle.MerkleTree.load(merkle.tree_filename(signature_path))
+
+    assert tree.root == merkle.MerkleTree.from_file(document, CHUNK_SIZE).root
+    assert len(tree.leaves) == 11
+
+def test_verify_range(service, document, signature_path, keys):
+    assert service.verify_signature(document, signature_path, keys[1])
+    assert service.verify_range(document, signature_path, keys[1], 1500, 2500)
+
+    write_chunk(document, 5, b'x' * CHUNK_SIZE)
+
+    # Only ranges touching the changed chunk fail
+    assert service.verify_range(document, signature_path, keys[1], 0, 5 * CHUNK_SIZE)
+    assert not service.verify_range(document, signature_path, keys[1], 5 * CHUNK_SIZE, 5 * CHUNK_SIZE + 1)
+
+def test_proof_checks_one_chunk_against_the_root():
+    chunks = [bytes([index]) * CHUNK_SIZE for index in range(5)]
+    tree = merkle.MerkleTree([merkle.hash_leaf(chunk) for chunk in chunks], CHUNK_SIZE)
+
+    for index, chunk in enumerate(chunks):
+        assert merkle.verify_proof(chunk, tree.proof(index), tree.root)
+    assert not merkle.verify_proof(chunks[0], tree.proof(1), tree.root)
+
+def test_update_leaf_matches_a_rebuilt_tree():
+    chunks = [bytes([index]) * 10 for index in range(7)]
+    tree = merkle.MerkleTree([merkle.hash_leaf(chunk) for chunk in chunks], 10)
+
+    chunks[6] = b'changed'
+    tree.update_leaf(6, chunks[6])
+
+    assert tree.root == merkle.MerkleTree([merkle.hash_leaf(chunk) for chunk in chunks], 10).root
+
+def test_resign_after_one_chunk_changes(service, document, signature_path, keys, monkeypatch):
+    write_chunk(document, 3, b'y' * CHUNK_SIZE)
+    assert not service.verify_signature(document, signature_path, keys[1])
+
+    updated = []
+    monkeypatch.setattr(merkle.MerkleTree, 'update_leaf',
+                        lambda tree, index, chunk, update=merkle.MerkleTree.update_leaf:
+                            updated.append(index) or update(tree, index, chunk))
+    monkeypatch.setattr(merkle.MerkleTree, 'save', lambda tree, path: pytest.fail('whole tree rewritten'))
+
+    path, metadata = service.resign_document(document, signature_path, '1',
+                                             [(3 * CHUNK_SIZE + 10, 3 * CHUNK_SIZE + 20)], private_key=keys[0])
+
+    # Stored signatures are immutable; the new one is written beside the old
+    assert path != signature_path
+    assert os.path.exists(signature_path)
+    assert updated == [3]
+    tree = merkle.MerkleTree.load(merkle.tree_filename(path))
+    assert tree.root == merkle.MerkleTree.from_file(document, CHUNK_SIZE).root
+    assert metadata['digest'] == tree.root.hex()
+    assert service.verify_signature(document, path, keys[1])
+    assert service.verify_range(document, path, keys[1], 3 * CHUNK_SIZE, 4 * CHUNK_SIZE)
+
+def test_resign_after_the_size_changed_rebuilds_the_tree(service, document, signature_path, keys):
+    with open(document, 'ab') as f:
+        f.write(b'z' * CHUNK_SIZE)
+
+    path, _ = service.resign_document(document, signature_path, '1', [], private_key=keys[0])
+
+    assert len(merkle.MerkleTree.load(merkle.tree_filename(path)).leaves) == 12
+    assert service.verify_signature(document, path, keys[1])
+
+def test_resign_requires_a_merkle_signature(service, document, keys):
+    signature_path, _ = service.sign_document(document, '1', None, None, private_key=keys[0], merkle=False)
+
+    assert service.resign_document(document, signature_path, '1', [(0, 1)], private_key=keys[0]) == (None, None)
+
+def test_verify_encrypted_payload_chunks(service, tmp_path, keys):
+    abe = HybridABE()
+    gp = abe.setup()
+    pk, _ = abe.authsetup(gp, 'Hospital')
+    encrypted = str(tmp_path / 'encrypted.json')
+    with open(encrypted, 'wb') as f:
+        abe.encrypt_stream(gp, {'Hospital': pk}, io.BytesIO(os.urandom(3 * STREAM_CHUNK_SIZE)), f,
+                           'Doctor@Hospital')
+    signature_path, _ = service.sign_document(encrypted, '1', None, None, private_key=keys[0], merkle=True)
+
+    start, end = payload_chunk_range(encrypted, 0, 1)
+    assert end - start == 2 * STREAM_CHUNK_SIZE // 3 * 4
+
+    # Tamper with the base64 text of the last payload chunk
+    start, end = payload_chunk_range(encrypted, 2, 2)
+    with open(encrypted, 'r+b') as f:
+        f.seek(end - 1)
+        tampered = b'A' if f.read(1) != b'A' else b'B'
+        f.seek(end - 1)
+        f.write(tampered)
+
+    assert service.verify_payload_chunks(encrypted, signature_path, keys[1], 0, 1)
+    assert not service.verify_payload_chunks(encrypted, signature_path, keys[1], 2, 2)
+    assert not service.verify_payload_chunks(encrypted, signature_path, keys[1], 3, 3)
@@ -0,0 +1,74 @@
+"""
+Tests for the parsed public key cache.
+"""
+
+import pytest
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_ED25519
+from src.encryption.public_key_cache import PublicKeyCache, key_fingerprint, public_key_cache
+from src.models.user import User
+
+@pytest.fixture
+def cache():
+    """Empty cache holding two keys."""
+    return PublicKeyCache(max_entries=2)
+
+@pytest.fixture
+def public_keys():
+    """Three Ed25519 public keys in PEM format."""
+    ds = DigitalSignature()
+    return [ds.generate_key_pair(key_type=KEY_TYPE_ED25519)[1] for _ in range(3)]
+
+def test_repeat_loads_hit_the_cache(cache, public_keys):
+    parsed = []
+    loader = lambda pem: parsed.append(pem) or object()
+
+    first = cache.get_or_load(public_keys[0], loader)
+    # Surrounding whitespace does not change the fingerprint
+    second = cache.get_or_load('\n' + public_keys[0] + '\n', loader)
+
+    assert first is second
+    assert len(parsed) == 1
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1}
+
+def test_least_recently_used_key_is_evicted(cache, public_keys):
+    loader = lambda pem: object()
+    first = cache.get_or_load(public_keys[0], loader)
+    cache.get_or_load(public_keys[1], loader)
+    cache.get_or_load(public_keys[0], loader)
+
+    cache.get_or_load(public_keys[2], loader)
+
+    assert cache.get_or_load(public_keys[0], loader) is first
+    assert cache.stats()['entries'] == 2
+    cache.get_or_load(public_keys[1], loader)
+    assert cache.misses == 4
+
+def test_invalidated_key_is_parsed_again(cache, public_keys):
+    ds = DigitalSignature(key_cache=cache)
+    first = ds.load_public_key(public_keys[0])
+
+    cache.invalidate(public_keys[0])
+
+    assert ds.load_public_key(public_keys[0]) is not first
+    assert (cache.hits, cache.misses) == (0, 2)
+
+def test_verification_parses_each_key_once(cache):
+    ds = DigitalSignature(key_cache=cache)
+    private_key, public_key = ds.generate_key_pair(key_type=KEY_TYPE_ED25519)
+    signatures = [ds.sign_document(bytes([index]), private_key) for index in range(5)]
+
+    for index, signature in enumerate(signatures):
+        assert ds.verify_signature(bytes([index]), signature, public_key)
+
+    assert (cache.hits, cache.misses) == (4, 1)
+
+def test_regenerating_keys_drops_the_old_key(client):
+    user = User.query.filter_by(username='alice').one()
+    old_public_key = user.public_key
+    public_key_cache.get_or_load(old_public_key, DigitalSignature()._load_public_key)
+
+    response = client.post('/signature/keys', data={'password': 'password', 'key_type': KEY_TYPE_ED25519})
+
+    assert response.status_code == 302
+    assert user.public_key != old_public_key
+    assert key_fingerprint(old_public_key) not in public_key_cache._keys
@@ -0,0 +1,116 @@
+"""
+Tests for resumable uploads sent as a series of chunks.
+"""
+
+import os
+import fcntl
+import pytest
+from src.extensions import db
+from src.models.document import Document
+from src.models.upload_session import UploadSession
+from src.utils.file_utils import get_file_path, KIND_PARTIAL
+from tests.conftest import login
+
+CONTENT = b'0123456789'
+
+def put_chunk(client, upload_id, offset, chunk):
+    """PUT one chunk at an offset."""
+    return client.put(f'/document/uploads/{upload_id}', data=chunk, headers={'Upload-Offset': str(offset)})
+
+def part_path(upload_id):
+    """Path to an upload's partial file."""
+    return get_file_path(db.session.get(UploadSession, upload_id).part_filename, kind=KIND_PARTIAL)
+
+@pytest.fixture
+def upload_id(client):
+    """ID of an open upload declared as 10 bytes."""
+    response = client.post('/document/uploads', json={'filename': 'chunked.txt', 'size': len(CONTENT)})
+    assert response.status_code == 201
+    assert response.headers['Upload-Offset'] == '0'
+    return response.get_json()['upload_id']
+
+def test_chunks_are_appended_and_finalized(client, upload_id):
+    response = put_chunk(client, upload_id, 0, CONTENT[:4])
+    assert response.status_code == 200
+    assert response.headers['Upload-Offset'] == '4'
+
+    response = put_chunk(client, upload_id, 4, CONTENT[4:])
+    assert response.headers['Upload-Offset'] == '10'
+
+    response = client.get(f'/document/uploads/{upload_id}')
+    assert response.get_json()['offset'] == 10
+
+    response = client.post(f'/document/uploads/{upload_id}/finalize', json={})
+    assert response.status_code == 201
+    document = db.session.get(Document, response.get_json()['id'])
+    with open(document.get_file_path(), 'rb') as f:
+        assert f.read() == CONTENT
+    assert db.session.get(UploadSession, upload_id) is None
+
+def test_wrong_offset_is_a_conflict(client, upload_id):
+    put_chunk(client, upload_id, 0, CONTENT[:4])
+
+    for offset in (0, 2, 6):
+        response = put_chunk(client, upload_id, offset, CONTENT[offset:offset + 2])
+        assert response.status_code == 409
+        assert response.headers['Upload-Offset'] == '4'
+        assert response.get_json()['offset'] == 4
+
+    with open(part_path(upload_id), 'rb') as f:
+        assert f.read() == CONTENT[:4]
+
+def test_chunk_past_declared_size_is_rejected(client, upload_id):
+    put_chunk(client, upload_id, 0, CONTENT[:8])
+
+    response = put_chunk(client, upload_id, 8, b'too long')
+    assert response.status_code == 413
+    assert response.headers['Upload-Offset'] == '8'
+    # The rejected chunk's bytes are discarded
+    assert os.path.getsize(part_path(upload_id)) == 8
+
+def test_declared_size_over_limit_is_rejected(app, client):
+    response = client.post('/document/uploads', json={
+        'filename': 'huge.txt', 'size': app.config['RESUMABLE_UPLOAD_MAX_SIZE'] + 1
+    })
+    assert response.status_code == 413
+
+def test_torn_tail_is_overwritten_on_resume(client, upload_id):
+    put_chunk(client, upload_id, 0, CONTENT[:4])
+    # Bytes of a chunk interrupted before its offset was recorded
+    with open(part_path(upload_id), 'ab') as f:
+        f.write(b'torn')
+
+    response = put_chunk(client, upload_id, 4, CONTENT[4:])
+    assert response.headers['Upload-Offset'] == '10'
+    with open(part_path(upload_id), 'rb') as f:
+        assert f.read() == CONTENT
+
+def test_locked_upload_is_a_conflict(client, upload_id):
+    put_chunk(client, upload_id, 0, CONTENT[:4])
+
+    with open(part_path(upload_id), 'r+b') as f:
+        # Another request is writing a chunk
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+        response = put_chunk(client, upload_id, 4, CONTENT[4:])
+        assert response.status_code == 409
+        assert response.headers['Upload-Offset'] == '4'
+
+        response = client.post(f'/document/uploads/{upload_id}/finalize', json={})
+        assert response.status_code == 409
+
+    with open(part_path(upload_id), 'rb') as f:
+        assert f.read() == CONTENT[:4]
+    assert put_chunk(client, upload_id, 4, CONTENT[4:]).status_code == 200
+
+def test_incomplete_upload_cannot_be_finalized(client, upload_id):
+    put_chunk(client, upload_id, 0, CONTENT[:4])
+
+    response = client.post(f'/document/uploads/{upload_id}/finalize', json={})
+    assert response.status_code == 400
+    assert Document.query.count() == 0
+
+def test_upload_of_another_user_is_not_found(app, client, upload_id):
+    with app.app_context():
+        other = login(app, 'bob')
+        assert put_chunk(other, upload_id, 0, CONTENT).status_code == 404
@@ -0,0 +1,80 @@
+"""
+Tests for signing several documents with a single key unlock.
+"""
+
+import pytest
+from src.extensions import db
+from src.encryption.digital_signature import DigitalSignature
+from src.models.document import Document
+from src.models.user import User
+from src.services.signature_service import SignatureService
+from tests.conftest import login
+
+@pytest.fixture
+def unlocks(monkeypatch):
+    """List recording every private key decryption."""
+    unlocks = []
+    decrypt = DigitalSignature.decrypt_private_key
+    monkeypatch.setattr(DigitalSignature, 'decrypt_private_key',
+                        lambda ds, key, password: unlocks.append(password) or decrypt(ds, key, password))
+    return unlocks
+
+@pytest.fixture
+def documents(upload):
+    """IDs of five uploaded documents."""
+    return [upload(f'release note {index}'.encode(), f'note{index}.txt')['id'] for index in range(5)]
+
+def signed(document_ids):
+    """Signed state of documents, refreshed from the database."""
+    db.session.expire_all()
+    return [db.session.get(Document, document_id).is_signed for document_id in document_ids]
+
+def test_batch_unlocks_the_key_once(client, documents, unlocks, monkeypatch):
+    commits = []
+    commit = db.session.commit
+    monkeypatch.setattr(db.session, 'commit', lambda: commits.append(1) or commit())
+
+    response = client.post('/signature/sign-batch', data={'password': 'password', 'document_ids': documents})
+
+    assert response.status_code == 302
+    assert unlocks == ['password']
+    assert len(commits) == 1
+    assert signed(documents) == [True] * 5
+    user = User.query.filter_by(username='alice').one()
+    service = SignatureService()
+    for document_id in documents:
+        document = db.session.get(Document, document_id)
+        assert service.verify_signature(document.get_file_path(), document.get_signature_path(), user.public_key)
+
+def test_batch_with_a_wrong_password_signs_nothing(client, documents, unlocks):
+    client.post('/signature/sign-batch', data={'password': 'wrong', 'document_ids': documents})
+
+    assert unlocks == ['wrong']
+    assert signed(documents) == [False] * 5
+
+def test_batch_rejects_other_users_documents(app, client, documents):
+    with app.app_context():
+        other = login(app, 'bob')
+        other.post('/signature/sign-batch', data={'password': 'password', 'document_ids': documents[:2]})
+
+    assert signed(documents) == [False] * 5
+
+def test_batch_uses_a_key_unlocked_earlier(client, documents, unlocks):
+    client.post(f'/signature/sign/{documents[0]}', data={'password': 'password', 'keep_unlocked': '1'})
+
+    client.post('/signature/sign-batch', data={'document_ids': documents[1:]})
+
+    assert unlocks == ['password']
+    assert signed(documents) == [True] * 5
+
+def test_failed_documents_do_not_stop_the_batch(app, client, documents):
+    user = User.query.filter_by(username='alice').one()
+    private_key = DigitalSignature().decrypt_private_key(user.private_key_encrypted, 'password')
+    paths = {document_id: db.session.get(Document, document_id).get_file_path() for document_id in documents}
+    paths[999] = '/nonexistent/document.txt'
+
+    results = SignatureService().sign_documents(paths, str(user.id), None, None, private_key=private_key,
+                                                max_workers=4)
+
+    assert results[999] == (None, None)
+    assert all(results[document_id][0] for document_id in documents)
@@ -0,0 +1,138 @@
+"""
+Tests for the binary signature container and the conversion of legacy
+.sig + .json signature pairs.
+"""
+
+import os
+import json
+import struct
+import pytest
+import convert_signatures
+from datetime import datetime, timezone
+from src.extensions import db
+from src.encryption import signature_container
+from src.encryption.digital_signature import DigitalSignature
+from src.encryption.signature_container import pack_signature, unpack_signature, read_signature_file
+from src.models.document import Document
+from src.models.user import User
+from src.services.signature_service import SignatureService
+from src.utils.file_utils import get_storage_path
+
+FIELDS = {
+    'signature': os.urandom(256),
+    'digest': os.urandom(32),
+    'algorithm': 'rsa-pss-sha256',
+    'key_fingerprint': os.urandom(32).hex(),
+    'signer_id': '42',
+    'document': 'báo cáo.pdf',
+    'timestamp': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'digest_algorithm': 'merkle-sha256/65536'
+}
+
+def test_round_trip():
+    container = unpack_signature(pack_signature(**FIELDS))
+
+    assert container == dict(FIELDS, timestamp='2024-05-01T12:30:15.123456+00:00')
+
+def test_plain_digest_is_the_default():
+    fields = dict(FIELDS)
+    del fields['digest_algorithm']
+
+    assert unpack_signature(pack_signature(**fields))['digest_algorithm'] == 'sha256'
+
+def test_version_1_containers_are_read():
+    data = bytearray(pack_signature(**dict(FIELDS, digest_algorithm='sha256')))
+    data[4] = 1
+    # Version 1 has no digest algorithm field after the digest
+    start = struct.calcsize('>4sBq') + 1 + len(FIELDS['algorithm']) + 1 + len(FIELDS['digest'])
+    del data[start:start + 1 + len('sha256')]
+
+    container = unpack_signature(bytes(data))
+
+    assert container['digest_algorithm'] == 'sha256'
+    assert container['signature'] == FIELDS['signature']
+    assert container['document'] == FIELDS['document']
+
+def test_every_truncation_is_rejected():
+    data = pack_signature(**FIELDS)
+
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            unpack_signature(data[:length])
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: b'XDSG' + data[4:],
+    lambda data: data[:4] + bytes([9]) + data[5:],
+    lambda data: data[:13] + bytes([255]) + data[14:]
+])
+def test_corrupt_containers_are_rejected(corrupt):
+    with pytest.raises(ValueError):
+        unpack_signature(corrupt(pack_signature(**FIELDS)))
+
+def test_raw_legacy_signatures_are_read_as_is(tmp_path):
+    path = tmp_path / 'signature_a.sig'
+    path.write_bytes(FIELDS['signature'])
+
+    assert read_signature_file(str(path)) == {'signature': FIELDS['signature']}
+
+def test_containers_fit_in_one_read():
+    data = pack_signature(**dict(FIELDS, signature=os.urandom(2 * 1024)))
+
+    assert len(data) < signature_container.MAX_CONTAINER_SIZE
+
+@pytest.fixture
+def legacy(app, upload):
+    """Document of alice signed in the legacy .sig + .json format."""
+    content = b'signed before containers\n' * 100
+    document = db.session.get(Document, upload(content, 'old.txt')['id'])
+    user = User.query.filter_by(username='alice').one()
+    ds = DigitalSignature()
+    private_key = ds.decrypt_private_key(user.private_key_encrypted, 'password')
+
+    with open(get_storage_path('signature_legacy.sig'), 'wb') as f:
+        f.write(ds.sign_document(content, private_key))
+    with open(get_storage_path('signature_legacy.json'), 'w') as f:
+        json.dump({'signer_id': str(user.id), 'timestamp': '2023-01-02T03:04:05',
+                   'digest': document.digest}, f)
+    document.is_signed = True
+    document.signature_file = 'signature_legacy.sig'
+    document.signer_id = user.id
+    db.session.commit()
+    return document
+
+def test_convert_legacy_signatures(app, legacy, monkeypatch):
+    monkeypatch.setattr(convert_signatures, 'create_app', lambda: app)
+    legacy_paths = [get_storage_path('signature_legacy.sig'), get_storage_path('signature_legacy.json')]
+
+    assert convert_signatures.convert_signatures() == 0
+
+    db.session.refresh(legacy)
+    assert legacy.signature_file == 'signature_legacy.sigc'
+    assert not any(os.path.exists(path) for path in legacy_paths)
+    container = read_signature_file(legacy.get_signature_path())
+    assert container['digest'].hex() == legacy.digest
+    assert container['document'] == legacy.filename
+    assert container['timestamp'].startswith('2023-01-02T03:04:05')
+    signer = db.session.get(User, legacy.signer_id)
+    assert SignatureService().verify_signature(legacy.get_file_path(), legacy.get_signature_path(), signer.public_key)
+
+    # Converted documents are skipped on a second run
+    assert convert_signatures.convert_signatures() == 0
+
+def test_convert_keeps_legacy_files_when_asked(app, legacy, monkeypatch):
+    monkeypatch.setattr(convert_signatures, 'create_app', lambda: app)
+
+    assert convert_signatures.convert_signatures(keep=True, batch_size=1) == 0
+
+    assert os.path.exists(get_storage_path('signature_legacy.sig'))
+    assert os.path.exists(get_storage_path('signature_legacy.json'))
+
+def test_documents_without_a_signer_are_reported(app, legacy, monkeypatch):
+    monkeypatch.setattr(convert_signatures, 'create_app', lambda: app)
+    legacy.signer_id = 999
+    db.session.commit()
+
+    assert convert_signatures.convert_signatures() == 1
+
+    db.session.refresh(legacy)
+    assert legacy.signature_file == 'signature_legacy.sig'
@@ -0,0 +1,111 @@
+"""
+Tests for the storage backends.
+"""
+
+import io
+import os
+import pytest
+from src.storage.base import StorageBackend
+from src.storage.local import LocalStorage
+
+KEY = 'blobs/ab/cd/object'
+CONTENT = b'0123456789' * 1000
+
+@pytest.fixture
+def s3(tmp_path, s3_bucket):
+    """S3 backend on a bucket mocked by moto."""
+    from src.storage.s3 import S3Storage
+    return S3Storage(s3_bucket, str(tmp_path / 'cache'), prefix='uploads', region_name='us-east-1')
+
+@pytest.fixture
+def local(tmp_path):
+    """Local backend in a temporary directory."""
+    return LocalStorage(str(tmp_path / 'uploads'))
+
+@pytest.fixture(params=['local', 's3'])
+def storage(request):
+    """Each storage backend in turn."""
+    return request.getfixturevalue(request.param)
+
+def read(stream):
+    """Read and close a stream."""
+    with stream:
+        return stream.read()
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+def test_write_and_open(storage):
+    assert storage.write(KEY, io.BytesIO(CONTENT)) == len(CONTENT)
+    assert read(storage.open(KEY)) == CONTENT
+
+def test_write_file_consumes_the_file(storage, tmp_path):
+    file_path = tmp_path / 'staged'
+    file_path.write_bytes(CONTENT)
+
+    assert storage.write_file(KEY, str(file_path)) == len(CONTENT)
+    assert not file_path.exists()
+    assert read(storage.open(KEY)) == CONTENT
+
+@pytest.mark.parametrize('start, end', [(0, 10), (5, 15), (9990, None), (100, len(CONTENT))])
+def test_open_range(storage, start, end):
+    storage.write(KEY, io.BytesIO(CONTENT))
+    assert read(storage.open(KEY, start, end)) == CONTENT[start:end]
+
+def test_open_empty_range(storage):
+    storage.write(KEY, io.BytesIO(CONTENT))
+    assert read(storage.open(KEY, 10, 10)) == b''
+
+def test_open_missing(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.open(KEY)
+
+def test_stat(storage):
+    assert storage.stat(KEY) is None
+    assert not storage.exists(KEY)
+
+    storage.write(KEY, io.BytesIO(CONTENT))
+
+    stat = storage.stat(KEY)
+    assert stat['size'] == len(CONTENT)
+    assert stat['modified'].tzinfo is not None
+    assert storage.exists(KEY)
+
+def test_delete(storage):
+    storage.write(KEY, io.BytesIO(CONTENT))
+    local_path = storage.local_path(KEY)
+
+    storage.delete(KEY)
+
+    assert storage.stat(KEY) is None
+    assert not os.path.exists(local_path)
+    # Deleting again is not an error
+    storage.delete(KEY)
+
+def test_local_path(storage):
+    storage.write(KEY, io.BytesIO(CONTENT))
+
+    path = storage.local_path(KEY)
+
+    with open(path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert storage.local_path(KEY) == path
+
+def test_local_path_missing(storage):
+    with pytest.raises(FileNotFoundError):
+        with open(storage.local_path(KEY), 'rb'):
+            pass
+
+def test_local_file(local, s3):
+    local.write(KEY, io.BytesIO(CONTENT))
+    s3.write(KEY, io.BytesIO(CONTENT))
+
+    assert local.local_file(KEY) == local.local_path(KEY)
+    assert s3.local_file(KEY) is None
+
+def test_s3_keys_are_prefixed(s3, s3_bucket):
+    s3.write(KEY, io.BytesIO(CONTENT))
+
+    listed = s3._client.list_objects_v2(Bucket=s3_bucket)['Contents']
+    assert [item['Key'] for item in listed] == ['uploads/' + KEY]
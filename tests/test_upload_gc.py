@@ -0,0 +1,169 @@
+"""
+Tests for collecting unreferenced artifacts from the upload folder.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+from src.extensions import db
+from src.models.document import Document
+from src.models.upload_session import UploadSession
+from src.models.user import User
+from src.services.upload_gc import UploadGarbageCollector, QUARANTINE_FOLDER, DEFAULT_TTLS
+from src.utils.file_utils import get_storage_path, KIND_PARTIAL
+
+DAY = 86400
+UUID = '0123456789abcdef0123456789abcdef'
+
+def write(directory, filename, age=2 * DAY, kind=None):
+    """Write a file into its place in the upload folder, last modified age seconds ago."""
+    path = get_storage_path(filename, directory, kind)
+    with open(path, 'wb') as f:
+        f.write(b'x' * 10)
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+    return path
+
+@pytest.fixture
+def directory(app):
+    """Upload folder of the application under test."""
+    return app.config['UPLOAD_FOLDER']
+
+@pytest.fixture
+def collector():
+    """Collector with the default TTLs and small batches."""
+    return UploadGarbageCollector(batch_size=2)
+
+@pytest.fixture
+def user(app):
+    """Owner of the documents."""
+    user = User(username='alice', email='alice@example.com', role='data_owner')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def add_document(user, filename, signature_file=None):
+    """Add a document row referencing a file."""
+    document = Document(filename=filename, original_filename='a.txt', user_id=user.id,
+                        signature_file=signature_file, is_signed=signature_file is not None)
+    db.session.add(document)
+    db.session.commit()
+    return document
+
+def test_orphans_are_removed_and_referenced_files_kept(directory, collector, user):
+    referenced = write(directory, f'{UUID}.txt')
+    add_document(user, f'{UUID}.txt')
+    orphans = [write(directory, f'{index:032x}.txt') for index in range(5)]
+
+    stats = collector.collect(directory)
+
+    assert os.path.exists(referenced)
+    assert not any(os.path.exists(path) for path in orphans)
+    assert stats['orphan'] == {'expired': 6, 'kept': 1, 'removed': 5, 'bytes': 50}
+
+def test_files_within_ttl_are_kept(directory, collector):
+    recent = write(directory, f'{UUID}.txt', age=DEFAULT_TTLS['orphan'] - 60)
+
+    assert collector.collect(directory) == {}
+    assert os.path.exists(recent)
+
+def test_temporary_files_are_removed_after_their_ttl(directory, collector, user):
+    add_document(user, f'{UUID}.txt')
+    expired = write(directory, f'{UUID}.txt.tmp', age=DEFAULT_TTLS['temp'] + 60)
+    recent = write(directory, f'{UUID}.txt.part', age=60)
+
+    stats = collector.collect(directory)
+
+    assert not os.path.exists(expired)
+    assert os.path.exists(recent)
+    assert stats['temp']['removed'] == 1
+
+def test_signature_files_of_referenced_signatures_are_kept(directory, collector, user):
+    signature = f'signature_{UUID}'
+    add_document(user, f'{UUID}.txt', signature_file=f'{signature}.sig')
+    kept = [write(directory, signature + extension) for extension in ('.sig', '.json', '.merkle')]
+    orphan = f'signature_{"f" * 32}'
+    removed = [write(directory, orphan + extension) for extension in ('.sigc', '.json', '.merkle')]
+
+    collector.collect(directory)
+
+    assert all(os.path.exists(path) for path in kept)
+    assert not any(os.path.exists(path) for path in removed)
+
+def test_user_keys_of_missing_users_are_removed(directory, collector, user):
+    kept = write(directory, f'user_{user.id}_keys.json')
+    removed = write(directory, 'user_999_keys.json')
+
+    collector.collect(directory)
+
+    assert os.path.exists(kept)
+    assert not os.path.exists(removed)
+
+def test_idle_upload_sessions_expire(directory, collector, user):
+    idle = UploadSession(id='a' * 32, user_id=user.id, filename='idle.txt', received=10,
+                         updated_at=datetime.utcnow() - timedelta(days=2))
+    active = UploadSession(id='b' * 32, user_id=user.id, filename='active.txt', received=10,
+                           updated_at=datetime.utcnow())
+    db.session.add_all([idle, active])
+    db.session.commit()
+    idle_path = write(directory, idle.part_filename, kind=KIND_PARTIAL)
+    # An old partial file is kept while its upload is active
+    active_path = write(directory, active.part_filename, kind=KIND_PARTIAL)
+
+    stats = collector.collect(directory)
+
+    assert not os.path.exists(idle_path)
+    assert os.path.exists(active_path)
+    assert db.session.get(UploadSession, 'a' * 32) is None
+    assert db.session.get(UploadSession, 'b' * 32) is not None
+    assert stats['upload_session'] == {'sessions': 1, 'expired': 2, 'kept': 1, 'removed': 1, 'bytes': 10}
+
+def test_dry_run_removes_nothing(directory, collector, user):
+    idle = UploadSession(id='a' * 32, user_id=user.id, filename='idle.txt', received=10,
+                         updated_at=datetime.utcnow() - timedelta(days=2))
+    db.session.add(idle)
+    db.session.commit()
+    part_path = write(directory, idle.part_filename, kind=KIND_PARTIAL)
+    orphan = write(directory, f'{UUID}.txt')
+
+    stats = collector.collect(directory, dry_run=True)
+
+    assert os.path.exists(part_path)
+    assert os.path.exists(orphan)
+    assert db.session.get(UploadSession, 'a' * 32) is not None
+    assert stats['orphan']['removed'] == 1
+    assert stats['upload_session']['removed'] == 1
+
+def test_quarantine_keeps_files_until_their_ttl(directory, user):
+    collector = UploadGarbageCollector(quarantine=True)
+    orphan = write(directory, f'{UUID}.txt')
+
+    collector.collect(directory)
+
+    quarantined = os.path.join(directory, QUARANTINE_FOLDER, os.path.relpath(orphan, directory))
+    assert not os.path.exists(orphan)
+    assert os.path.exists(quarantined)
+
+    collector.collect(directory, now=time.time() + DEFAULT_TTLS['quarantine'] - 60)
+    assert os.path.exists(quarantined)
+
+    stats = collector.collect(directory, now=time.time() + DEFAULT_TTLS['quarantine'] + 60)
+    assert not os.path.exists(quarantined)
+    assert stats['quarantine']['removed'] == 1
+
+def test_expired_cache_copies_are_removed(directory, collector, tmp_path):
+    cache_folder = tmp_path / 'cache'
+    cache_folder.mkdir()
+    expired = cache_folder / 'expired'
+    recent = cache_folder / 'recent'
+    expired.write_bytes(b'x')
+    recent.write_bytes(b'x')
+    modified = time.time() - DEFAULT_TTLS['cache'] - 60
+    os.utime(expired, (modified, modified))
+
+    collector.collect(directory, cache_folder=str(cache_folder))
+
+    assert not expired.exists()
+    assert recent.exists()
@@ -0,0 +1,84 @@
+"""
+Tests for the persistent signature verification result cache.
+"""
+
+import pytest
+from src.encryption.digital_signature import DigitalSignature, KEY_TYPE_ED25519
+from src.models.verification import VerificationResult
+from src.services.signature_service import SignatureService
+
+@pytest.fixture
+def keys():
+    """Ed25519 private and public key in PEM format."""
+    return DigitalSignature().generate_key_pair(key_type=KEY_TYPE_ED25519)
+
+@pytest.fixture
+def signed(app, tmp_path, keys):
+    """Paths to a document and its signature."""
+    document = tmp_path / 'document.txt'
+    document.write_bytes(b'discharge summary')
+    signature_path, _ = SignatureService().sign_document(str(document), '1', None, None,
+                                                         private_key=keys[0], merkle=False)
+    return str(document), signature_path
+
+@pytest.fixture
+def verifications(monkeypatch):
+    """List recording every cryptographic verification."""
+    verifications = []
+    verify = SignatureService._verify_loaded
+    monkeypatch.setattr(SignatureService, '_verify_loaded',
+                        lambda service, *args: verifications.append(args) or verify(service, *args))
+    return verifications
+
+def test_repeat_verification_is_served_from_the_cache(signed, keys, verifications):
+    service = SignatureService()
+
+    assert service.verify_signature(*signed, keys[1])
+    assert service.verify_signature(*signed, keys[1])
+
+    assert len(verifications) == 1
+    assert VerificationResult.query.count() == 1
+
+def test_force_verifies_again(signed, keys, verifications):
+    service = SignatureService()
+    service.verify_signature(*signed, keys[1])
+
+    assert service.verify_signature(*signed, keys[1], force=True)
+
+    assert len(verifications) == 2
+    assert VerificationResult.query.count() == 1
+
+def test_changed_document_misses_the_cache(signed, keys, verifications):
+    service = SignatureService()
+    service.verify_signature(*signed, keys[1])
+    with open(signed[0], 'ab') as f:
+        f.write(b' amended')
+
+    assert not service.verify_signature(*signed, keys[1])
+
+    assert len(verifications) == 2
+    # Invalid results are cached too
+    assert not service.verify_signature(*signed, keys[1])
+    assert len(verifications) == 2
+
+def test_other_key_misses_the_cache(signed, keys, verifications):
+    service = SignatureService()
+    service.verify_signature(*signed, keys[1])
+    _, other_public_key = DigitalSignature().generate_key_pair(key_type=KEY_TYPE_ED25519)
+
+    assert not service.verify_signature(*signed, other_public_key)
+
+    assert len(verifications) == 2
+    assert VerificationResult.query.count() == 2
+
+def test_verify_route_uses_the_cache_unless_forced(client, upload, verifications):
+    document_id = upload(b'lab report', 'report.txt')['id']
+    client.post(f'/signature/sign/{document_id}', data={'password': 'password'})
+
+    client.post(f'/signature/verify/{document_id}')
+    response = client.post(f'/signature/verify/{document_id}', follow_redirects=True)
+    assert b'Signature is valid' in response.data
+    assert len(verifications) == 1
+
+    client.post(f'/signature/verify/{document_id}', data={'force': '1'})
+    assert len(verifications) == 2
@@ -0,0 +1,132 @@
+"""
+Tests for batch signature verification: the service, the streaming route
+and the audit script.
+"""
+
+import io
+import os
+import json
+import pytest
+import verify_signatures
+from src.extensions import db
+from src.models.document import Document
+from src.models.verification import VerificationResult
+from src.services.signature_service import SignatureService
+from tests.conftest import login
+
+def upload_and_sign(client, content, filename):
+    """Upload a document as a client's user and sign it, returning its ID."""
+    response = client.post('/document/upload-stream', data=io.BytesIO(content),
+                           headers={'X-Filename': filename, 'Content-Type': 'text/plain'})
+    document_id = response.get_json()['id']
+    assert client.post(f'/signature/sign/{document_id}', data={'password': 'password'}).status_code == 302
+    return document_id
+
+@pytest.fixture
+def signed(app, client):
+    """IDs of three documents signed by alice and one signed by bob."""
+    ids = [upload_and_sign(client, f'alice {index}'.encode(), f'a{index}.txt') for index in range(3)]
+    with app.app_context():
+        ids.append(upload_and_sign(login(app, 'bob'), b'bob', 'b.txt'))
+    return ids
+
+def verify(document_ids, **kwargs):
+    """Verify documents through the service, returning results by document ID."""
+    documents = [db.session.get(Document, document_id) for document_id in document_ids]
+    return {result['document_id']: result
+            for result in SignatureService().verify_documents(documents, max_workers=2, **kwargs)}
+
+def test_each_signer_key_is_parsed_once(signed, monkeypatch):
+    parsed = []
+    get_public_key = SignatureService.get_public_key
+    monkeypatch.setattr(SignatureService, 'get_public_key',
+                        lambda service, key: parsed.append(key) or get_public_key(service, key))
+
+    results = verify(signed)
+
+    assert all(result['valid'] for result in results.values())
+    assert len(parsed) == len(set(parsed)) == 2
+
+def test_results_are_cached_per_signer(signed):
+    first = verify(signed)
+    assert not any(result['cached'] for result in first.values())
+    assert VerificationResult.query.count() == 4
+    assert len({result.key_fingerprint for result in VerificationResult.query}) == 2
+
+    second = verify(signed)
+    assert all(result['cached'] and result['valid'] for result in second.values())
+
+    forced = verify(signed, force=True)
+    assert not any(result['cached'] for result in forced.values())
+
+def test_results_completed_before_the_consumer_stops_are_kept(signed):
+    documents = [db.session.get(Document, document_id) for document_id in signed]
+    results = SignatureService().verify_documents(documents, max_workers=1)
+
+    next(results)
+    results.close()
+
+    assert VerificationResult.query.count() >= 1
+
+def test_changed_document_is_invalid_and_not_served_from_cache(signed):
+    verify(signed)
+    document = db.session.get(Document, signed[0])
+    with open(document.get_file_path(), 'ab') as f:
+        f.write(b' tampered')
+
+    result = verify(signed)[signed[0]]
+
+    assert not result['valid']
+    assert not result['cached']
+
+def test_missing_document_and_corrupt_signature_are_reported(signed):
+    document = db.session.get(Document, signed[0])
+    os.remove(document.get_file_path())
+    with open(db.session.get(Document, signed[1]).get_signature_path(), 'wb') as f:
+        f.write(b'not a signature')
+
+    results = verify(signed)
+
+    assert not results[signed[0]]['valid'] and results[signed[0]]['error']
+    # An unreadable container fails like a wrong signature
+    assert not results[signed[1]]['valid']
+    assert results[signed[2]]['valid'] and results[signed[3]]['valid']
+
+def test_route_streams_ndjson(client, signed):
+    response = client.post('/signature/verify-batch', json={'document_ids': signed + [9999]})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {'document_id': 9999, 'valid': False, 'error': 'Signed document not found', 'cached': False}
+    assert {line['document_id'] for line in lines[1:-1]} == set(signed)
+    assert lines[-1] == {'summary': {'total': 5, 'valid': 4, 'invalid': 1}}
+
+def test_route_requires_ids(client):
+    assert client.post('/signature/verify-batch', json={}).status_code == 400
+    assert client.post('/signature/verify-batch', json={'document_ids': ['x']}).status_code == 400
+
+def test_route_by_owner(client, signed):
+    alice = db.session.get(Document, signed[0]).user_id
+
+    response = client.post('/signature/verify-batch', data={'user_id': str(alice)})
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {line['document_id'] for line in lines[:-1]} == set(signed[:3])
+
+def test_script_prints_json_lines(app, signed, monkeypatch, capsys):
+    monkeypatch.setattr(verify_signatures, 'create_app', lambda: app)
+
+    invalid = verify_signatures.verify_signatures(document_ids=signed + [9999], as_json=True)
+
+    assert invalid == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0] == {'document_id': 9999, 'valid': False, 'error': 'missing'}
+    assert {line['document_id']: line['valid'] for line in lines[1:]} == {document_id: True for document_id in signed}
+
+def test_script_by_username(app, signed, monkeypatch, capsys):
+    monkeypatch.setattr(verify_signatures, 'create_app', lambda: app)
+
+    assert verify_signatures.verify_signatures(username='bob') == 0
+    assert capsys.readouterr().out.splitlines() == [f'{signed[3]} | VALID']
+    assert verify_signatures.verify_signatures(username='nobody') == 1
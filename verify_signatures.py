@@ -0,0 +1,80 @@
+"""
+Batch signature verification script for audits.
+"""
+
+import sys
+import json
+import argparse
+
+from src.main import create_app, db
+from src.models.user import User
+from src.services.document_service import DocumentService
+from src.services.signature_service import SignatureService
+
+def verify_signatures(document_ids=None, username=None, workers=None, as_json=False, force=False):
+    """
+    Verify signatures for a list of documents or a user's whole corpus.
+
+    Args:
+        document_ids (list): Document IDs to verify
+        username (str): Verify every signed document owned by this user
+        workers (int): Size of the worker pool
+        as_json (bool): Print one JSON object per line instead of text
+        force (bool): Verify cryptographically even if results are cached
+
+    Returns:
+        int: Number of documents whose signature is not valid
+    """
+    app = create_app()
+
+    with app.app_context():
+        user_id = None
+        if username:
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                print(f"User with username '{username}' not found", file=sys.stderr)
+                return 1
+            user_id = user.id
+
+        documents = DocumentService(db).get_signed_documents(document_ids, user_id)
+
+        invalid = 0
+        if document_ids:
+            found = {document.id for document in documents}
+            for document_id in document_ids:
+                if document_id not in found:
+                    invalid += 1
+                    if as_json:
+                        print(json.dumps({'document_id': document_id, 'valid': False, 'error': 'missing'}), flush=True)
+                    else:
+                        print(f"{document_id} | MISSING | Signed document not found")
+
+        total = 0
+        for result in SignatureService().verify_documents(documents, max_workers=workers, force=force):
+            total += 1
+            if not result['valid']:
+                invalid += 1
+
+            if as_json:
+                print(json.dumps(result), flush=True)
+            else:
+                status = "VALID" if result['valid'] else "INVALID"
+                error = f" | {result['error']}" if result['error'] else ""
+                cached = " (cached)" if result['cached'] else ""
+                print(f"{result['document_id']} | {status}{cached}{error}", flush=True)
+
+        print(f"Verified {total} documents, {invalid} not valid", file=sys.stderr)
+        return invalid
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify document signatures in bulk")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--documents', type=int, nargs='+', help="Document IDs to verify")
+    group.add_argument('--user', help="Verify every signed document owned by this username")
+    parser.add_argument('--workers', type=int, default=None, help="Worker pool size")
+    parser.add_argument('--json', action='store_true', help="Print JSON lines")
+    parser.add_argument('--force', action='store_true', help="Ignore cached verification results")
+    args = parser.parse_args()
+
+    invalid = verify_signatures(args.documents, args.user, args.workers, args.json, args.force)
+    sys.exit(1 if invalid else 0)